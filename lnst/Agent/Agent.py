@@ -21,11 +21,14 @@ import socket
 import ctypes
 import multiprocessing
 import types
-from time import sleep
+import zlib
+import shutil
+from time import sleep, time
 from inspect import isclass
-from tempfile import NamedTemporaryFile
+from tempfile import NamedTemporaryFile, mkdtemp
 from lnst.Common.Logs import log_exc_traceback
 from lnst.Common.PacketCapture import PacketCapture
+from lnst.Common.PcapSummary import summarize_pcap
 from lnst.Common.Utils import die_when_parent_die
 from lnst.Common.ExecCmd import exec_cmd, ExecCmdFail
 from lnst.Common.ResourceCache import ResourceCache
@@ -68,6 +71,27 @@ class SystemCallException(Exception):
     pass
 
 
+class CompressedReader(object):
+    """File wrapper returning zlib compressed chunks of the file content"""
+    def __init__(self, file):
+        self._file = file
+        self._compressor = zlib.compressobj()
+
+    def read(self, size):
+        data = b""
+        while not data and self._compressor is not None:
+            chunk = self._file.read(size)
+            if chunk:
+                data = self._compressor.compress(chunk)
+            else:
+                data = self._compressor.flush()
+                self._compressor = None
+        return data
+
+    def close(self):
+        self._file.close()
+
+
 class RemoteMethods:
     """
     RPC methods exposed to the Controller
@@ -84,12 +108,15 @@ class RemoteMethods:
         self._agent_config = agent_config
 
         self._capture_files = {}
+        self._capture_dir = None
+        self._raw_output_files = set()
         self._copy_targets = {}
         self._copy_sources = {}
         self._system_config = {}
 
         self._cache = ResourceCache(agent_config.get_option("cache", "dir"),
-                                    agent_config.get_option("cache", "expiration_period"))
+                                    agent_config.get_option("cache", "expiration_period"),
+                                    agent_config.get_option("cache", "max_size"))
 
         self._dynamic_modules = {}
         self._dynamic_classes = {}
@@ -112,6 +139,9 @@ class RemoteMethods:
 
         return ("hello", agent_desc)
 
+    def get_time(self):
+        return time()
+
     def prepare_machine(self):
         self.machine_cleanup()
 
@@ -143,6 +173,7 @@ class RemoteMethods:
         self._cache.del_old_entries()
         self.reset_file_transfers()
         self._remove_capture_files()
+        self._remove_raw_output_files()
         return "bye"
 
     def map_device_class(self, cls_name, module_name):
@@ -157,13 +188,18 @@ class RemoteMethods:
         setattr(Devices, cls_name, cls)
 
     def load_cached_module(self, module_name, res_hash):
-        self._cache.renew_entry(res_hash)
-        if module_name in self._dynamic_modules:
-            return
-        module_path = self._cache.get_path(res_hash)
-        module_loader = importlib.machinery.SourceFileLoader(module_name, module_path)
-        module = module_loader.load_module()
-        self._dynamic_modules[module_name] = module
+        self.load_cached_modules([(module_name, res_hash)])
+
+    def load_cached_modules(self, modules):
+        """Loads the cached modules in the order of the (name, hash) list"""
+        self._cache.renew_entries([res_hash for _, res_hash in modules])
+        for module_name, res_hash in modules:
+            if module_name in self._dynamic_modules:
+                continue
+            module_path = self._cache.get_path(res_hash)
+            module_loader = importlib.machinery.SourceFileLoader(module_name, module_path)
+            module = module_loader.load_module()
+            self._dynamic_modules[module_name] = module
 
     def init_cls(self, cls_name, module_name, args, kwargs):
         module = self._dynamic_modules[module_name]
@@ -312,33 +348,60 @@ class RemoteMethods:
         dev =  self._if_manager.create_device(clsname, args, kwargs)
         return {"ifindex": dev.ifindex, "name": dev.name}
 
-    def start_packet_capture(self, filt):
+    def start_packet_capture(self, filt, snaplen=None, ring_file_size=None,
+                             ring_file_count=None):
+        """Starts tcpdump on all devices of the namespace except loopback
+
+        Args:
+            filt -- pcap filter expression
+            snaplen -- number of bytes captured from each packet
+            ring_file_size -- size in megabytes after which the capture
+                file is rotated
+            ring_file_count -- maximum number of rotated files kept
+
+        Returns a dictionary mapping ifindexes to the capture file paths.
+        With a ring buffer these are the prefixes of the rotated files,
+        see packet_capture_segments.
+        """
         if not is_installed("tcpdump"):
             raise Exception("Can't start packet capture, tcpdump not available")
 
+        self._remove_capture_files()
+        self._capture_dir = mkdtemp(prefix="lnst-capture-")
+
         files = {}
-        for if_id, dev in self._if_manager.get_mapped_devices().items():
-            if dev.get_netns() != None:
+        for dev in self._if_manager.get_devices():
+            if dev.name == "lo":
                 continue
-            dev_name = dev.get_name()
 
-            df_handle = NamedTemporaryFile(delete=False)
-            dump_file = df_handle.name
-            df_handle.close()
-
-            files[if_id] = dump_file
+            dump_file = os.path.join(self._capture_dir, "%s.pcap" % dev.name)
+            files[dev.ifindex] = dump_file
 
             pcap = PacketCapture()
-            pcap.set_interface(dev_name)
+            pcap.set_interface(dev.name)
             pcap.set_output_file(dump_file)
             pcap.set_filter(filt)
+            if snaplen is not None:
+                pcap.set_snaplen(snaplen)
+            if ring_file_size is not None:
+                pcap.set_ring_buffer(ring_file_size, ring_file_count or 1)
             pcap.start()
 
-            self._packet_captures[if_id] = pcap
+            self._packet_captures[dev.ifindex] = pcap
 
         self._capture_files = files
         return files
 
+    def packet_capture_segments(self):
+        """Returns the capture files of each device, oldest first"""
+        return {if_id: [path for path in pcap.files() if os.path.exists(path)]
+                for if_id, pcap in self._packet_captures.items()}
+
+    def packet_capture_summary(self, max_flows=100, top_talkers=10):
+        """Summarizes the captures on the agent, see summarize_pcap"""
+        return {if_id: summarize_pcap(paths, max_flows, top_talkers)
+                for if_id, paths in self.packet_capture_segments().items()}
+
     def stop_packet_capture(self):
         if self._packet_captures == None:
             return True
@@ -346,17 +409,44 @@ class RemoteMethods:
         for ifindex, pcap in self._packet_captures.items():
             pcap.stop()
 
-        self._packet_captures.clear()
-
+        # the captures stay available for summaries and retrieval until
+        # the next capture is started
         return True
 
     def _remove_capture_files(self):
-        for key, name in self._capture_files.items():
-            logging.debug("Removing temporary packet capture file %s", name)
-            os.unlink(name)
-
+        self.stop_packet_capture()
+        self._packet_captures.clear()
         self._capture_files.clear()
 
+        if self._capture_dir is not None:
+            logging.debug("Removing packet capture directory %s",
+                          self._capture_dir)
+            shutil.rmtree(self._capture_dir, ignore_errors=True)
+            self._capture_dir = None
+
+    def _add_raw_output_file(self, path):
+        self._raw_output_files.add(path)
+
+    def remove_raw_output(self, path):
+        """Removes a raw tool output file stored by a test module"""
+        if path not in self._raw_output_files:
+            return False
+
+        self._raw_output_files.discard(path)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        return True
+
+    def _remove_raw_output_files(self):
+        for path in self._raw_output_files:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self._raw_output_files.clear()
+
     def _update_system_config(self, options, persistent):
         system_config = self._system_config
         for opt in options:
@@ -393,6 +483,9 @@ class RemoteMethods:
 
         return res
 
+    def run_jobs(self, jobs):
+        return [self.run_job(job) for job in jobs]
+
     def kill_job(self, job_id, signal):
         job = self._job_context.get_job(job_id)
 
@@ -438,6 +531,7 @@ class RemoteMethods:
         self._server_handler.set_if_manager(None)
         self._cache.del_old_entries()
         self._remove_capture_files()
+        self._remove_raw_output_files()
         return True
 
     def has_resource(self, res_hash):
@@ -446,6 +540,9 @@ class RemoteMethods:
 
         return False
 
+    def missing_resources(self, res_hashes):
+        return self._cache.missing(res_hashes)
+
     def add_resource_to_cache(self, res_type, local_path, name):
         if res_type == "file":
             self._cache.add_file_entry(local_path, name)
@@ -482,11 +579,14 @@ class RemoteMethods:
 
         return False
 
-    def start_copy_from(self, filepath):
+    def start_copy_from(self, filepath, compress=False):
         if filepath in self._copy_sources or not os.path.exists(filepath):
             return False
 
-        self._copy_sources[filepath] = open(filepath, "rb")
+        source = open(filepath, "rb")
+        if compress:
+            source = CompressedReader(source)
+        self._copy_sources[filepath] = source
         return True
 
     def copy_part_from(self, filepath, buffsize):
@@ -1067,6 +1167,12 @@ class Agent:
 
             job.set_finished(msg["result"])
             self._server_handler.send_data_to_ctl(msg)
+        elif msg["type"] == "job_event":
+            if msg["event"] == "raw_output":
+                # the stored raw output files are removed by the agent
+                self._methods._add_raw_output_file(msg["data"])
+            else:
+                self._server_handler.send_data_to_ctl(msg)
 
         elif msg["type"] == "from_netns":
             msg["data"]["netns"] = msg["netns"]
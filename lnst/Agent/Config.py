@@ -43,6 +43,12 @@ class AgentConfig(Config):
                 "action" : self.optionTimeval,
                 "name" : "expiration_period"}
 
+        self._options['cache']['max_size'] = {\
+                "value" : 1024*1024*1024, # 1 GiB, 0 means unlimited
+                "additive" : False,
+                "action" : self.optionSize,
+                "name" : "max_size"}
+
         self._options['security'] = dict()
         self._options['security']['auth_types'] = {\
                 "value" : "none",
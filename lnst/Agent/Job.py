@@ -11,6 +11,7 @@ olichtne@redhat.com (Ondrej Lichtner)
 """
 
 import os
+import time
 import signal
 import logging
 import multiprocessing
@@ -102,8 +103,19 @@ class Job(object):
         self._log_ctl.disable_logging()
         self._log_ctl.set_connection(self._child_pipe)
 
+        self._job_cls.set_event_sender(self._send_event)
+
         result = {}
         try:
+            start_time = self._what.get("start_time")
+            if start_time is not None:
+                # scheduled start shared by a batch of jobs, see
+                # lnst.Controller.Machine.run_jobs
+                delay = start_time - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                self._send_event("started", {"timestamp": time.time()})
+
             self._job_cls.run()
             job_result = self._job_cls.get_result()
         except Exception as e:
@@ -121,6 +133,13 @@ class Job(object):
         send_data(self._child_pipe, result)
         self._child_pipe.close()
 
+    def _send_event(self, event_type, data=None):
+        msg = {"type": "job_event",
+               "job_id": self._id,
+               "event": event_type,
+               "data": data}
+        send_data(self._child_pipe, msg)
+
     def kill(self, sig=signal.SIGKILL):
         if self._finished:
             logging.debug("Job finished before sending the signal")
@@ -162,6 +181,10 @@ class GenericJob(object):
         self._result = {"passed": False,
                         "res_data": None,
                         "type": "result"}
+        self._event_sender = None
+
+    def set_event_sender(self, sender):
+        self._event_sender = sender
 
     def run(self):
         raise JobError("Method run must be defined.")
@@ -257,6 +280,7 @@ class ShellExecJob(GenericJob):
 
 class ModuleJob(GenericJob):
     def run(self):
+        self._what["module"]._set_event_sender(self._event_sender)
         try:
             self._result["passed"] = self._what["module"].run()
             self._result["res_data"] = self._what["module"]._get_res_data()
@@ -255,6 +255,16 @@ class Config():
 
         return timeval
 
+    def optionSize(self, option, cfg_path):
+        size_re = r"^([0-9]+)\s*([kKmMgG]?)B?$"
+        size_match = re.match(size_re, option.strip())
+        if not size_match:
+            msg = "Incorrect size format."
+            raise ConfigError(msg)
+
+        units = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+        return int(size_match.group(1)) * units[size_match.group(2).lower()]
+
     def optionColour(self, option, cfg_path):
         colour = option.split()
         if len(colour) != 3:
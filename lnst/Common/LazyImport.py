@@ -0,0 +1,65 @@
+"""
+Lazy loading of the public attributes of a package, the modules defining them
+are imported on the first access of the attribute (PEP 562) instead of when the
+package is imported.
+
+Copyright 2025 Red Hat, Inc.
+Licensed under the GNU General Public License, version 2 as
+published by the Free Software Foundation; see COPYING for details.
+"""
+
+import sys
+import importlib
+from types import ModuleType
+
+
+class LazyPackage(ModuleType):
+    """Module type of a package with lazily loaded attributes
+
+    Importing a submodule normally sets it as an attribute of the package,
+    which would hide a lazy attribute of the same name (e.g. the
+    BondRecipe class defined in the BondRecipe module), such submodules are
+    not set so the attribute keeps resolving to what it's mapped to.
+    """
+    def __getattr__(self, name):
+        attributes = self.__dict__["_lazy_attributes"]
+        try:
+            source = attributes[name]
+        except KeyError:
+            raise AttributeError(
+                "module {!r} has no attribute {!r}".format(self.__name__, name)
+            )
+
+        if callable(source):
+            value = source()
+        else:
+            value = getattr(importlib.import_module(source), name)
+        self.__dict__[name] = value
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._lazy_attributes))
+
+    def __setattr__(self, name, value):
+        if (
+            isinstance(value, ModuleType)
+            and name in self.__dict__.get("_lazy_attributes", {})
+        ):
+            return
+        super().__setattr__(name, value)
+
+
+def lazy_package(package_name, attributes):
+    """Makes the attributes of a package lazily loaded
+
+    Called from the __init__ module of the package with its __name__.
+
+    :param attributes: dictionary of the attribute names mapped to the name of
+        the module that defines the attribute, or to a callable returning the
+        attribute value
+    """
+    package = sys.modules[package_name]
+    package.__class__ = LazyPackage
+    package._lazy_attributes = attributes
+    if not hasattr(package, "__all__"):
+        package.__all__ = list(attributes)
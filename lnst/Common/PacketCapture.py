@@ -11,12 +11,18 @@ rpazdera@redhat.com (Radek Pazdera)
 """
 
 import subprocess
+import glob
 import os
 
 class PacketCapture:
     """ Capture/handle traffic that goes through a specific
         network interface. Capturing backend of this class
         is provided by tcpdump(8).
+
+        With a ring buffer configured tcpdump rotates the output
+        into at most `file_count` files of `file_size` megabytes,
+        overwriting the oldest one, so that the capture size
+        stays bounded for long runs.
     """
 
     _cmd = ""
@@ -25,6 +31,9 @@ class PacketCapture:
     _devname = None
     _file    = None
     _filter  = None
+    _snaplen = None
+    _ring_file_size  = None
+    _ring_file_count = None
 
     def set_interface(self, devname):
         self._devname = devname
@@ -35,6 +44,25 @@ class PacketCapture:
     def set_filter(self, filt):
         self._filter = filt
 
+    def set_snaplen(self, snaplen):
+        self._snaplen = snaplen
+
+    def set_ring_buffer(self, file_size, file_count):
+        """ Rotate the output file every `file_size` megabytes
+            keeping at most `file_count` files.
+        """
+        self._ring_file_size = file_size
+        self._ring_file_count = file_count
+
+    def files(self):
+        """ Return the capture files, oldest first """
+        if self._ring_file_size is None:
+            return [self._file]
+
+        # tcpdump appends a file number to the output file name
+        files = glob.glob(glob.escape(self._file) + "*")
+        return sorted(files, key=lambda path: (os.path.getmtime(path), path))
+
     def start(self):
         self._run()
 
@@ -50,8 +78,15 @@ class PacketCapture:
         output_file = self._file
         pcap_filter = self._filter
 
-        self._cmd = "tcpdump -p -i %s -w %s %s" % \
-                            (interface, output_file, pcap_filter)
+        options = ""
+        if self._snaplen is not None:
+            options += " -s %d" % self._snaplen
+        if self._ring_file_size is not None:
+            options += " -C %d -W %d" % (self._ring_file_size,
+                                         self._ring_file_count)
+
+        self._cmd = "tcpdump -p%s -i %s -w %s %s" % \
+                            (options, interface, output_file, pcap_filter)
 
     def _execute_tcpdump(self):
         """ Start tcpdump in the background """
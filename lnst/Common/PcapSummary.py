@@ -0,0 +1,192 @@
+"""
+This module contains tools for summarizing packet captures without
+transferring them.
+
+Copyright 2025 Red Hat, Inc.
+Licensed under the GNU General Public License, version 2 as
+published by the Free Software Foundation; see COPYING for details.
+"""
+
+import struct
+import socket
+from collections import defaultdict
+
+from lnst.Common.LnstError import LnstError
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_LINUX_SLL2 = 276
+
+ETH_P_IP = 0x0800
+ETH_P_IPV6 = 0x86DD
+VLAN_ETHERTYPES = (0x8100, 0x88A8)
+
+PROTOCOL_NAMES = {1: "icmp", 6: "tcp", 17: "udp", 58: "icmpv6", 132: "sctp"}
+PORT_PROTOCOLS = (6, 17, 132)
+
+_PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": "<",
+    b"\xa1\xb2\xc3\xd4": ">",
+    # nanosecond resolution
+    b"\x4d\x3c\xb2\xa1": "<",
+    b"\xa1\xb2\x3c\x4d": ">",
+}
+
+
+class PcapError(LnstError):
+    pass
+
+
+def read_pcap(path):
+    """Yields the (orig_len, data) tuples of the packets in a pcap file
+
+    A truncated last record, e.g. of a capture that is still running, is
+    ignored.
+
+    :return: the link type of the capture followed by the packet tuples
+    """
+    with open(path, "rb") as f:
+        header = f.read(24)
+        if len(header) < 24:
+            # tcpdump didn't write anything yet
+            return
+        try:
+            endian = _PCAP_MAGIC[header[:4]]
+        except KeyError:
+            raise PcapError("{} is not a pcap file".format(path))
+
+        linktype = struct.unpack(endian + "I", header[20:24])[0] & 0x0FFFFFFF
+        yield linktype
+
+        record = struct.Struct(endian + "IIII")
+        while True:
+            record_header = f.read(record.size)
+            if len(record_header) < record.size:
+                return
+            _, _, incl_len, orig_len = record.unpack(record_header)
+            data = f.read(incl_len)
+            if len(data) < incl_len:
+                return
+            yield orig_len, data
+
+
+def _network_header(linktype, data):
+    """Returns the ethertype and offset of the network layer header"""
+    if linktype == LINKTYPE_ETHERNET:
+        offset = 12
+        ethertype = int.from_bytes(data[offset:offset + 2], "big")
+        while ethertype in VLAN_ETHERTYPES:
+            offset += 4
+            ethertype = int.from_bytes(data[offset:offset + 2], "big")
+        return ethertype, offset + 2
+    elif linktype == LINKTYPE_LINUX_SLL:
+        return int.from_bytes(data[14:16], "big"), 16
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        return int.from_bytes(data[0:2], "big"), 20
+    elif linktype == LINKTYPE_RAW and data:
+        version = data[0] >> 4
+        return ETH_P_IP if version == 4 else ETH_P_IPV6, 0
+    return None, 0
+
+
+def flow_key(linktype, data):
+    """Returns the (protocol, src, sport, dst, dport) tuple of a packet
+
+    Addresses are kept as packed bytes, ports are None for protocols
+    without ports, non-first fragments and truncated packets. Returns None
+    for non IP packets.
+    """
+    ethertype, offset = _network_header(linktype, data)
+    if ethertype == ETH_P_IP:
+        if len(data) < offset + 20:
+            return None
+        ihl = (data[offset] & 0x0F) * 4
+        protocol = data[offset + 9]
+        src = data[offset + 12:offset + 16]
+        dst = data[offset + 16:offset + 20]
+        fragment_offset = int.from_bytes(data[offset + 6:offset + 8], "big") & 0x1FFF
+        transport = offset + ihl if fragment_offset == 0 else None
+    elif ethertype == ETH_P_IPV6:
+        if len(data) < offset + 40:
+            return None
+        protocol = data[offset + 6]
+        src = data[offset + 8:offset + 24]
+        dst = data[offset + 24:offset + 40]
+        transport = offset + 40
+    else:
+        return None
+
+    sport = dport = None
+    if (
+        protocol in PORT_PROTOCOLS
+        and transport is not None
+        and len(data) >= transport + 4
+    ):
+        sport = int.from_bytes(data[transport:transport + 2], "big")
+        dport = int.from_bytes(data[transport + 2:transport + 4], "big")
+    return protocol, src, sport, dst, dport
+
+
+def _format_address(address):
+    family = socket.AF_INET if len(address) == 4 else socket.AF_INET6
+    return socket.inet_ntop(family, address)
+
+
+def summarize_pcap(paths, max_flows=100, top_talkers=10):
+    """Summarizes pcap files into per flow packet and byte counts
+
+    :param paths: pcap files of a single capture, e.g. the ring buffer
+        segments, in the order they were written
+    :param max_flows: maximum number of flows to include in the summary,
+        the flows with most bytes are included
+    :param top_talkers: number of source addresses with most bytes to include
+    :return: dictionary with the total `packets` and `bytes`, the
+        `flow_count`, the `flows` and `top_talkers` lists and `non_ip`
+        packet and byte counts. Byte counts are the original packet lengths,
+        regardless of the capture snaplen.
+    """
+    flows = defaultdict(lambda: [0, 0])
+    non_ip = [0, 0]
+
+    for path in paths:
+        packets = read_pcap(path)
+        linktype = next(packets, None)
+        for orig_len, data in packets:
+            key = flow_key(linktype, data)
+            counters = flows[key] if key is not None else non_ip
+            counters[0] += 1
+            counters[1] += orig_len
+
+    talkers = defaultdict(lambda: [0, 0])
+    for (_, src, _, _, _), (packets, size) in flows.items():
+        talkers[src][0] += packets
+        talkers[src][1] += size
+
+    by_bytes = lambda item: item[1][1]
+    top_flows = sorted(flows.items(), key=by_bytes, reverse=True)[:max_flows]
+
+    return {
+        "packets": sum(c[0] for c in flows.values()) + non_ip[0],
+        "bytes": sum(c[1] for c in flows.values()) + non_ip[1],
+        "flow_count": len(flows),
+        "flows": [
+            {
+                "protocol": PROTOCOL_NAMES.get(protocol, protocol),
+                "src": _format_address(src),
+                "sport": sport,
+                "dst": _format_address(dst),
+                "dport": dport,
+                "packets": packets,
+                "bytes": size,
+            }
+            for (protocol, src, sport, dst, dport), (packets, size) in top_flows
+        ],
+        "top_talkers": [
+            {"address": _format_address(src), "packets": packets, "bytes": size}
+            for src, (packets, size) in sorted(
+                talkers.items(), key=by_bytes, reverse=True
+            )[:top_talkers]
+        ],
+        "non_ip": {"packets": non_ip[0], "bytes": non_ip[1]},
+    }
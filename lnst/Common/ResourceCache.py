@@ -11,6 +11,7 @@ rpazdera@redhat.com (Radek Pazdera)
 
 import logging
 import os
+import re
 import time
 import shutil
 import json
@@ -18,7 +19,7 @@ from lnst.Common.Utils import sha256sum
 from lnst.Common.LnstError import LnstError
 
 #current index version
-INDEX_VERSION = 1
+INDEX_VERSION = 2
 #minimal supported index version -- will be updated to current one when loaded
 MIN_INDEX_VERSION = 1
 
@@ -26,11 +27,26 @@ class ResourceCacheError(LnstError):
     pass
 
 class ResourceCache(object):
+    """Persistent content addressed cache of resource files
+
+    Every file is stored under its sha256 digest, the index of the entries
+    is replaced atomically on every change, so it survives restarts and
+    crashes of the agent. Intact files in the cache directory without an
+    index entry (e.g. left by a crash between storing a file and saving the
+    index) are added back to the index when the cache is loaded.
+
+    Entries not used for the expiration period are removed by
+    del_old_entries, the least recently used entries are removed whenever
+    the total size of the cache exceeds max_size.
+
+    :param max_size: maximal total size of the cached files in bytes,
+        0 means unlimited
+    """
     _CACHE_INDEX_FILE_NAME = "index"
     _root = None
     _expiration_period = None
 
-    def __init__(self, cache_path, expiration_period):
+    def __init__(self, cache_path, expiration_period, max_size=0):
         if os.path.exists(cache_path):
             if os.path.isdir(cache_path):
                 self._root = cache_path
@@ -42,80 +58,197 @@ class ResourceCache(object):
 
         self._index = {"index_version": INDEX_VERSION,
                        "entries": {}}
-        self._read_index()
         self._expiration_period = expiration_period
+        self._max_size = max_size
+        self._read_index()
 
     def _read_index(self):
+        if not os.path.exists(self.index_path):
+            logging.debug("Resource cache index not found, starting empty")
+            self._adopt_unindexed_files()
+            return
+
         try:
-            with open(self.index_path, "w") as f:
+            with open(self.index_path, "r") as f:
                 index = json.load(f)
-                if index["index_version"] > INDEX_VERSION:
-                    raise ResourceCacheError("Incompatible ResourceCache index versions")
-                elif index["index_version"] == INDEX_VERSION:
-                    self._index = index
-                    logging.debug("Resource cache index loaded")
-                else:
-                    self._index = self._update_old_index(index)
-                    logging.debug("Resource cache index loaded")
-                    self._save_index()
-        except:
-            pass
+            version = index["index_version"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.warning("Ignoring corrupted resource cache index %s: %s"
+                            % (self.index_path, e))
+            self._adopt_unindexed_files()
+            self._save_index()
+            return
+
+        if version > INDEX_VERSION:
+            raise ResourceCacheError("Incompatible ResourceCache index versions")
+        elif version < INDEX_VERSION:
+            index = self._update_old_index(index)
+
+        self._index = index
+        self._remove_missing_entries()
+        self._adopt_unindexed_files()
+        self._save_index()
+        logging.debug("Resource cache index loaded, %d entries"
+                      % len(self._index["entries"]))
 
     def _update_old_index(self, old):
         if old["index_version"] < MIN_INDEX_VERSION:
             raise ResourceCacheError("ResourceCache index version too old to update")
         logging.debug("Updating old index to newer version")
+
+        if old["index_version"] < 2:
+            for entry_hash, entry in list(old["entries"].items()):
+                entry["path"] = self._entry_path(entry_hash)
+                try:
+                    entry["size"] = os.path.getsize(entry["path"])
+                except OSError:
+                    del old["entries"][entry_hash]
+
+        old["index_version"] = INDEX_VERSION
         return old
 
+    def _remove_missing_entries(self):
+        for entry_hash, entry in list(self._index["entries"].items()):
+            if not os.path.isfile(entry["path"]):
+                logging.debug("Removing cache entry %s without a file"
+                              % entry_hash)
+                del self._index["entries"][entry_hash]
+
+    def _adopt_unindexed_files(self):
+        """Re-creates the entries of intact files missing in the index
+
+        The files are named by their digest, so an entry can be restored for
+        any file whose content matches its name, other files are removed.
+        """
+        for name in os.listdir(self._root):
+            path = self._entry_path(name)
+            if name == self._CACHE_INDEX_FILE_NAME or \
+               name in self._index["entries"] or not os.path.isfile(path):
+                continue
+
+            if re.match(r"^[0-9a-f]{64}$", name) and sha256sum(path) == name:
+                logging.debug("Adopting unindexed cache file %s" % path)
+                self._index["entries"][name] = {
+                    "name": name,
+                    "path": path,
+                    "last_used": int(os.path.getmtime(path)),
+                    "digest": name,
+                    "size": os.path.getsize(path),
+                    "type": "file"}
+            else:
+                logging.debug("Removing invalid cache file %s" % path)
+                os.remove(path)
+
     def _save_index(self):
-        with open(self.index_path, "w") as f:
+        # the agents of network namespaces are forked and share the cache
+        tmp_path = "%s.%d.tmp" % (self.index_path, os.getpid())
+        with open(tmp_path, "w") as f:
             json.dump(self._index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def _entry_path(self, entry_hash):
+        return os.path.join(self._root, entry_hash)
 
     @property
     def index_path(self):
-        return "%s/%s" % (self.root, self._CACHE_INDEX_FILE_NAME)
+        return os.path.join(self.root, self._CACHE_INDEX_FILE_NAME)
 
     @property
     def root(self):
         return self._root
 
+    @property
+    def size(self):
+        return sum(entry["size"] for entry in self._index["entries"].values())
+
     def query(self, res_hash):
         return res_hash in self._index["entries"]
 
+    def missing(self, res_hashes):
+        """Returns the hashes of res_hashes that aren't cached
+
+        Entries whose files were removed (e.g. by another agent process
+        sharing the cache directory) are dropped and reported as missing.
+        """
+        missing = []
+        for res_hash in res_hashes:
+            entry = self._index["entries"].get(res_hash)
+            if entry is not None and not os.path.isfile(entry["path"]):
+                del self._index["entries"][res_hash]
+                entry = None
+            if entry is None:
+                missing.append(res_hash)
+        return missing
+
     def get_path(self, res_hash):
         return self._index["entries"][res_hash]["path"]
 
     def renew_entry(self, entry_hash):
-        self._index["entries"][entry_hash]["last_used"] = int(time.time())
+        self.renew_entries([entry_hash])
+
+    def renew_entries(self, entry_hashes):
+        now = int(time.time())
+        for entry_hash in entry_hashes:
+            self._index["entries"][entry_hash]["last_used"] = now
         self._save_index()
 
     def add_file_entry(self, filepath, entry_name):
         entry_hash = sha256sum(filepath)
 
-        if entry_hash in self._index["entries"]:
-            raise ResourceCacheError("File already in cache")
-
-        entry_path = "%s/%s" % (self._root, entry_hash)
-        if os.path.exists(entry_path):
-            os.remove(entry_path)
+        if not self.missing([entry_hash]):
+            os.remove(filepath)
+            self.renew_entry(entry_hash)
+            return entry_hash
 
-        shutil.move(filepath, entry_path)
+        entry_path = self._entry_path(entry_hash)
+        tmp_path = "%s.%d.tmp" % (entry_path, os.getpid())
+        shutil.move(filepath, tmp_path)
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, entry_path)
 
         entry = {"name": entry_name,
                  "path": entry_path,
                  "last_used": int(time.time()),
                  "digest": entry_hash,
+                 "size": os.path.getsize(entry_path),
                  "type": "file"}
         self._index["entries"][entry_hash] = entry
 
+        self._evict(keep=entry_hash)
         self._save_index()
 
         return entry_hash
 
+    def _evict(self, keep=None):
+        if not self._max_size:
+            return
+
+        size = self.size
+        entries = sorted(self._index["entries"].values(),
+                         key=lambda entry: entry["last_used"])
+        for entry in entries:
+            if size <= self._max_size:
+                break
+            if entry["digest"] == keep:
+                continue
+            logging.debug("Evicting cache entry %s (%s)"
+                          % (entry["digest"], entry["name"]))
+            self._remove_entry(entry["digest"])
+            size -= entry["size"]
+
+    def _remove_entry(self, entry_hash):
+        entry = self._index["entries"].pop(entry_hash)
+        try:
+            os.remove(entry["path"])
+        except FileNotFoundError:
+            pass
+
     def del_cache_entry(self, entry_hash):
         if entry_hash in self._index["entries"]:
-            os.remove(self._index["entries"][entry_hash].path)
-            del self._index["entries"][entry_hash]
+            self._remove_entry(entry_hash)
             self._save_index()
 
     def del_old_entries(self):
@@ -129,4 +262,7 @@ class ResourceCache(object):
                 rm.append(entry_hash)
 
         for entry_hash in rm:
-            self.del_cache_entry(entry_hash)
+            self._remove_entry(entry_hash)
+
+        if rm:
+            self._save_index()
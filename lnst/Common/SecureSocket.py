@@ -150,6 +150,21 @@ class SecureSocket(object):
                                 "mac_key": None,
                                 "seq_num": 0}
 
+    @property
+    def sequence_numbers(self):
+        """The (read, write) sequence numbers of the current cipher specs
+
+        Used to resynchronize the socket after it was used by a forked
+        process.
+        """
+        return (self._current_read_spec["seq_num"],
+                self._current_write_spec["seq_num"])
+
+    @sequence_numbers.setter
+    def sequence_numbers(self, value):
+        self._current_read_spec["seq_num"], \
+            self._current_write_spec["seq_num"] = value
+
     def send_msg(self, msg):
         pickled_msg = pickle.dumps(msg)
         return self.send(pickled_msg)
@@ -0,0 +1,164 @@
+"""
+StreamingProcess class, runs a subprocess and parses its output while it's
+running.
+
+Copyright 2025 Red Hat, Inc.
+Licensed under the GNU General Public License, version 2 as
+published by the Free Software Foundation; see COPYING for details.
+"""
+
+import os
+import time
+import signal
+import logging
+import selectors
+import threading
+import subprocess
+
+
+class OutputParser(object):
+    """Base class of incremental parsers of process output
+
+    The line methods are called with every complete line (without the line
+    separator) as bytes and the time the line was read, `finish` once the
+    process exited and all of its output was read.
+    """
+    def stdout_line(self, line: bytes, timestamp: float):
+        pass
+
+    def stderr_line(self, line: bytes, timestamp: float):
+        pass
+
+    def finish(self):
+        pass
+
+
+class StreamingProcess(object):
+    """Runs a subprocess feeding its output lines to an OutputParser
+
+    Both stdout and stderr are read as the data arrives, so the process
+    never blocks on full pipes and the memory usage doesn't depend on the
+    amount of output: only the last `tail_size` bytes of each stream are
+    kept in the `stdout` and `stderr` attributes.
+
+    While running in the main thread SIGINT is forwarded to the process as
+    `stop_signal` instead of interrupting the reading, the remaining output
+    is still parsed.
+
+    :param cmd: command passed to subprocess.Popen
+    :param parser: the OutputParser fed with the output lines
+    :param shell: whether to run the command through the shell
+    :param stop_signal: signal used to stop the process
+    :param tail_size: number of bytes of each stream kept
+    """
+    def __init__(self, cmd, parser=None, shell=True, stop_signal=signal.SIGINT,
+                 tail_size=64 * 1024, **popen_kwargs):
+        self._cmd = cmd
+        self._parser = parser if parser is not None else OutputParser()
+        self._shell = shell
+        self._stop_signal = stop_signal
+        self._tail_size = tail_size
+        self._popen_kwargs = popen_kwargs
+
+        self._process = None
+        self._stdout = bytearray()
+        self._stderr = bytearray()
+        self.interrupted = False
+
+    @property
+    def process(self):
+        return self._process
+
+    @property
+    def returncode(self):
+        return self._process.returncode if self._process else None
+
+    @property
+    def stdout(self) -> str:
+        return self._stdout.decode(errors="replace")
+
+    @property
+    def stderr(self) -> str:
+        return self._stderr.decode(errors="replace")
+
+    def start(self):
+        self._process = subprocess.Popen(
+            self._cmd, shell=self._shell, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, close_fds=True, **self._popen_kwargs
+        )
+        return self
+
+    def stop(self):
+        """Sends the stop signal to a process that is still running"""
+        if self._process is not None and self._process.poll() is None:
+            self._process.send_signal(self._stop_signal)
+
+    def run(self, duration=None) -> int:
+        """Parses the process output until it exits
+
+        :param duration: if set, the process is stopped after this many
+            seconds
+        :return: the return code of the process
+        """
+        if self._process is None:
+            self.start()
+
+        old_handler = None
+        if threading.current_thread() is threading.main_thread():
+            old_handler = signal.signal(signal.SIGINT, self._interrupt_handler)
+
+        try:
+            self._read_output(duration)
+        finally:
+            if old_handler is not None:
+                signal.signal(signal.SIGINT, old_handler)
+
+        returncode = self._process.wait()
+        self._parser.finish()
+        return returncode
+
+    def _interrupt_handler(self, signum, frame):
+        logging.debug("Interrupted, stopping {}".format(self._cmd))
+        self.interrupted = True
+        self.stop()
+
+    def _read_output(self, duration):
+        end_time = time.time() + duration if duration is not None else None
+        selector = selectors.DefaultSelector()
+        selector.register(self._process.stdout, selectors.EVENT_READ,
+                          (self._parser.stdout_line, self._stdout, [b""]))
+        selector.register(self._process.stderr, selectors.EVENT_READ,
+                          (self._parser.stderr_line, self._stderr, [b""]))
+
+        with selector:
+            while selector.get_map():
+                timeout = None
+                if end_time is not None:
+                    timeout = end_time - time.time()
+                    if timeout <= 0:
+                        self.stop()
+                        end_time = timeout = None
+
+                for key, _ in selector.select(timeout):
+                    data = os.read(key.fileobj.fileno(), 65536)
+                    feed, tail, pending = key.data
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        if pending[0]:
+                            feed(pending[0], time.time())
+                        continue
+
+                    self._append_tail(tail, data)
+                    timestamp = time.time()
+                    lines = (pending[0] + data).split(b"\n")
+                    pending[0] = lines.pop()
+                    if len(pending[0]) > self._tail_size:
+                        # bound the memory used by a never ending line
+                        lines.append(pending[0])
+                        pending[0] = b""
+                    for line in lines:
+                        feed(line, timestamp)
+
+    def _append_tail(self, tail, data):
+        tail += data
+        del tail[:-self._tail_size]
@@ -378,3 +378,24 @@ def wait_for_condition(condition: Callable[[], bool], timeout: int):
         if attempts == timeout:
             raise TimeoutError(f"Timeout while waiting for condition")
         time.sleep(1)
+
+
+def listening_ports(protocols=("tcp", "tcp6")) -> set[int]:
+    """Returns the local ports of sockets in the LISTEN state
+
+    The sockets are read from /proc/net, so only the sockets of the network
+    namespace of the calling process are considered.
+    """
+    tcp_listen_state = "0A"
+    ports = set()
+    for protocol in protocols:
+        try:
+            with open(f"/proc/net/{protocol}") as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if fields[3] == tcp_listen_state:
+                        ports.add(int(fields[1].rpartition(":")[2], 16))
+        except FileNotFoundError:
+            continue
+    return ports
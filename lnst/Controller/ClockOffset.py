@@ -0,0 +1,107 @@
+"""
+Defines the ClockOffset class, the estimate of the offset and drift of an
+agent clock relative to the controller clock.
+
+Copyright 2025 Red Hat, Inc.
+Licensed under the GNU General Public License, version 2 as
+published by the Free Software Foundation; see COPYING for details.
+"""
+
+import time
+
+
+class ClockOffset(object):
+    """NTP-style estimate of the offset of an agent clock
+
+    Every measurement queries the agent time several times, the query with
+    the shortest round trip is used and the agent time is assumed to be
+    taken in the middle of it, so the error of the measured offset is at
+    most half of that round trip. The drift is the slope of a least squares
+    fit of the offsets measured over time.
+
+    The offset is the agent time minus the controller time.
+
+    :param max_history: number of offset measurements used for the drift
+    """
+    def __init__(self, max_history=16):
+        self._max_history = max_history
+        # (controller time, offset, round trip time)
+        self._history = []
+        self._drift = 0.0
+
+    @property
+    def synced(self):
+        return len(self._history) > 0
+
+    @property
+    def last_sync(self):
+        """Controller time of the last measurement, None if not measured"""
+        return self._history[-1][0] if self._history else None
+
+    @property
+    def offset(self):
+        """Last measured offset in seconds, 0 if not measured"""
+        return self._history[-1][1] if self._history else 0.0
+
+    @property
+    def error(self):
+        """Maximum error of the last measured offset in seconds"""
+        return self._history[-1][2] / 2 if self._history else None
+
+    @property
+    def drift(self):
+        """Drift of the offset in seconds per second"""
+        return self._drift
+
+    def measure(self, get_agent_time, samples=8):
+        """Measures the offset using the *get_agent_time* callable
+
+        :return: the measured offset
+        """
+        best = None
+        for _ in range(samples):
+            sent = time.time()
+            agent_time = get_agent_time()
+            received = time.time()
+
+            rtt = received - sent
+            if best is None or rtt < best[2]:
+                best = ((sent + received) / 2, agent_time - (sent + received) / 2,
+                        rtt)
+
+        self.add_measurement(*best)
+        return best[1]
+
+    def add_measurement(self, controller_time, offset, rtt):
+        self._history.append((controller_time, offset, rtt))
+        del self._history[:-self._max_history]
+        self._drift = self._fit_drift()
+
+    def _fit_drift(self):
+        if len(self._history) < 2:
+            return 0.0
+
+        times = [t for t, _, _ in self._history]
+        offsets = [o for _, o, _ in self._history]
+        mean_t = sum(times) / len(times)
+        mean_o = sum(offsets) / len(offsets)
+        var_t = sum((t - mean_t) ** 2 for t in times)
+        if var_t == 0:
+            return 0.0
+        return sum(
+            (t - mean_t) * (o - mean_o) for t, o in zip(times, offsets)
+        ) / var_t
+
+    def offset_at(self, controller_time):
+        """Offset extrapolated from the last measurement with the drift"""
+        if not self._history:
+            return 0.0
+        last_time, last_offset, _ = self._history[-1]
+        return last_offset + self._drift * (controller_time - last_time)
+
+    def to_controller_time(self, agent_time):
+        # the offset changes negligibly within the offset itself
+        return agent_time - self.offset_at(agent_time - self.offset)
+
+    def to_agent_time(self, controller_time):
+        return controller_time + self.offset_at(controller_time)
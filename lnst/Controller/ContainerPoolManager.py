@@ -1,13 +1,19 @@
 import subprocess
 import logging
 import socket
-from time import sleep
+import atexit
+import threading
+from time import sleep, time
 from json import loads
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Union
 from lnst.Controller.AgentPoolManager import PoolManagerError
 from lnst.Controller.Machine import Machine
 from lnst.Common.DependencyError import DependencyError
 
+# logged by the agent right before it starts accepting controller connections
+AGENT_READY_MESSAGE = "Waiting for connection."
+
 
 class ContainerPoolManager(object):
     """This class implements managing containers and networks.
@@ -43,11 +49,26 @@ class ContainerPoolManager(object):
     :param network_plugin:
         Podman network plugin, 'cni', 'netavark' or 'custom_lnst', if unset, the network backend is auto-detected
     :type network_plugin: Optional[str]
+
+    :param provisioning_workers:
+        number of containers created, started and connected to their
+        networks in parallel
+    :type provisioning_workers: int (default 8)
+
+    :param warm_pool_size:
+        number of agent containers created in advance and kept running
+        between recipe runs, the containers are disconnected from the recipe
+        networks after a run instead of being destroyed, the agents reset
+        themselves when the controller closes their connections. The
+        containers are destroyed by :py:meth:`destroy` or when the controller
+        exits.
+    :type warm_pool_size: int (default 0)
     """
 
     def __init__(
         self, pools, msg_dispatcher, ctl_config, podman_uri, image,
-        network_plugin='netavark', pool_checks=True
+        network_plugin='netavark', pool_checks=True, provisioning_workers=8,
+        warm_pool_size=0
     ):
         self._import_optionals()
         self._pool = {}
@@ -65,8 +86,23 @@ class ContainerPoolManager(object):
         self._networks = {}
         self._network_prefix = "lnst_container_net_"
         self._start_timeout = 5
+        # the _check_machine retries take up to 30 seconds too
+        self._agent_ready_timeout = 30
         self._pool_check = pool_checks
 
+        self._provisioning_workers = provisioning_workers
+        self._nics_lock = threading.Lock()
+        # (container, network) pairs of the podman network connections
+        self._connections = []
+
+        self._warm_pool_size = warm_pool_size
+        self._idle_containers = []
+        if warm_pool_size:
+            atexit.register(self.destroy)
+            self._run_parallel(
+                self._add_idle_container, [()] * warm_pool_size
+            )
+
     @property
     def image(self):
         return self._image
@@ -162,20 +198,85 @@ class ContainerPoolManager(object):
 
         logging.info(f"Agent process is running at {hostname}")
 
-    @staticmethod
-    def _start_container(container: "Container", machine: Machine):
+    def _start_container(self, container: "Container"):
         logging.debug("Starting container " + container.name)
+        started = int(time())
         container.start()
 
         container.reload()
         container.wait(condition="running")
-        machine._hostname = container.attrs["NetworkSettings"]["Networks"]["podman"][
+        if self._pool_check:
+            self._wait_for_agent(container, started)
+
+    def _wait_for_agent(self, container: "Container", since: int):
+        """Waits until the agent in the container accepts connections
+
+        The container log is followed instead of polling the agent, the agent
+        logs :py:data:`AGENT_READY_MESSAGE` once it is listening. The log is
+        followed in a separate thread as reading it blocks until the
+        container logs something, the wait fails after
+        `_agent_ready_timeout` seconds. The thread ends when the container
+        is stopped.
+        """
+        ready = threading.Event()
+        errors = []
+
+        def follow_log():
+            try:
+                for line in container.logs(
+                    stream=True, follow=True, since=since, stdout=True, stderr=True
+                ):
+                    if isinstance(line, bytes):
+                        line = line.decode(errors="replace")
+                    if AGENT_READY_MESSAGE in line:
+                        ready.set()
+                        return
+            except Exception as e:
+                errors.append(e)
+
+        follower = threading.Thread(
+            target=follow_log, name=f"log-{container.name}", daemon=True
+        )
+        follower.start()
+        follower.join(self._agent_ready_timeout)
+
+        if ready.is_set():
+            logging.debug(f"Agent in container {container.name} is ready")
+            return
+        if follower.is_alive():
+            raise PoolManagerError(
+                f"Agent in container {container.name} wasn't ready in "
+                f"{self._agent_ready_timeout} seconds"
+            )
+        if errors:
+            raise PoolManagerError(
+                f"Could not read the log of container {container.name}: {errors[0]}"
+            )
+        raise PoolManagerError(
+            f"Agent in container {container.name} exited before it was ready"
+        )
+
+    @staticmethod
+    def _container_address(container: "Container"):
+        return container.attrs["NetworkSettings"]["Networks"]["podman"][
             "IPAddress"
         ]
 
-    def _create_container(self, name: str, reqs: dict):
-        logging.info("Creating container " + name)
+    def _new_container(self, hostname: Optional[str] = None):
+        try:
+            container = self._podman_client.containers.create(
+                self.image, hostname=hostname, privileged=True
+            )
+        except APIError as e:
+            raise PoolManagerError(f"Could not create container {hostname}: {e}")
+        return container
 
+    def _add_idle_container(self):
+        container = self._new_container()
+        self._idle_containers.append(container)
+        self._start_container(container)
+
+    def _create_container(self, name: str, reqs: dict):
         if "rpc_port" in reqs:
             rpc_port = reqs["rpc_port"]
         else:
@@ -189,24 +290,27 @@ class ContainerPoolManager(object):
         }
 
         try:
-            container = self._podman_client.containers.create(
-                self.image, hostname=name, privileged=True
-            )
-        except APIError as e:
-            raise PoolManagerError(f"Could not create container {name}: {e}")
+            container = self._idle_containers.pop()
+            logging.info(f"Using warm container {container.name} for {name}")
+        except IndexError:
+            logging.info("Creating container " + name)
+            container = self._new_container(name)
+            # registered before starting, so it's removed if the start fails
+            self._containers[name] = container
+            self._start_container(container)
+        self._containers[name] = container
 
         machine = Machine(
             name,
-            "",
+            self._container_address(container),
             self._msg_dispatcher,
             self._ctl_config,
             None,
             rpc_port,
             self._pool[name]["security"],
             reqs,
-        )  # to get hostname the container needs to run
+        )
 
-        self._start_container(container, machine)
         if self._pool_check:
             self._check_machine(
                 machine
@@ -331,15 +435,15 @@ class ContainerPoolManager(object):
         return network
 
 
-    def _connect_to_network(self, container: "Container", network: Union[dict, "Network"]):
+    def _connect_to_network(self, container: "Container", m_id: str, network: Union[dict, "Network"]):
         if isinstance(network, Network):
-            return self._connect_to_podman_network(container, network)
+            return self._connect_to_podman_network(container, m_id, network)
         elif isinstance(network, dict):
-            return self._connect_to_custom_network(container, network)
+            return self._connect_to_custom_network(container, m_id, network)
         else:
             raise PoolManagerError("Unknown network type")
 
-    def _connect_to_podman_network(self, container: "Container", network: "Network"):
+    def _connect_to_podman_network(self, container: "Container", m_id: str, network: "Network"):
         """There is no way to get MAC address of remote interface except
         executing "ip l" inside container.
         """
@@ -350,6 +454,7 @@ class ContainerPoolManager(object):
             raise PoolManagerError(
                 f"Could not connect {container.name} to {network.name}"
             )
+        self._connections.append((container, network))
 
         container.reload()
 
@@ -369,7 +474,7 @@ class ContainerPoolManager(object):
         if "link_index" in interface:
             eth += f"@{interface['link_index']}"
 
-        machine = self._pool[container.attrs["Config"]["Hostname"]]
+        machine = self._pool[m_id]
         machine["interfaces"][eth] = {
             "params": {"hwaddr": interface["address"], "driver": "veth"},
             "network": network.name,
@@ -377,9 +482,16 @@ class ContainerPoolManager(object):
 
         return True
 
-    def _connect_to_custom_network(self, container: "Container", network: dict):
+    def _connect_to_custom_network(self, container: "Container", m_id: str, network: dict):
+        """Returns the name of the container end of the veth pair, the
+        interface is added to the pool by :py:meth:`_add_custom_interfaces`
+        """
         logging.debug(f"Connecting {container.name} to {network['name']}")
-        nic_root_name, nic_container_name = self._generate_nic_name_pair(network)
+        # the containers are connected in parallel
+        with self._nics_lock:
+            nic_root_name, nic_container_name = self._generate_nic_name_pair(network)
+            network['nics'].append(nic_root_name)
+            network['nics'].append(nic_container_name)
         try:
             res = subprocess.run(
                 f"ip link add {nic_root_name} type veth peer name {nic_container_name}",
@@ -387,8 +499,6 @@ class ContainerPoolManager(object):
                 shell=True,
                 stdout=subprocess.PIPE
             )
-            network['nics'].append(nic_root_name)
-            network['nics'].append(nic_container_name)
         except subprocess.CalledProcessError as e:
             raise PoolManagerError(
                 f"Could not create veth pair for {container.name} to {network['name']}"
@@ -430,8 +540,16 @@ class ContainerPoolManager(object):
                 f"Could not set veth {nic_root_name} up"
             )
 
+        return nic_container_name
+
+    def _add_custom_interfaces(self, container: "Container", m_id: str, nics: dict):
+        """Adds the container ends of the veth pairs to the pool
+
+        :param nics: dictionary of the interface names mapped to the names of
+            their networks
+        """
         logging.debug(
-            f"Getting MAC address of remote interface at {container.name} for {network['name']}"
+            f"Getting MAC addresses of remote interfaces at {container.name}"
         )
         interfaces = loads(
             subprocess.check_output(
@@ -439,18 +557,16 @@ class ContainerPoolManager(object):
             ).decode("utf-8")
         )
         for i in interfaces:
-            if i['ifname'] == nic_container_name:
+            if i['ifname'] in nics:
                 eth = i["ifname"]
                 if "link_index" in i:
                     eth += f"@{i['link_index']}"
-                machine = self._pool[container.attrs["Config"]["Hostname"]]
+                machine = self._pool[m_id]
                 machine["interfaces"][eth] = {
                     "params": {"hwaddr": i["address"], "driver": "veth"},
-                    "network": network['name'],
+                    "network": nics[i['ifname']],
                 }
 
-        return True
-
     def _generate_bridge_name(self):
         i = 0
         while True:
@@ -473,41 +589,134 @@ class ContainerPoolManager(object):
                 return name_candidate_root, name_candidate_container
             i += 1
 
-    def _connect_to_networks(self, container: "Container", network_reqs: dict):
+    def _connect_to_networks(self, container: "Container", m_id: str, network_reqs: dict):
+        custom_nics = {}
         for _, params in network_reqs["interfaces"].items():
             name = params["network"]
             logging.debug(f"Connecting {container.name} to {name}")
 
             network = self._create_network(name, self.network_plugin)
 
-            self._connect_to_network(container, network)
+            nic = self._connect_to_network(container, m_id, network)
+            if isinstance(network, dict):
+                custom_nics[nic] = network["name"]
+
+        # a single exec for all the interfaces of the container
+        if custom_nics:
+            self._add_custom_interfaces(container, m_id, custom_nics)
+
+    def _provision_machine(self, m_id: str, m_reqs: dict):
+        container, machine = self._create_container(m_id, m_reqs)
+        self._connect_to_networks(container, m_id, m_reqs)
+        self._machines[m_id] = machine
+
+    def _run_parallel(self, func, args_list):
+        """Calls func with every item of args_list in a thread pool
+
+        All the calls finish before the first error is raised, so every
+        created container is known to the cleanup.
+        """
+        with ThreadPoolExecutor(max_workers=self._provisioning_workers) as executor:
+            futures = [executor.submit(func, *args) for args in args_list]
+
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()
 
     def process_reqs(self, mreqs: dict):
         """This method is called by :py:class:`lnst.Controller.MachineMapper.ContainerMapper`,
         it is responsible for creating containers and networks.
+
+        The networks are created first, then the containers are created (or
+        taken from the warm pool), started and connected to the networks in
+        parallel. The agent connections are initialized once all the
+        containers are ready.
         """
-        for m_id, m_reqs in mreqs.items():
-            container, machine = self._create_container(m_id, m_reqs)
-            self._connect_to_networks(container, m_reqs)
+        for m_reqs in mreqs.values():
+            for params in m_reqs["interfaces"].values():
+                self._create_network(params["network"], self.network_plugin)
+
+        self._run_parallel(self._provision_machine, list(mreqs.items()))
 
-            self._machines[m_id] = machine
-            self._containers[m_id] = container
-            machine.init_connection()
+        for m_id in mreqs:
+            self._machines[m_id].init_connection()
+
+    @staticmethod
+    def _remove_container(m_id: str, container: "Container"):
+        try:
+            logging.debug("Stopping container " + m_id)
+            container.stop()
+
+            logging.debug("Removing container " + m_id)
+            container.remove()
+        except Exception as e:
+            logging.exception(f"Error during container cleanup: {e}")
 
     def cleanup_containers(self):
         logging.info("Cleaning containers")
 
-        for m_id, container in self._containers.items():
+        self._run_parallel(self._remove_container, self._containers.items())
+
+        self._containers = {}
+
+    def reset_containers(self):
+        """Returns the containers of the last run to the warm pool
+
+        The containers are disconnected from the podman networks, the veth
+        pairs of the custom networks are removed with the networks. The
+        controller connections to the agents are closed, which makes the
+        agents clean up and wait for a new connection, and the containers are
+        returned to the pool once their agents are ready again. Containers
+        exceeding the warm pool size are removed.
+        """
+        logging.info("Resetting containers")
+        since = int(time())
+
+        for container, network in self._connections:
             try:
-                logging.debug("Stopping container " + m_id)
-                container.stop()
+                network.disconnect(container, force=True)
+            except APIError as e:
+                logging.error(
+                    f"Could not disconnect {container.name} from {network.name}: {e}"
+                )
+        self._connections = []
 
-                logging.debug("Removing container " + m_id)
-                container.remove()
-            except Exception as e:
-                logging.exception(f"Error during container cleanup: {e}")
+        reused = []
+        free_slots = self._warm_pool_size - len(self._idle_containers)
+        for m_id, container in self._containers.items():
+            # containers that failed to provision aren't reused
+            if m_id in self._machines and len(reused) < free_slots:
+                self._disconnect_machine(self._machines[m_id])
+                reused.append((m_id, container, since))
+            else:
+                self._remove_container(m_id, container)
+
+        self._run_parallel(self._return_idle_container, reused)
 
         self._containers = {}
+        self._machines = {}
+        self._pool = {}
+
+    def _disconnect_machine(self, machine: Machine):
+        connection = self._msg_dispatcher.get_connection(machine)
+        if connection is None:
+            return
+
+        try:
+            connection.close()
+        except OSError as e:
+            logging.debug(f"Error closing connection to {machine.get_id()}: {e}")
+        self._msg_dispatcher.disconnect_agent(machine)
+
+    def _return_idle_container(self, m_id: str, container: "Container", since: int):
+        try:
+            self._wait_for_agent(container, since)
+        except Exception as e:
+            logging.error(f"Agent in container {m_id} didn't reset: {e}")
+            self._remove_container(m_id, container)
+            return
+
+        self._idle_containers.append(container)
 
     def cleanup_networks(self):
         for name, network in self._networks.items():
@@ -521,12 +730,13 @@ class ContainerPoolManager(object):
                 raise PoolManagerError(f"Can't cleanup this type of network {type(network)}")
 
         self._networks = {}
+        self._connections = []
 
     def _cleanup_podman_network(self, network: "Network"):
         try:
             network.remove(force=True)
         except APIError as e:
-            logging.error(f"Could not remove network {name}: {e}")
+            logging.error(f"Could not remove network {network.name}: {e}")
 
     def _cleanup_custom_network(self, network: dict):
         for nic in network['nics']:
@@ -556,5 +766,26 @@ class ContainerPoolManager(object):
 
 
     def cleanup(self):
-        self.cleanup_containers()
+        if self._warm_pool_size:
+            self.reset_containers()
+        else:
+            self.cleanup_containers()
+        self.cleanup_networks()
+
+    def destroy(self):
+        """Removes all the containers including the warm pool
+
+        Also called at interpreter exit when the warm pool is used, new
+        threads can't be started then, so the containers are removed one by
+        one instead of through :py:meth:`_run_parallel`.
+        """
+        logging.info("Destroying containers")
+        containers = list(self._containers.items())
+        containers.extend(
+            (container.name, container) for container in self._idle_containers
+        )
+        self._containers = {}
+        self._idle_containers = []
+        for m_id, container in containers:
+            self._remove_container(m_id, container)
         self.cleanup_networks()
@@ -10,9 +10,12 @@ olichtne@redhat.com (Ondrej Lichtner)
 
 import os
 import sys
+import pickle
 from typing import Union
 import datetime
 import logging
+import multiprocessing
+from multiprocessing.connection import wait
 from lnst.Common.Logs import LoggingCtl, log_exc_traceback
 from lnst.Common.NetUtils import MacPool
 from lnst.Common.Utils import mkdir_p
@@ -27,6 +30,13 @@ from lnst.Controller.MachineMapper import format_match_description
 from lnst.Controller.Host import Hosts, Host
 from lnst.Controller.Recipe import BaseRecipe, RecipeRun
 from lnst.Controller.RecipeControl import RecipeControl
+from lnst.Controller.RecipeCheckpoint import RecipeCheckpoint
+from lnst.Controller.Sharding import (
+    RecipeShard,
+    disjoint_matches,
+    match_machines,
+    merge_shard_runs,
+)
 
 class Controller(object):
     """Allows to run LNST Recipe instances
@@ -131,7 +141,7 @@ class Controller(object):
             select_pools, self._msg_dispatcher, config, **poolMgr_kwargs
         )
 
-    def run(self, recipe, **kwargs):
+    def run(self, recipe, shards=1, checkpoint=None, resume=False, **kwargs):
         """Execute the provided Recipe
 
         This method takes care of both finding Agent hosts matching the Recipe
@@ -142,6 +152,28 @@ class Controller(object):
             an instantiated Recipe object
         :type recipe: :py:class:`lnst.Controller.Recipe.BaseRecipe`
 
+        :param shards:
+            if greater than 1, the recipe is run once, sharded across up to
+            this many disjoint matches, each of them processing a part of the
+            recipe work items (e.g. the ENRT sub configurations) in a separate
+            controller process with its own logs. The results are merged into
+            a single RecipeRun. Only supported for recipes that are
+            :py:attr:`shardable`, other recipes are run normally.
+        :type shards: int (default 1)
+
+        :param checkpoint:
+            path of a checkpoint file, the results of the completed units of
+            work of recipes that support checkpointing (e.g. the ENRT sub
+            configurations and perf configurations) are appended to it as
+            the run progresses
+        :type checkpoint: str (default None)
+
+        :param resume:
+            if True, the run resumes the run recorded in the *checkpoint*
+            file, the units completed by it are skipped and their results
+            are merged into the new RecipeRun
+        :type resume: bool (default False)
+
         :param kwargs:
             optional keyword arguments passed to the configured Mapper
         :type kwargs: Dict[str, Any]
@@ -157,6 +189,23 @@ class Controller(object):
         self._mapper.set_pools_manager(self._pools)
         self._mapper.set_requirements(req._to_dict())
 
+        if checkpoint is not None:
+            checkpoint = RecipeCheckpoint(checkpoint, recipe, resume)
+            recipe_ctl._set_checkpoint(checkpoint)
+        elif resume:
+            raise ControllerError("Resuming a run requires a checkpoint.")
+
+        if shards > 1:
+            if not recipe.shardable:
+                logging.warning("Recipe {} can't be run sharded, running it "
+                                "normally".format(recipe.__class__.__name__))
+            elif isinstance(self._pools, ContainerPoolManager):
+                logging.warning("Sharded runs are not supported with "
+                                "containers, running the recipe normally")
+            else:
+                self._run_sharded(recipe, shards, **kwargs)
+                return
+
         i = 0
         try:
             for match in self._mapper.matches(**kwargs):
@@ -166,6 +215,10 @@ class Controller(object):
 
                 for line in format_match_description(match).split('\n'):
                     logging.info(line)
+                if checkpoint is not None and i > 1:
+                    # the units of the other matches are checkpointed
+                    # separately
+                    recipe_ctl._set_checkpoint(checkpoint, [("match", i - 1)])
                 try:
                     self._map_match(match, req, recipe)
                     recipe._init_run(RecipeRun(recipe, match, log_dir=self._log_ctl.get_recipe_log_path(),
@@ -184,6 +237,128 @@ class Controller(object):
             if isinstance(self._pools, ContainerPoolManager):
                 self._pools.cleanup()
 
+    def _run_sharded(self, recipe, shards, **kwargs):
+        kwargs["multimatch"] = True
+        # the matches are enumerated lazily, their number grows
+        # combinatorially with the pool size
+        matches = (
+            match for match in self._mapper.matches(**kwargs)
+            if not match["virtual"]
+        )
+        matches = disjoint_matches(matches, shards)
+        if not matches:
+            raise ControllerError("No match usable for a sharded run.")
+
+        recipe_name = recipe.__class__.__name__
+        self._log_ctl.set_recipe(recipe_name, expand="match_0")
+        logging.info("Running {} sharded across {} matches".format(
+                     recipe_name, len(matches)))
+
+        ctx = multiprocessing.get_context("fork")
+        counter = ctx.Value("i", 0)
+        workers = []
+        try:
+            for index, match in enumerate(matches):
+                reader, writer = ctx.Pipe(duplex=False)
+                process = ctx.Process(
+                    target=self._run_shard,
+                    args=(recipe, match, RecipeShard(index, counter), writer),
+                    name="shard_{}".format(index),
+                )
+                process.start()
+                writer.close()
+                workers.append((process, reader))
+
+            shard_runs = self._collect_shards(workers)
+        finally:
+            for process, reader in workers:
+                process.join()
+                reader.close()
+
+        run = merge_shard_runs(recipe, [run for run, _ in shard_runs],
+                               log_dir=self._log_ctl.get_recipe_log_path(),
+                               log_list=self._log_ctl.get_recipe_log_list())
+        recipe._init_run(run)
+        self._log_ctl.unset_recipe()
+
+        for _, connection_state in shard_runs:
+            self._restore_connection_state(connection_state)
+
+        if run.exception is not None:
+            logging.error("Sharded recipe execution terminated by unexpected "
+                          "exception")
+            raise run.exception
+
+    def _collect_shards(self, workers):
+        shard_runs = [None] * len(workers)
+        readers = {reader: index for index, (_, reader) in enumerate(workers)}
+        while readers:
+            for reader in wait(list(readers)):
+                index = readers.pop(reader)
+                try:
+                    shard_runs[index] = pickle.loads(reader.recv_bytes())
+                except EOFError:
+                    raise ControllerError(
+                        "Shard {} terminated without results".format(index)
+                    )
+        return shard_runs
+
+    def _run_shard(self, recipe, match, shard, writer):
+        # the connections of the other shards are used by their processes,
+        # messages from those agents must not be consumed here
+        used = match_machines(match)
+        for pool_name, pool in self._pools.get_machine_pools().items():
+            for m_id, machine in pool.items():
+                if (pool_name, m_id) not in used:
+                    self._msg_dispatcher.remove_connection_by_id(machine)
+
+        recipe_name = recipe.__class__.__name__
+        self._log_ctl.set_recipe(recipe_name,
+                                 expand="match_0_shard_{}".format(shard.index))
+        for line in format_match_description(match).split('\n'):
+            logging.info(line)
+
+        recipe.ctl._set_shard(shard)
+        run = RecipeRun(recipe, match,
+                        log_dir=self._log_ctl.get_recipe_log_path(),
+                        log_list=self._log_ctl.get_recipe_log_list())
+        try:
+            self._map_match(match, recipe.req, recipe)
+            recipe._init_run(run)
+            recipe.test()
+        except Exception as exc:
+            run.exception = exc
+            logging.error("Recipe shard {} terminated by unexpected "
+                          "exception".format(shard.index))
+            log_exc_traceback()
+        finally:
+            self._cleanup_agents()
+
+        # the parent keeps using the connections after the shards finish
+        connection_state = {}
+        pool = self._pools.get_machine_pool(match["pool_name"])
+        for m in match["machines"].values():
+            connection = self._msg_dispatcher.get_connection(pool[m["target"]])
+            if hasattr(connection, "sequence_numbers"):
+                connection_state[(match["pool_name"], m["target"])] = \
+                    connection.sequence_numbers
+
+        try:
+            data = pickle.dumps(((run, shard.items), connection_state))
+        except Exception:
+            run.exception = ControllerError(
+                "Shard {}: {!r}".format(shard.index, run.exception)
+            )
+            data = pickle.dumps(((run, shard.items), connection_state))
+        writer.send_bytes(data)
+        writer.close()
+
+    def _restore_connection_state(self, connection_state):
+        for (pool_name, m_id), sequence_numbers in connection_state.items():
+            machine = self._pools.get_machine_pool(pool_name)[m_id]
+            connection = self._msg_dispatcher.get_connection(machine)
+            connection.sequence_numbers = sequence_numbers
+
     def _map_match(self, match, requested, recipe):
         self._machines = {}
         self._hosts = Hosts()
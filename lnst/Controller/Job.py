@@ -11,11 +11,13 @@ __author__ = """
 olichtne@redhat.com (Ondrej Lichtner)
 """
 
+import time
 import logging
 import signal
 from lnst.Common.BaseModule import BaseModule
 from lnst.Common.JobError import JobError
 from lnst.Controller.RecipeResults import ResultLevel, ResultType
+from lnst.Controller.Machine import run_jobs
 
 DEFAULT_TIMEOUT = 60
 
@@ -40,6 +42,10 @@ class Job(object):
         self._level = level
 
         self._res = None
+        self._ready = False
+        self._start_timestamp = None
+        self._samples = []
+        self._sample_callbacks = []
 
         if self.type == "unknown":
             raise JobError("Unable to run '%s'" % str(what))
@@ -122,6 +128,100 @@ class Job(object):
         except:
             return None
 
+    @property
+    def samples(self):
+        """incremental result samples received while the Job was running
+
+        Type: list
+        Only applicable for Jobs running a test module that sends samples
+        with the send_sample method.
+        """
+        return list(self._samples)
+
+    def subscribe_samples(self, callback):
+        """registers a callback for incremental result samples of the Job
+
+        Args:
+            callback -- callable accepting two arguments, the Job object and
+                the received sample. Callbacks are called by the controller
+                as it processes messages from the agents, e.g. while waiting
+                for a Job to finish.
+        """
+        self._sample_callbacks.append(callback)
+
+    @property
+    def ready(self):
+        """Indicates whether the Job signalled that it's ready
+
+        Type: Boolean
+        Only applicable for Jobs running a test module that signals
+        readiness, e.g. servers listening for clients.
+        """
+        return self._ready
+
+    def wait_for_ready(self, timeout=DEFAULT_TIMEOUT):
+        """waits for the Job to signal that it's ready
+
+        Args:
+            timeout -- integer value indicating how long to wait for.
+                Default is DEFAULT_TIMEOUT.
+        Returns:
+            True if the Job signalled readiness, False if the wait timed out
+            or the Job finished without signalling it.
+        """
+        if self.ready or self.finished:
+            return self.ready
+        if timeout < 0:
+            raise JobError("Negative timeout value not allowed.")
+        self._netns._machine.wait_for_job_ready(self, timeout)
+        return self.ready
+
+    def to_controller_time(self, timestamp):
+        """converts a timestamp taken on the agent running the Job
+
+        Agent side timestamps, e.g. in the Job results, need to be converted
+        with the estimated clock offset of the agent before they're compared
+        with timestamps of other agents or of the controller.
+        """
+        return self._netns._machine.to_controller_time(timestamp)
+
+    @property
+    def start_timestamp(self):
+        """Time the Job actually started on the agent, in controller time
+
+        Type: float or None
+        Only reported by Jobs started with a scheduled start time, see
+        :any:`start_jobs`.
+        """
+        return self._start_timestamp
+
+    def wait_for_start(self, timeout=DEFAULT_TIMEOUT):
+        """waits for the Job to report its scheduled start
+
+        Returns:
+            True if the Job reported its start time, False if the wait timed
+            out or the Job finished without reporting it.
+        """
+        if self.start_timestamp is not None or self.finished:
+            return self.start_timestamp is not None
+        if timeout < 0:
+            raise JobError("Negative timeout value not allowed.")
+        self._netns._machine.wait_for_job_start(self, timeout)
+        return self.start_timestamp is not None
+
+    def _process_event(self, event_type, data):
+        if event_type == "ready":
+            self._ready = True
+        elif event_type == "started":
+            self._start_timestamp = self.to_controller_time(data["timestamp"])
+        elif event_type == "sample":
+            self._samples.append(data)
+            for callback in self._sample_callbacks:
+                callback(self, data)
+        else:
+            logging.debug("Unknown event {} from job {}".format(event_type,
+                                                              self._id))
+
     @property
     def level(self):
         return self._level
@@ -168,7 +268,7 @@ class Job(object):
                 self.kill()
         return self
 
-    def wait(self, timeout=DEFAULT_TIMEOUT):
+    def wait(self, timeout=DEFAULT_TIMEOUT, abort_condition=None):
         """waits for the Job to finish for the specified amount of time
 
         Args:
@@ -178,15 +278,18 @@ class Job(object):
                 jobs...
                 If non-zero LNST uses a timed SIGALARM signal to return from
                 this method.
+            abort_condition -- optional callable, waiting stops early when
+                it returns True. It's evaluated after every message received
+                from the agents.
         Returns:
-            True if the Job finished, False if the Job is still running and
-            the wait method just timed out.
+            True if the Job finished or the abort_condition was met, False
+            if the Job is still running and the wait method just timed out.
         """
         if self.finished:
             return True
         if timeout < 0:
             raise JobError("Negative timeout value not allowed.")
-        return self._netns._machine.wait_for_job(self, timeout)
+        return self._netns._machine.wait_for_job(self, timeout, abort_condition)
 
     def kill(self, signal=signal.SIGKILL):
         """send specified signal to the remotely running Job process
@@ -240,4 +343,44 @@ class Job(object):
         #TODO figure out better place holder values
         state = self.__dict__.copy()
         state['_netns'] = None
+        state['_sample_callbacks'] = []
         return state
+
+
+def start_jobs(jobs, start_delay=None):
+    """starts several Jobs in the background at once
+
+    All the Jobs of the same host and network namespace are started with a
+    single message, the messages to all the hosts are sent before waiting
+    for any of the replies.
+
+    Args:
+        jobs -- list of Job objects, possibly running on different hosts
+        start_delay -- optional number of seconds after the Jobs are
+            prepared when all of them start on the agents, it should cover
+            the time it takes to deliver the messages. The start time is
+            converted to the agent clocks using their estimated clock
+            offsets. The actual start times are available in the
+            start_timestamp property of the Jobs once :any:`wait_for_start`
+            returns.
+    Returns:
+        list of the Job start results, in the order of *jobs*
+    """
+    return run_jobs(jobs, start_delay)
+
+
+def wait_for_start(jobs, timeout=DEFAULT_TIMEOUT):
+    """waits for the scheduled start of Jobs started by :any:`start_jobs`
+
+    Returns:
+        the start skew, the difference between the latest and the earliest
+        start_timestamp of the Jobs in seconds, None if not all of the Jobs
+        reported their start within the timeout
+    """
+    end = time.time() + timeout
+    for job in jobs:
+        if not job.wait_for_start(max(1, int(end - time.time()))):
+            return None
+
+    timestamps = [job.start_timestamp for job in jobs]
+    return max(timestamps) - min(timestamps) if timestamps else 0.0
@@ -12,16 +12,20 @@ rpazdera@redhat.com (Radek Pazdera)
 """
 
 import logging
+import os
+import time
 import socket
 import sys
+import zlib
 from lnst.Common.Utils import sha256sum
 from lnst.Common.Utils import check_process_running
 from lnst.Common.Version import lnst_version
 from lnst.Controller.Common import ControllerError
 from lnst.Controller.CtlSecSocket import CtlSecSocket
+from lnst.Controller.ClockOffset import ClockOffset
 from lnst.Controller.RecipeResults import JobStartResult, JobFinishResult, DeviceCreateResult, DeviceMethodCallResult, DeviceAttrSetResult, ResultType
 from lnst.Controller.AgentProxyObject import AgentProxyObject
-from lnst.Devices import device_classes
+from lnst import Devices
 from lnst.Devices.Device import Device
 from lnst.Devices.RemoteDevice import RemoteDevice
 from lnst.Devices.LoopbackDevice import LoopbackDevice
@@ -36,6 +40,23 @@ class MachineError(ControllerError):
 class PrefixMissingError(ControllerError):
     pass
 
+# seconds after which the clock offset of an agent is measured again
+CLOCK_SYNC_INTERVAL = 300
+
+# file path -> (mtime, size, sha256 digest) of the module files sent to agents
+_file_digests = {}
+
+def _file_digest(file_path):
+    """sha256sum of the file, recomputed only when the file changes"""
+    st = os.stat(file_path)
+    cached = _file_digests.get(file_path)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+
+    digest = sha256sum(file_path)
+    _file_digests[file_path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
 class Machine(object):
     """ Agent machine abstraction
 
@@ -82,6 +103,9 @@ class Machine(object):
         self._bg_cmds = {}
         self._jobs = {}
         self._job_id_seq = 0
+        self._clock = ClockOffset()
+        # netns name -> {module name: digest} of the modules loaded on the agent
+        self._loaded_modules = {}
 
         self._device_database = {}
         self._tmp_device_database = []
@@ -320,6 +344,10 @@ class Machine(object):
         return None
 
     def rpc_call(self, method_name, *args, **kwargs):
+        msg = self._rpc_message(method_name, *args, **kwargs)
+        return self._msg_dispatcher.send_message(self, msg)
+
+    def _rpc_message(self, method_name, *args, **kwargs):
         if kwargs.get("netns") in self._namespaces.values():
             netns = kwargs["netns"]
             del kwargs["netns"]
@@ -336,8 +364,7 @@ class Machine(object):
                    "method_name": method_name,
                    "args": args,
                    "kwargs": kwargs}
-
-        return self._msg_dispatcher.send_message(self, msg)
+        return msg
 
     def init_connection(self, timeout=None):
         """ Initialize the agent connection
@@ -379,10 +406,37 @@ class Machine(object):
                 raise MachineError(msg)
 
         self._agent_desc = agent_desc
+        self.sync_clock()
+
+    def sync_clock(self):
+        """Measures the offset of the agent clock to the controller clock"""
+        offset = self._clock.measure(lambda: self.rpc_call("get_time"))
+        logging.debug("Clock offset of machine %s is %.6f s (+-%.6f s), "
+                      "drift %.3e s/s", self._id, offset, self._clock.error,
+                      self._clock.drift)
+
+    def _sync_clock_if_stale(self):
+        last_sync = self._clock.last_sync
+        if last_sync is None or time.time() - last_sync > CLOCK_SYNC_INTERVAL:
+            self.sync_clock()
+
+    @property
+    def clock_offset(self):
+        """Estimated offset of the agent clock to the controller clock"""
+        return self._clock.offset_at(time.time())
+
+    def to_controller_time(self, timestamp):
+        """Converts a time.time() timestamp taken on the agent to the
+        controller clock"""
+        return self._clock.to_controller_time(timestamp)
+
+    def to_agent_time(self, timestamp):
+        return self._clock.to_agent_time(timestamp)
 
     def prepare_machine(self):
         self.rpc_call("prepare_machine")
         self._device_database = {self._initns: {}}
+        self._loaded_modules = {}
         self._send_device_classes()
         self.rpc_call("init_if_manager")
 
@@ -403,31 +457,60 @@ class Machine(object):
             self._recipe.current_run.add_result(result)
 
     def _send_device_classes(self):
-        for cls_name, cls in device_classes:
-            self.send_class(cls)
+        device_classes = Devices.device_classes
+        self.send_classes([cls for cls_name, cls in device_classes])
 
         for cls_name, cls in device_classes:
             module_name = cls.__module__
             self.rpc_call("map_device_class", cls_name, module_name)
 
     def send_class(self, cls, netns=None):
-        classes = [cls]
-        classes.extend(self._get_base_classes(cls))
+        self.send_classes([cls], netns=netns)
 
-        for cls in reversed(classes):
-            module_name = cls.__module__
+    def send_classes(self, classes, netns=None):
+        """Loads the modules of the classes and their bases on the agent
 
-            if module_name == "builtins":
-                continue
+        The modules are announced with a single manifest of their hashes,
+        only the files missing in the agent cache are transferred and all the
+        modules are loaded with a single call. Modules already loaded in the
+        namespace since the machine was prepared are skipped.
+        """
+        loaded = self._loaded_modules.setdefault(
+            netns.name if netns is not None else None, {}
+        )
+
+        manifest = {}
+        for cls in classes:
+            bases = [cls]
+            bases.extend(self._get_base_classes(cls))
+
+            for base in reversed(bases):
+                module_name = base.__module__
+
+                if module_name == "builtins" or module_name in manifest:
+                    continue
 
-            module = sys.modules[module_name]
-            filename = module.__file__
+                module = sys.modules[module_name]
+                filename = module.__file__
 
-            if filename[-3:] == "pyc":
-                filename = filename[:-1]
+                if filename[-3:] == "pyc":
+                    filename = filename[:-1]
 
-            res_hash = self.sync_resource(module_name, filename, netns=netns)
-            self.rpc_call("load_cached_module", module_name, res_hash, netns=netns)
+                digest = _file_digest(filename)
+                if loaded.get(module_name) == digest:
+                    continue
+                manifest[module_name] = (filename, digest)
+
+        if not manifest:
+            return
+
+        self.sync_resources(
+            [(name, path, digest) for name, (path, digest) in manifest.items()],
+            netns=netns,
+        )
+        modules = [(name, digest) for name, (_, digest) in manifest.items()]
+        self.rpc_call("load_cached_modules", modules, netns=netns)
+        loaded.update(modules)
 
     def is_git_version(self, version):
         try:
@@ -504,6 +587,16 @@ class Machine(object):
         return new_bases
 
     def run_job(self, job):
+        job_result = self._prepare_job(job)
+        job_result.result = ResultType(
+            self.rpc_call("run_job", job._to_dict(), netns=job.netns)
+        )
+
+        return job_result.result
+
+    def _prepare_job(self, job):
+        self._sync_clock_if_stale()
+
         job.id = self._job_id_seq
         self._job_id_seq += 1
         self._jobs[job.id] = job
@@ -523,13 +616,9 @@ class Machine(object):
 
         job_result = JobStartResult(job, ResultType.PASS)
         self._add_recipe_result(job_result)
-        job_result.result = ResultType(
-            self.rpc_call("run_job", job._to_dict(), netns=job.netns)
-        )
-
-        return job_result.result
+        return job_result
 
-    def wait_for_job(self, job, timeout):
+    def wait_for_job(self, job, timeout, abort_condition=None):
         if job.id not in self._jobs:
             raise MachineError("No job '%s' running on Machine %s" %
                                (job.id, self._id))
@@ -542,10 +631,38 @@ class Machine(object):
                          (job.id, self._id))
 
         def condition():
+            if abort_condition is not None and abort_condition():
+                return True
             return job.finished
 
         return self._msg_dispatcher.wait_for_condition(condition, timeout)
 
+    def wait_for_job_ready(self, job, timeout):
+        if job.id not in self._jobs:
+            raise MachineError("No job '%s' running on Machine %s" %
+                               (job.id, self._id))
+
+        logging.debug("Waiting for Job %d on Host %s to be ready." %
+                      (job.id, self._id))
+
+        def condition():
+            return job.ready or job.finished
+
+        return self._msg_dispatcher.wait_for_condition(condition, timeout)
+
+    def wait_for_job_start(self, job, timeout):
+        if job.id not in self._jobs:
+            raise MachineError("No job '%s' running on Machine %s" %
+                               (job.id, self._id))
+
+        logging.debug("Waiting for Job %d on Host %s to start." %
+                      (job.id, self._id))
+
+        def condition():
+            return job.start_timestamp is not None or job.finished
+
+        return self._msg_dispatcher.wait_for_condition(condition, timeout)
+
     def wait_for_tmp_devices(self, timeout):
         if timeout > 0:
             logging.info("Waiting for Device creation Host %s for %d seconds." %
@@ -565,6 +682,15 @@ class Machine(object):
         job._res = msg["result"]
         self._add_recipe_result(JobFinishResult(job))
 
+    def job_event(self, msg):
+        try:
+            job = self._jobs[msg["job_id"]]
+        except KeyError:
+            logging.debug("Event {} for unknown job {} on Machine {}".format(
+                msg["event"], msg["job_id"], self._id))
+            return
+        job._process_event(msg["event"], msg["data"])
+
     def kill(self, job, signal):
         if job.id not in self._jobs:
             raise MachineError("No job '%s' running on Machine %s" %
@@ -612,24 +738,62 @@ class Machine(object):
 
         return self._domain_ctl
 
-    def start_packet_capture(self):
-        namespaces = set()
-        for iface in self._interfaces:
-            namespaces.add(iface.get_netns())
+    def _capture_namespaces(self):
+        return [None] + list(self._namespaces.values())
 
-        tmp = {}
-        for netns in namespaces:
-            tmp.update(self.rpc_call("start_packet_capture", "", netns=netns))
-        return tmp
+    def start_packet_capture(self, filt="", snaplen=None, ring_file_size=None,
+                             ring_file_count=None):
+        """Starts packet capture on all devices of the machine
 
-    def stop_packet_capture(self):
-        namespaces = set()
-        for iface in self._interfaces:
-            namespaces.add(iface.get_netns())
+        Args:
+            filt -- pcap filter expression
+            snaplen -- number of bytes captured from each packet
+            ring_file_size -- size in megabytes after which the capture
+                files are rotated, bounds the capture size together with
+                ring_file_count
+            ring_file_count -- maximum number of rotated files kept per device
+
+        Returns a dictionary mapping namespace names (None for the root
+        namespace) to dictionaries of ifindexes and capture file paths.
+        """
+        files = {}
+        for netns in self._capture_namespaces():
+            files[netns.name if netns else None] = self.rpc_call(
+                "start_packet_capture", filt, snaplen, ring_file_size,
+                ring_file_count, netns=netns)
+        return files
 
-        for netns in namespaces:
+    def stop_packet_capture(self):
+        for netns in self._capture_namespaces():
             self.rpc_call("stop_packet_capture", netns=netns)
 
+    def packet_capture_summary(self, max_flows=100, top_talkers=10):
+        """Returns per flow packet and byte counts and top talkers of the
+        captures, summarized on the agent so that the captures don't have to
+        be transferred
+
+        The result is keyed the same way as in start_packet_capture.
+        """
+        summaries = {}
+        for netns in self._capture_namespaces():
+            summaries[netns.name if netns else None] = self.rpc_call(
+                "packet_capture_summary", max_flows, top_talkers, netns=netns)
+        return summaries
+
+    def packet_capture_segments(self):
+        """Returns the capture files of each device, oldest first, keyed the
+        same way as in start_packet_capture"""
+        segments = {}
+        for netns in self._capture_namespaces():
+            segments[netns.name if netns else None] = self.rpc_call(
+                "packet_capture_segments", netns=netns)
+        return segments
+
+    def copy_packet_capture_segment(self, remote_path, local_path, netns=None):
+        """Retrieves a single capture file compressed"""
+        self.copy_file_from_machine(remote_path, local_path, netns=netns,
+                                    compress=True)
+
     def copy_file_to_machine(self, local_path, remote_path=None, netns=None):
         remote_path = self.rpc_call("start_copy_to", remote_path, netns=netns)
 
@@ -646,28 +810,53 @@ class Machine(object):
 
         return remote_path
 
-    def copy_file_from_machine(self, remote_path, local_path):
-        status = self.rpc_call("start_copy_from", remote_path)
+    def copy_file_from_machine(self, remote_path, local_path, netns=None,
+                               compress=False):
+        status = self.rpc_call("start_copy_from", remote_path, compress,
+                               netns=netns)
         if not status:
             raise MachineError("The requested file cannot be transfered." \
                        "It does not exist on machine %s" % self.get_id())
 
         local_file = open(local_path, "wb")
+        decompressor = zlib.decompressobj() if compress else None
 
         buf_size = 1024*1024 # 1MB buffer
         while True:
-            data: bytes = self.rpc_call("copy_part_from", remote_path, buf_size)
+            data: bytes = self.rpc_call("copy_part_from", remote_path, buf_size,
+                                        netns=netns)
             if not data:
                 break
+            if decompressor is not None:
+                data = decompressor.decompress(data)
             local_file.write(data)
 
+        if decompressor is not None:
+            local_file.write(decompressor.flush())
         local_file.close()
-        self.rpc_call("finish_copy_from", remote_path)
+        self.rpc_call("finish_copy_from", remote_path, netns=netns)
 
     def sync_resource(self, res_name, file_path, netns=None):
-        digest = sha256sum(file_path)
+        digest = _file_digest(file_path)
+        self.sync_resources([(res_name, file_path, digest)], netns=netns)
+        return digest
+
+    def sync_resources(self, resources, netns=None):
+        """Transfers the resources missing in the agent cache
+
+        :param resources: list of (name, file path, sha256 digest) tuples
+        """
+        missing = set(self.rpc_call(
+            "missing_resources", [digest for _, _, digest in resources],
+            netns=netns
+        ))
+
+        for res_name, file_path, digest in resources:
+            if digest not in missing:
+                continue
+            # the same file may be listed under several names
+            missing.discard(digest)
 
-        if not self.rpc_call("has_resource", digest, netns=netns):
             msg = "Transfering %s to machine %s as '%s'" % (file_path,
                                                             self.get_id(),
                                                             res_name)
@@ -676,7 +865,6 @@ class Machine(object):
             remote_path = self.copy_file_to_machine(file_path, netns=netns)
             self.rpc_call("add_resource_to_cache",
                            "file", remote_path, res_name, netns=netns)
-        return digest
 
     def init_remote_class(self, cls, *args, **kwargs):
         module_name = cls.__module__
@@ -692,6 +880,7 @@ class Machine(object):
     def add_netns(self, netns):
         self._namespaces[netns.name] = netns
         self._device_database[netns] = {}
+        self._loaded_modules.pop(netns.name, None)
         return self.rpc_call("add_namespace", netns.name)
 
     def del_netns(self, netns):
@@ -742,3 +931,54 @@ class Machine(object):
                 )
 
         return dev
+
+
+def run_jobs(jobs, start_delay=None):
+    """Runs several jobs with a single command per agent
+
+    The jobs are grouped by the machine and network namespace they run in.
+    The commands of all the groups are sent before any of the results is
+    awaited, so the agents start their jobs concurrently instead of one
+    after another.
+
+    :param jobs: list of Job objects, possibly of several machines
+    :param start_delay: optional number of seconds after all the jobs are
+        prepared (their classes sent to the agents and clocks synchronized)
+        when the jobs start, the start time is converted to the agent clocks
+        using their estimated offsets, the jobs report their actual start
+        time through the "started" event
+    :return: list of the job start results, in the order of *jobs*
+    """
+    batches = {}
+    for job in jobs:
+        batches.setdefault((job.netns._machine, job.netns), []).append(job)
+
+    job_results = {}
+    for (machine, netns), batch in batches.items():
+        for job in batch:
+            job_results[job] = machine._prepare_job(job)
+
+    start_time = None
+    if start_delay is not None:
+        start_time = time.time() + start_delay
+
+    messages = []
+    for (machine, netns), batch in batches.items():
+        job_dicts = []
+        for job in batch:
+            job_dict = job._to_dict()
+            if start_time is not None:
+                job_dict["start_time"] = machine.to_agent_time(start_time)
+            job_dicts.append(job_dict)
+        messages.append(
+            (machine, machine._rpc_message("run_jobs", job_dicts, netns=netns))
+        )
+
+    if messages:
+        dispatcher = messages[0][0]._msg_dispatcher
+        replies = dispatcher.send_messages(messages)
+        for batch, reply in zip(batches.values(), replies):
+            for job, result in zip(batch, reply):
+                job_results[job].result = ResultType(result)
+
+    return [job_results[job].result for job in jobs]
@@ -29,12 +29,85 @@ def format_match_description(match):
                           format(if_id, pool_id))
     return "\n".join(output)
 
+def _params_compatible(req_params, pool_params):
+    for param, value in list(req_params.items()):
+        # skip empty parameters
+        if len(value) == 0:
+            continue
+        if param not in pool_params or value != pool_params[param]:
+            return False
+    return True
+
+
+class _ParamIndex(object):
+    """Index of objects (machines or interfaces) by their parameter values
+
+    :param items: dictionary of the indexed objects, every object has a
+        "params" dictionary
+    """
+    def __init__(self, items):
+        self._items = items
+        self._ids = set(items.keys())
+        self._index = {}
+        for item_id, item in items.items():
+            for param, value in item["params"].items():
+                try:
+                    values = self._index.setdefault(param, {})
+                    values.setdefault(value, set()).add(item_id)
+                except TypeError:
+                    # unhashable values never equal the hashable required
+                    # values, unhashable required values are compared one by
+                    # one
+                    pass
+
+    def lookup(self, req_params):
+        """Returns the set of ids of objects compatible with the params"""
+        result = self._ids
+        for param, value in req_params.items():
+            # skip empty parameters
+            if len(value) == 0:
+                continue
+            try:
+                ids = self._index.get(param, {}).get(value, set())
+            except TypeError:
+                ids = {
+                    item_id for item_id in result
+                    if _params_compatible({param: value},
+                                          self._items[item_id]["params"])
+                }
+            result = result & ids
+            if not result:
+                break
+        return result
+
+
+class _PoolIndex(object):
+    """Precomputed parameter and network label indexes of a pool"""
+    def __init__(self, pool):
+        self.machines = _ParamIndex(pool)
+        self.interfaces = {
+            m_id: _ParamIndex(machine["interfaces"])
+            for m_id, machine in pool.items()
+        }
+        self.networks = {}
+        for m_id, machine in pool.items():
+            labels = self.networks[m_id] = {}
+            for if_id, interface in machine["interfaces"].items():
+                labels.setdefault(interface["network"], set()).add(if_id)
+
+
 class MachineMapper(object):
     """Implements a matching algorithm that maps requirements to available hosts
 
-    In this specific class this is implemented with backtracking, however
-    testers are free to implement their own algorithm as long as they respect
-    the API of this class as it needs to integrate with the rest of LNST.
+    In this specific class this is implemented with a backtracking search
+    over precomputed indexes of the pool machine and interface parameters.
+    The requirement machines and interfaces with the fewest compatible
+    candidates are matched first, every assignment is forward checked so
+    that all of the remaining requirements still have a candidate left and
+    partial assignments known to have no completion are not searched again.
+    Testers are free to implement their own algorithm as long as they
+    respect the API of this class as it needs to integrate with the rest of
+    LNST.
 
     Since the API is not fully defined yet and depends on the interaction with
     the AgentPoolManager (also needs a fully defined API), implementing your
@@ -47,15 +120,16 @@ class MachineMapper(object):
     """
     def __init__(self):
         self._pools = {}
-        self._pool_stack = []
         self._pool = {}
         self._pool_name = None
         self._mreqs = {}
-        self._unmatched_req_machines = []
-        self._matched_pool_machines = []
-        self._machine_stack = []
-        self._net_label_mapping = {}
         self._virtual_matching = False
+        self._pool_indexes = {}
+
+        # state of the current match
+        self._machine_mapping = {}
+        self._if_mapping = {}
+        self._net_label_mapping = {}
 
     def set_requirements(self, mreqs):
         """set the requirements to be used by the matching algorithm
@@ -74,28 +148,13 @@ class MachineMapper(object):
         method of a AgentPoolManager class.
         """
         self._pools = pools_manager.get_pools()
+        self._pool_indexes = {}
 
     def reset_match_state(self):
-        """resets the state of the backtracking algorithm"""
+        """resets the state of the matching algorithm"""
+        self._machine_mapping = {}
+        self._if_mapping = {}
         self._net_label_mapping = {}
-        self._machine_stack = []
-        self._unmatched_req_machines = sorted(list(self._mreqs.keys()), reverse=True)
-
-        self._pool_stack = list(self._pools.keys())
-        if len(self._pool_stack) > 0:
-            self._pool_name = self._pool_stack.pop()
-            self._pool = self._pools[self._pool_name]
-
-        self._unmatched_pool_machines = []
-        for p_id, p_machine in sorted(list(self._pool.items()), reverse=True):
-            if self._virtual_matching:
-                if "libvirt_domain" in p_machine["params"]:
-                    self._unmatched_pool_machines.append(p_id)
-            else:
-                self._unmatched_pool_machines.append(p_id)
-
-        if len(self._pool) > 0 and len(self._mreqs) > 0:
-            self._push_machine_stack()
 
     def matches(self, **kwargs):
         """Generator method which calls the matching algorithm
@@ -107,12 +166,17 @@ class MachineMapper(object):
 
         Returns:
             The matched mapping or requirements to pool Machines.
+
+        The most constrained requirements are matched first and pool
+        machines are tried in the order of their ids, so the first match may
+        differ from the one found by LNST versions before the indexed
+        search. The set of all matches is the same.
         """
         logging.info("Matching machines, without virtuals.")
-        self.reset_match_state()
+        self._virtual_matching = False
         matched = False
 
-        while self._match():
+        for _ in self._match():
             matched = True
             yield self.get_mapping()
             if "multimatch" not in kwargs or not kwargs["multimatch"]:
@@ -122,8 +186,7 @@ class MachineMapper(object):
             logging.info("Match failed for normal machines, falling back "\
                          "to matching virtual machines.")
             self._virtual_matching = True
-            self.reset_match_state()
-            while self._match():
+            for _ in self._match():
                 matched = True
                 yield self.get_mapping()
                 if "multimatch" not in kwargs or not kwargs["multimatch"]:
@@ -133,216 +196,225 @@ class MachineMapper(object):
             raise MapperError(msg)
 
     def _match(self):
-        logging.info("Trying match with pool: %s" % self._pool_name)
-        while len(self._machine_stack)>0:
-            stack_top = self._machine_stack[-1]
-            if self._virtual_matching and stack_top["virt_matched"]:
-                if stack_top["current_match"] != None:
-                    cur_match = stack_top["current_match"]
-                    self._unmatched_pool_machines.append(cur_match)
-                    stack_top["current_match"] = None
-                stack_top["virt_matched"] = False
-
-            if self._if_match():
-                if len(self._unmatched_req_machines) > 0:
-                    self._push_machine_stack()
-                    continue
-                else:
-                    return True
-            else:
-                #unmap the pool machine
-                if stack_top["current_match"] != None:
-                    cur_match = stack_top["current_match"]
-                    self._unmatched_pool_machines.append(cur_match)
-                stack_top["current_match"] = None
-
-                mreq_m_id = stack_top["m_id"]
-                while len(stack_top["remaining_matches"]) > 0:
-                    pool_m_id = stack_top["remaining_matches"].pop()
-                    if self._check_machine_compatibility(mreq_m_id, pool_m_id):
-                        #map compatible pool machine
-                        stack_top["current_match"] = pool_m_id
-                        stack_top["unmatched_pool_ifs"] = \
-                            sorted(list(self._pool[pool_m_id]["interfaces"].keys()),
-                                   reverse=True)
-                        self._unmatched_pool_machines.remove(pool_m_id)
-                        break
-
-                if stack_top["current_match"] != None:
-                    #clear if mapping
-                    stack_top["if_stack"] = []
-                    #next iteration will match the interfaces
-                    if not self._virtual_matching:
-                        self._push_if_stack()
-                    continue
-                else:
-                    self._pop_machine_stack()
-                    if len(self._machine_stack) == 0 and\
-                       len(self._pool_stack) > 0:
-                        logging.info("Match with pool %s not found." %
-                                     self._pool_name)
-                        self._pool_name = self._pool_stack.pop()
-                        self._pool = self._pools[self._pool_name]
-                        logging.info("Trying match with pool: %s" %
-                                     self._pool_name)
-
-                        self._unmatched_pool_machines = []
-                        for p_id, p_machine in sorted(list(self._pool.items()), reverse=True):
-                            if self._virtual_matching:
-                                if "libvirt_domain" in p_machine["params"]:
-                                    self._unmatched_pool_machines.append(p_id)
-                            else:
-                                self._unmatched_pool_machines.append(p_id)
-
-                        if len(self._pool) > 0 and len(self._mreqs) > 0:
-                            self._push_machine_stack()
-                    continue
-        return False
-
-    def _if_match(self):
-        m_stack_top = self._machine_stack[-1]
-        if_stack = m_stack_top["if_stack"]
-
-        if self._virtual_matching:
-            if m_stack_top["current_match"] != None:
-                m_stack_top["virt_matched"] = True
-                return True
-            else:
-                return False
+        """Yields every time a complete match is found in the current state"""
+        self.reset_match_state()
+        if len(self._mreqs) == 0:
+            return
 
-        while len(if_stack) > 0:
-            stack_top = if_stack[-1]
-
-            req_m = self._mreqs[m_stack_top["m_id"]]
-            pool_m = self._pool[m_stack_top["current_match"]]
-            req_if = req_m["interfaces"][stack_top["if_id"]]
-            req_net_label = req_if["network"]
-
-            if stack_top["current_match"] != None:
-                cur_match = stack_top["current_match"]
-                m_stack_top["unmatched_pool_ifs"].append(cur_match)
-                pool_if = pool_m["interfaces"][cur_match]
-                pool_net_label = pool_if["network"]
-                net_label_mapping = self._net_label_mapping[req_net_label]
-                if net_label_mapping == (pool_net_label, m_stack_top["m_id"],
-                                         stack_top["if_id"]):
-                    del self._net_label_mapping[req_net_label]
-            stack_top["current_match"] = None
-
-            while len(stack_top["remaining_matches"]) > 0:
-                pool_if_id = stack_top["remaining_matches"].pop()
-                pool_if = pool_m["interfaces"][pool_if_id]
-                if self._check_interface_compatibility(req_if, pool_if):
-                    #map compatible interfaces
-                    stack_top["current_match"] = pool_if_id
-                    if req_net_label not in self._net_label_mapping:
-                        self._net_label_mapping[req_net_label] =\
-                                                   (pool_if["network"],
-                                                   m_stack_top["m_id"],
-                                                   stack_top["if_id"])
-                    m_stack_top["unmatched_pool_ifs"].remove(pool_if_id)
-                    break
-
-            if stack_top["current_match"] != None:
-                if len(m_stack_top["unmatched_ifs"]) > 0:
-                    self._push_if_stack()
-                    continue
-                else:
-                    return True
-            else:
-                self._pop_if_stack()
+        for pool_name in reversed(list(self._pools.keys())):
+            self._pool_name = pool_name
+            self._pool = self._pools[pool_name]
+            if len(self._pool) == 0:
                 continue
-        return False
 
-    def _push_machine_stack(self):
-        machine_match = {}
-        machine_match["m_id"] = self._unmatched_req_machines.pop()
-        machine_match["current_match"] = None
-        machine_match["remaining_matches"] = list(self._unmatched_pool_machines)
-        machine_match["if_stack"] = []
+            logging.info("Trying match with pool: %s" % pool_name)
+            if pool_name not in self._pool_indexes:
+                self._pool_indexes[pool_name] = _PoolIndex(self._pool)
+            self._index = self._pool_indexes[pool_name]
 
-        machine = self._mreqs[machine_match["m_id"]]
-        machine_match["unmatched_ifs"] = sorted(list(machine["interfaces"].keys()),
-                                                reverse=True)
-        machine_match["unmatched_pool_ifs"] = []
-
-        if self._virtual_matching:
-            machine_match["virt_matched"] = False
+            self._if_candidates = {}
+            candidates = {
+                m_id: self._machine_candidates(m_id) for m_id in self._mreqs
+            }
 
-        self._machine_stack.append(machine_match)
+            self._failed = set()
+            self._failed_interfaces = set()
+            found = False
+            for _ in self._match_machines(frozenset(self._mreqs), candidates,
+                                          set()):
+                found = True
+                yield
 
-    def _pop_machine_stack(self):
-        stack_top = self._machine_stack.pop()
-        self._unmatched_req_machines.append(stack_top["m_id"])
+            if not found:
+                logging.info("Match with pool %s not found." % pool_name)
+            self.reset_match_state()
 
-    def _push_if_stack(self):
-        m_stack_top = self._machine_stack[-1]
-        if_match = {}
-        if_match["if_id"] = m_stack_top["unmatched_ifs"].pop()
-        if_match["current_match"] = None
-        if_match["remaining_matches"] = list(m_stack_top["unmatched_pool_ifs"])
+    def _machine_candidates(self, m_id):
+        req_m = self._mreqs[m_id]
+        result = set()
+        for pool_m_id in self._index.machines.lookup(req_m["params"]):
+            pool_m = self._pool[pool_m_id]
+            if self._virtual_matching:
+                if "libvirt_domain" in pool_m["params"]:
+                    result.add(pool_m_id)
+                continue
 
-        m_stack_top["if_stack"].append(if_match)
+            if len(pool_m["interfaces"]) < len(req_m["interfaces"]):
+                continue
+            if_index = self._index.interfaces[pool_m_id]
+            if_candidates = {
+                if_id: if_index.lookup(req_if["params"])
+                for if_id, req_if in req_m["interfaces"].items()
+            }
+            if all(if_candidates.values()):
+                self._if_candidates[(m_id, pool_m_id)] = if_candidates
+                result.add(pool_m_id)
+        return result
 
-    def _pop_if_stack(self):
-        m_stack_top = self._machine_stack[-1]
-        if_stack_top = m_stack_top["if_stack"].pop()
-        m_stack_top["unmatched_ifs"].append(if_stack_top["if_id"])
+    def _viable(self, m_id, pool_m_id):
+        """Checks the pool machine against the current network mapping
 
-    def _check_machine_compatibility(self, req_id, pool_id):
-        req_machine = self._mreqs[req_id]
-        pool_machine = self._pool[pool_id]
-        for param, value in list(req_machine["params"].items()):
-            # skip empty parameters
-            if len(value) == 0:
-                continue
-            if param not in pool_machine["params"] or\
-               value != pool_machine["params"][param]:
+        Every required interface needs a compatible pool interface on the
+        mapped network, or on a network not mapped yet.
+        """
+        if self._virtual_matching:
+            return True
+
+        req_ifs = self._mreqs[m_id]["interfaces"]
+        pool_ifs = self._pool[pool_m_id]["interfaces"]
+        pool_labels = self._index.networks[pool_m_id]
+        mapped_pool_labels = set(self._net_label_mapping.values())
+        for if_id, if_candidates in self._if_candidates[(m_id, pool_m_id)].items():
+            mapped_label = self._net_label_mapping.get(req_ifs[if_id]["network"])
+            if mapped_label is not None:
+                if not if_candidates & pool_labels.get(mapped_label, set()):
+                    return False
+            elif all(pool_ifs[pool_if_id]["network"] in mapped_pool_labels
+                     for pool_if_id in if_candidates):
                 return False
         return True
 
-    def _check_interface_compatibility(self, req_if, pool_if):
-        label_mapping = self._net_label_mapping
-        for req_label, mapping in list(label_mapping.items()):
-            if req_label == req_if["network"] and\
-               mapping[0] != pool_if["network"]:
-                return False
-            if mapping[0] == pool_if["network"] and\
-               req_label != req_if["network"]:
-                return False
-        for param, value in list(req_if["params"].items()):
-            # skip empty parameters
-            if len(value) == 0:
-                continue
-            if param not in pool_if["params"] or\
-               value != pool_if["params"][param]:
-                return False
-        return True
+    def _match_machines(self, remaining, candidates, used):
+        if not remaining:
+            yield
+            return
+
+        key = (remaining, frozenset(used),
+               frozenset(self._net_label_mapping.items()))
+        if key in self._failed:
+            return
+
+        # forward check, every remaining machine needs a viable candidate and
+        # together they need enough distinct ones
+        viable = {}
+        for m_id in remaining:
+            viable[m_id] = sorted(
+                pool_m_id for pool_m_id in candidates[m_id]
+                if pool_m_id not in used and self._viable(m_id, pool_m_id)
+            )
+            if not viable[m_id]:
+                self._failed.add(key)
+                return
+        if len(set().union(*viable.values())) < len(remaining):
+            self._failed.add(key)
+            return
+
+        # most constrained machine first
+        m_id = min(remaining, key=lambda m_id: (len(viable[m_id]), m_id))
+        found = False
+        for pool_m_id in viable[m_id]:
+            used.add(pool_m_id)
+            self._machine_mapping[m_id] = pool_m_id
+            for _ in self._match_interfaces(m_id, pool_m_id):
+                for _ in self._match_machines(remaining - {m_id},
+                                              candidates, used):
+                    found = True
+                    yield
+            del self._machine_mapping[m_id]
+            used.remove(pool_m_id)
+
+        if not found:
+            self._failed.add(key)
+
+    def _match_interfaces(self, m_id, pool_m_id):
+        if self._virtual_matching:
+            self._if_mapping[m_id] = {}
+            yield
+            del self._if_mapping[m_id]
+            return
+
+        key = (m_id, pool_m_id, frozenset(self._net_label_mapping.items()))
+        if key in self._failed_interfaces:
+            return
+
+        self._if_mapping[m_id] = {}
+        found = False
+        try:
+            for _ in self._match_next_interface(
+                m_id, pool_m_id, self._if_candidates[(m_id, pool_m_id)], set()
+            ):
+                found = True
+                yield
+        finally:
+            del self._if_mapping[m_id]
+
+        if not found:
+            self._failed_interfaces.add(key)
+
+    def _interface_choices(self, m_id, pool_m_id, if_id, candidates, used):
+        """Candidate pool interfaces consistent with the network mapping"""
+        req_label = self._mreqs[m_id]["interfaces"][if_id]["network"]
+        pool_labels = self._index.networks[pool_m_id]
+        mapped_label = self._net_label_mapping.get(req_label)
+
+        if mapped_label is not None:
+            choices = candidates[if_id] & pool_labels.get(mapped_label, set())
+        else:
+            mapped_pool_labels = set(self._net_label_mapping.values())
+            choices = {
+                pool_if_id for pool_if_id in candidates[if_id]
+                if self._pool[pool_m_id]["interfaces"][pool_if_id]["network"]
+                not in mapped_pool_labels
+            }
+        return choices - used
+
+    def _match_next_interface(self, m_id, pool_m_id, candidates, used):
+        if_mapping = self._if_mapping[m_id]
+        remaining = [if_id for if_id in candidates if if_id not in if_mapping]
+        if not remaining:
+            yield
+            return
+
+        choices = {
+            if_id: self._interface_choices(m_id, pool_m_id, if_id,
+                                           candidates, used)
+            for if_id in remaining
+        }
+        # forward check, every remaining interface needs a candidate
+        if not all(choices.values()):
+            return
+
+        # most constrained interface first
+        if_id = min(remaining, key=lambda i: (len(choices[i]), i))
+        req_label = self._mreqs[m_id]["interfaces"][if_id]["network"]
+        for pool_if_id in sorted(choices[if_id]):
+            pool_label = self._pool[pool_m_id]["interfaces"][pool_if_id]["network"]
+            new_label = req_label not in self._net_label_mapping
+            if new_label:
+                self._net_label_mapping[req_label] = pool_label
+            if_mapping[if_id] = pool_if_id
+            used.add(pool_if_id)
+
+            yield from self._match_next_interface(m_id, pool_m_id,
+                                                  candidates, used)
+
+            used.remove(pool_if_id)
+            del if_mapping[if_id]
+            if new_label:
+                del self._net_label_mapping[req_label]
 
     def get_mapping(self):
         mapping = {"machines": {}, "networks": {}, "virtual": False,
                    "pool_name": self._pool_name}
 
-        for req_label, label_map in list(self._net_label_mapping.items()):
-            mapping["networks"][req_label] = label_map[0]
+        for req_label, pool_label in list(self._net_label_mapping.items()):
+            mapping["networks"][req_label] = pool_label
 
-        for machine in self._machine_stack:
-            m_map = mapping["machines"][machine["m_id"]] = {}
+        for m_id, pool_m_id in sorted(self._machine_mapping.items()):
+            m_map = mapping["machines"][m_id] = {}
 
-            m_map["target"] = machine["current_match"]
+            m_map["target"] = pool_m_id
 
             hostname = self._pool[m_map["target"]]["params"]["hostname"]
             m_map["hostname"] = hostname
 
             interfaces = m_map["interfaces"] = {}
-            if_stack = machine["if_stack"]
-            for interface in if_stack:
-                i = interfaces[interface["if_id"]] = {}
-                i["target"] = interface["current_match"]
+            for if_id, pool_if_id in sorted(self._if_mapping[m_id].items()):
+                i = interfaces[if_id] = {}
+                i["target"] = pool_if_id
                 pool_if = self._pool[m_map["target"]]["interfaces"][i["target"]]
                 i["hwaddr"] = pool_if["params"]["hwaddr"]
 
-
         if self._virtual_matching:
             mapping["virtual"] = True
         return mapping
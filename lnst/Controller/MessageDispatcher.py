@@ -17,6 +17,7 @@ olichtne@redhat.com (Ondrej Lichtner)
 import logging
 import copy
 import signal
+from collections import deque
 from lnst.Common.ConnectionHandler import send_data
 from lnst.Common.ConnectionHandler import ConnectionHandler
 from lnst.Common.Parameters import Parameters
@@ -135,6 +136,45 @@ class MessageDispatcher(ConnectionHandler):
                 netns = data.get("netns", None)
                 return deviceref_to_remote_device(machine, result["result"], netns)
 
+    def send_messages(self, messages):
+        """Sends messages to several agents and waits for all the results
+
+        All of the messages are sent before any of the results is awaited,
+        so the agents process them concurrently. Several messages can be
+        sent to the same agent, its results arrive in the order of the
+        messages.
+
+        :param messages: list of (machine, message data) tuples
+        :return: list of the results, in the order of *messages*
+        """
+        pending = {}
+        for index, (machine, data) in enumerate(messages):
+            soc = self.get_connection(machine)
+            if send_data(soc, remote_device_to_deviceref(data)) == False:
+                msg = "Connection error from agent %s" % machine.get_id()
+                raise ConnectionError(msg)
+            pending.setdefault(machine, deque()).append(index)
+
+        results = [None] * len(messages)
+        while any(pending.values()):
+            connected_agents = list(self._connection_mapping.keys())
+
+            for msg in self.check_connections():
+                if msg[1]["type"] == "result" and pending.get(msg[0]):
+                    index = pending[msg[0]].popleft()
+                    netns = messages[index][1].get("netns", None)
+                    results[index] = deviceref_to_remote_device(
+                        msg[0], msg[1]["result"], netns
+                    )
+                else:
+                    self._process_message(msg)
+
+            remaining_agents = list(self._connection_mapping.keys())
+            if connected_agents != remaining_agents:
+                self._handle_disconnects(set(connected_agents)-
+                                         set(remaining_agents))
+        return results
+
     def wait_for_condition(self, condition_check, timeout=0):
         res = True
         prev_handler = signal.signal(signal.SIGALRM, _timeout_handler)
@@ -225,6 +265,9 @@ class MessageDispatcher(ConnectionHandler):
         elif message[1]["type"] == "job_finished":
             machine = self._machines[message[0]]
             machine.job_finished(message[1])
+        elif message[1]["type"] == "job_event":
+            machine = self._machines[message[0]]
+            machine.job_event(message[1])
         else:
             msg = "Unknown message type: %s" % message[1]["type"]
             raise ConnectionError(msg)
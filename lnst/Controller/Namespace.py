@@ -94,7 +94,12 @@ class Namespace(object):
         return self._machine.copy_file_to_machine(local_path, remote_path, self)
 
     def copy_file_from_machine(self, remote_path: str, local_path: str):
-        self._machine.copy_file_from_machine(remote_path, local_path)
+        self._machine.copy_file_from_machine(remote_path, local_path,
+                                             netns=self)
+
+    def remove_raw_output(self, remote_path: str):
+        return self._machine.rpc_call("remove_raw_output", remote_path,
+                                      netns=self)
 
     def prepare_job(self, what, fail=False, json=False, desc=None,
                     job_level=ResultLevel.DEBUG):
@@ -145,6 +145,15 @@ class BaseRecipe(object):
         """Method to be implemented by the Tester"""
         raise NotImplementedError("Method test must be defined by a child class.")
 
+    @property
+    def shardable(self):
+        """Whether the recipe can be run sharded across several matches
+
+        Only recipes that iterate their work items through
+        `self.ctl.shard_items` can be sharded.
+        """
+        return False
+
     def _init_run(self, run):
         self.runs.append(run)
 
@@ -0,0 +1,150 @@
+"""
+This module implements the on-disk checkpoint of a recipe run that allows
+resuming an interrupted run without repeating the completed units of work.
+
+The checkpoint is an append-only file of pickled records, the first record
+identifies the recipe and its parameters and every following record contains
+the key of a completed unit (e.g. a sub configuration or a perf configuration)
+and the results it added to the RecipeRun.
+
+Copyright 2025 Red Hat, Inc.
+Licensed under the GNU General Public License, version 2 as
+published by the Free Software Foundation; see COPYING for details.
+"""
+
+import os
+import pickle
+import hashlib
+import logging
+
+from lnst.Controller.Recipe import RecipeError
+
+
+def _stable_repr(value):
+    """repr of a parameter value that doesn't change between processes"""
+    if isinstance(value, dict):
+        items = sorted(
+            (_stable_repr(k), _stable_repr(v)) for k, v in value.items()
+        )
+        return "{" + ", ".join("{}: {}".format(k, v) for k, v in items) + "}"
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_stable_repr(item) for item in value]
+        if isinstance(value, (set, frozenset)):
+            items.sort()
+        return "{}({})".format(type(value).__name__, ", ".join(items))
+    if isinstance(value, type) or callable(value):
+        return "{}.{}".format(getattr(value, "__module__", ""),
+                              getattr(value, "__qualname__", repr(value)))
+    if type(value).__repr__ is object.__repr__:
+        # the default repr contains the object address
+        return "{}.{}".format(type(value).__module__,
+                              type(value).__qualname__)
+    return repr(value)
+
+
+def params_digest(recipe):
+    """Digest of the recipe parameters, identifies the units of a run"""
+    params = _stable_repr(recipe.params._to_dict())
+    return hashlib.sha256(params.encode()).hexdigest()
+
+
+class CheckpointUnit(object):
+    """A unit of work of a checkpointed recipe run
+
+    :ivar key: the full key of the unit, including the keys of the units
+        it's nested in
+    :ivar completed: True if the unit was completed by a previous run and its
+        results were restored
+    """
+    def __init__(self, key, completed):
+        self.key = key
+        self.completed = completed
+
+
+class RecipeCheckpoint(object):
+    """Append-only checkpoint file of a recipe run
+
+    :param path: path of the checkpoint file
+    :param recipe: the checkpointed recipe
+    :param resume: if True, the units recorded in an existing checkpoint file
+        are loaded and new units are appended to it, otherwise the file is
+        truncated
+    """
+    def __init__(self, path, recipe, resume=False):
+        self._path = path
+        self._recipe_name = recipe.__class__.__name__
+        self._params_digest = params_digest(recipe)
+        self._completed = {}
+
+        if resume and os.path.exists(path):
+            self._load()
+        else:
+            with open(path, "wb") as f:
+                pickle.dump({"recipe": self._recipe_name,
+                             "params": self._params_digest}, f)
+
+    @property
+    def path(self):
+        return self._path
+
+    def completed(self, key):
+        """Returns the results of a completed unit, None if not completed"""
+        return self._completed.get(key)
+
+    def record(self, key, results):
+        """Appends a completed unit with its results to the checkpoint
+
+        The record is written with a single write call, so records of
+        several shards appending to the same checkpoint don't interleave.
+        """
+        data = pickle.dumps((key, list(results)))
+        fd = os.open(self._path, os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._completed[key] = list(results)
+
+    def _load(self):
+        with open(self._path, "rb") as f:
+            try:
+                header = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError):
+                raise RecipeError(
+                    "Checkpoint {} is corrupted".format(self._path)
+                )
+            if header.get("recipe") != self._recipe_name:
+                raise RecipeError(
+                    "Checkpoint {} belongs to recipe {}, not {}".format(
+                        self._path, header.get("recipe"), self._recipe_name
+                    )
+                )
+            if header.get("params") != self._params_digest:
+                # the units are keyed by their index, with different
+                # parameters the same keys refer to different work
+                raise RecipeError(
+                    "Checkpoint {} was recorded with different parameters "
+                    "of recipe {}, refusing to resume".format(
+                        self._path, self._recipe_name
+                    )
+                )
+
+            valid_size = f.tell()
+            while True:
+                try:
+                    key, results = pickle.load(f)
+                except EOFError:
+                    break
+                except Exception:
+                    # the last record may be cut short by a crash
+                    logging.warning("Ignoring incomplete checkpoint record "
+                                    "in {}".format(self._path))
+                    break
+                self._completed[key] = results
+                valid_size = f.tell()
+
+        # new records must follow the last complete one
+        os.truncate(self._path, valid_size)
+        logging.info("Loaded {} completed units from checkpoint {}".format(
+                     len(self._completed), self._path))
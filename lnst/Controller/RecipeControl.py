@@ -1,18 +1,89 @@
 import time
 import logging
+from contextlib import contextmanager
 from lnst.Common.Logs import log_exc_traceback
 from lnst.Controller.Machine import Machine
 from lnst.Controller.Host import Host
+from lnst.Controller.RecipeCheckpoint import CheckpointUnit
 
 class RecipeControl(object):
     def __init__(self, controller, recipe):
         self._controller = controller
         self._recipe = recipe
+        self._shard = None
+        self._checkpoint = None
+        self._units = []
 
     @property
     def hosts(self):
         return self._controller._hosts
 
+    @property
+    def shard(self):
+        """The RecipeShard of a sharded run, None otherwise"""
+        return self._shard
+
+    def _set_shard(self, shard):
+        self._shard = shard
+
+    @property
+    def checkpoint(self):
+        """The RecipeCheckpoint of a checkpointed run, None otherwise"""
+        return self._checkpoint
+
+    def _set_checkpoint(self, checkpoint, key_prefix=()):
+        self._checkpoint = checkpoint
+        self._units = list(key_prefix)
+
+    @contextmanager
+    def checkpoint_unit(self, key):
+        """Context manager of a unit of work of a checkpointed run
+
+        The key must identify the unit deterministically between runs, e.g.
+        by its index, units can be nested, the key of a nested unit is
+        prefixed with the keys of the enclosing units.
+
+        If the unit was completed by the resumed run, its results are added to
+        the current run again and the yielded CheckpointUnit is marked as
+        completed, the caller is expected to skip the unit. Otherwise the
+        results added by the unit are recorded to the checkpoint when the
+        context exits without an exception.
+        """
+        self._units.append(key)
+        try:
+            full_key = tuple(self._units)
+            checkpoint = self._checkpoint
+            if checkpoint is None:
+                yield CheckpointUnit(full_key, False)
+                return
+
+            run = self._recipe.current_run
+            results = checkpoint.completed(full_key)
+            if results is not None:
+                logging.info("Skipping unit {} completed by the resumed "
+                             "run".format(full_key))
+                for result in results:
+                    run.add_result(result)
+                yield CheckpointUnit(full_key, True)
+                return
+
+            start = len(run.results)
+            yield CheckpointUnit(full_key, False)
+            checkpoint.record(full_key, run.results[start:])
+        finally:
+            self._units.pop()
+
+    def shard_items(self, items):
+        """Yields the work items to be processed by this controller
+
+        Returns all of the items unless the recipe is run sharded, then only
+        the items claimed by the current shard are yielded. The items must be
+        generated in the same order by every shard.
+        """
+        if self._shard is None:
+            return iter(items)
+        return self._shard.iterate(items, self._recipe.current_run)
+
     def wait(self, sec):
         finish_time = time.time() + sec
         logging.info("Suspending recipe execution for {} seconds, "
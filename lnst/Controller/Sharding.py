@@ -0,0 +1,122 @@
+"""
+This module implements the sharded execution of a recipe, where the work items
+of a single recipe run (e.g. the ENRT sub configurations) are distributed
+between several disjoint matches of the recipe requirements.
+
+Every shard runs in a forked controller process with its own match and logs,
+the shards take the work items from a shared counter, so they work as a work
+queue. The results of the shards are merged into a single RecipeRun.
+
+Copyright 2025 Red Hat, Inc.
+Licensed under the GNU General Public License, version 2 as
+published by the Free Software Foundation; see COPYING for details.
+"""
+
+from lnst.Controller.Recipe import RecipeRun
+
+
+def match_machines(match):
+    """Returns the set of (pool name, machine) pairs used by a match"""
+    return {
+        (match["pool_name"], m["target"]) for m in match["machines"].values()
+    }
+
+
+def disjoint_matches(matches, count):
+    """Picks up to `count` matches that don't share any machine"""
+    picked = []
+    used = set()
+    for match in matches:
+        machines = match_machines(match)
+        if machines & used:
+            continue
+        picked.append(match)
+        used |= machines
+        if len(picked) == count:
+            break
+    return picked
+
+
+class RecipeShard(object):
+    """State of a single shard of a sharded recipe run
+
+    :param index: index of the shard
+    :param counter: multiprocessing.Value shared by all shards of the run,
+        the index of the next unclaimed work item
+    """
+    def __init__(self, index, counter):
+        self.index = index
+        self._counter = counter
+        # [work item index, first result, end of results] of the claimed items
+        self.items = []
+
+    def claim(self):
+        with self._counter.get_lock():
+            item = self._counter.value
+            self._counter.value += 1
+        return item
+
+    def iterate(self, items, run):
+        """Yields only the items claimed by this shard
+
+        The items must be generated in the same order by all shards. The
+        results added to `run` while an item is processed are recorded so
+        they can be ordered by the item index when the shard runs are merged.
+        """
+        next_item = self.claim()
+        for index, item in enumerate(items):
+            if index != next_item:
+                continue
+            self.items.append([index, len(run.results), None])
+            yield item
+            self.items[-1][2] = len(run.results)
+            next_item = self.claim()
+
+
+def merge_shard_runs(recipe, shard_runs, log_dir=None, log_list=None):
+    """Merges the RecipeRuns of the shards into a single RecipeRun
+
+    The results of the claimed work items are ordered by their index, the
+    results added before the first (e.g. the test wide configuration) and
+    after the last work item of every shard are kept in the shard order.
+
+    The match of the merged run is the match of the first shard, the matches
+    of all the shards are available in its `shard_matches` attribute.
+
+    :param shard_runs: list of (RecipeRun, RecipeShard.items) tuples of the
+        shards, in the shard order
+    """
+    prefixes = []
+    items = []
+    suffixes = []
+    for run, shard_items in shard_runs:
+        results = run.results
+        if not shard_items:
+            prefixes.extend(results)
+            continue
+
+        prefixes.extend(results[:shard_items[0][1]])
+        for index, start, end in shard_items:
+            # an item without an end was interrupted by an exception, all
+            # the remaining results belong to it
+            items.append((index, results[start:end]))
+        if shard_items[-1][2] is not None:
+            suffixes.extend(results[shard_items[-1][2]:])
+
+    matches = [run.match for run, _ in shard_runs]
+    merged = RecipeRun(recipe, matches[0], log_dir=log_dir, log_list=log_list)
+    merged.shard_matches = matches
+    for result in prefixes:
+        merged.add_result(result)
+    for _, results in sorted(items, key=lambda item: item[0]):
+        for result in results:
+            merged.add_result(result)
+    for result in suffixes:
+        merged.add_result(result)
+
+    for run, _ in shard_runs:
+        if run.exception is not None:
+            merged.exception = run.exception
+            break
+
+    return merged
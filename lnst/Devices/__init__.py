@@ -1,52 +1,49 @@
-from lnst.Common.DeviceError import DeviceError
-from lnst.Devices.Device import Device
-from lnst.Devices.LoopbackDevice import LoopbackDevice
-from lnst.Devices.BridgeDevice import BridgeDevice
-from lnst.Devices.OvsBridgeDevice import OvsBridgeDevice
-from lnst.Devices.BondDevice import BondDevice
-from lnst.Devices.TeamDevice import TeamDevice
-from lnst.Devices.MacvlanDevice import MacvlanDevice
-from lnst.Devices.VlanDevice import VlanDevice
-from lnst.Devices.VxlanDevice import VxlanDevice
-from lnst.Devices.GeneveDevice import GeneveDevice
-from lnst.Devices.GreDevice import GreDevice
-from lnst.Devices.Ip6GreDevice import Ip6GreDevice
-from lnst.Devices.SitDevice import SitDevice
-from lnst.Devices.IpIpDevice import IpIpDevice
-from lnst.Devices.Ip6TnlDevice import Ip6TnlDevice
-from lnst.Devices.VtiDevice import VtiDevice, Vti6Device
-from lnst.Devices.VethDevice import VethDevice, PairedVethDevice
-from lnst.Devices.VethPair import VethPair
-from lnst.Devices.MacsecDevice import MacsecDevice
-from lnst.Devices.L2TPSessionDevice import L2TPSessionDevice
-from lnst.Devices.RemoteDevice import RemoteDevice, remotedev_decorator
+from functools import partial
+from importlib import import_module
+from lnst.Common.LazyImport import lazy_package
 
-device_classes = [
-        ("Device", Device),
-        ("LoopbackDevice", LoopbackDevice),
-        ("BridgeDevice", BridgeDevice),
-        ("OvsBridgeDevice", OvsBridgeDevice),
-        ("MacvlanDevice", MacvlanDevice),
-        ("VlanDevice", VlanDevice),
-        ("VxlanDevice", VxlanDevice),
-        ("GeneveDevice", GeneveDevice),
-        ("GreDevice", GreDevice),
-        ("Ip6GreDevice", Ip6GreDevice),
-        ("SitDevice", SitDevice),
-        ("IpIpDevice", IpIpDevice),
-        ("Ip6TnlDevice", Ip6TnlDevice),
-        ("VethDevice", VethDevice),
-        ("PairedVethDevice", PairedVethDevice),
-        ("VtiDevice", VtiDevice),
-        ("Vti6Device", Vti6Device),
-        ("BondDevice", BondDevice),
-        ("TeamDevice", TeamDevice),
-        ("MacsecDevice", MacsecDevice),
-        ("L2TPSessionDevice", L2TPSessionDevice)]
+# the device modules are imported on first access of the device classes
+_device_modules = [
+        ("Device", "lnst.Devices.Device"),
+        ("LoopbackDevice", "lnst.Devices.LoopbackDevice"),
+        ("BridgeDevice", "lnst.Devices.BridgeDevice"),
+        ("OvsBridgeDevice", "lnst.Devices.OvsBridgeDevice"),
+        ("MacvlanDevice", "lnst.Devices.MacvlanDevice"),
+        ("VlanDevice", "lnst.Devices.VlanDevice"),
+        ("VxlanDevice", "lnst.Devices.VxlanDevice"),
+        ("GeneveDevice", "lnst.Devices.GeneveDevice"),
+        ("GreDevice", "lnst.Devices.GreDevice"),
+        ("Ip6GreDevice", "lnst.Devices.Ip6GreDevice"),
+        ("SitDevice", "lnst.Devices.SitDevice"),
+        ("IpIpDevice", "lnst.Devices.IpIpDevice"),
+        ("Ip6TnlDevice", "lnst.Devices.Ip6TnlDevice"),
+        ("VethDevice", "lnst.Devices.VethDevice"),
+        ("PairedVethDevice", "lnst.Devices.VethDevice"),
+        ("VtiDevice", "lnst.Devices.VtiDevice"),
+        ("Vti6Device", "lnst.Devices.VtiDevice"),
+        ("BondDevice", "lnst.Devices.BondDevice"),
+        ("TeamDevice", "lnst.Devices.TeamDevice"),
+        ("MacsecDevice", "lnst.Devices.MacsecDevice"),
+        ("L2TPSessionDevice", "lnst.Devices.L2TPSessionDevice")]
 
-for name, cls in device_classes:
-    globals()[name] = remotedev_decorator(cls)
+def _device_classes():
+    return [(name, getattr(import_module(module_name), name))
+            for name, module_name in _device_modules]
 
-#Remove the PairedVethDevice from globals... doesn't make sense to use it on
+def _remote_device_class(name, module_name):
+    from lnst.Devices.RemoteDevice import remotedev_decorator
+    return remotedev_decorator(getattr(import_module(module_name), name))
+
+#The PairedVethDevice isn't exported... doesn't make sense to use it on
 #it's own, not even for isinstance... VethDevice works fine for that
-del globals()["PairedVethDevice"]
+_attributes = {name: partial(_remote_device_class, name, module_name)
+               for name, module_name in _device_modules
+               if name != "PairedVethDevice"}
+_attributes.update({
+        "DeviceError": "lnst.Common.DeviceError",
+        "VethPair": "lnst.Devices.VethPair",
+        "RemoteDevice": "lnst.Devices.RemoteDevice",
+        "remotedev_decorator": "lnst.Devices.RemoteDevice",
+        "device_classes": _device_classes})
+
+lazy_package(__name__, _attributes)
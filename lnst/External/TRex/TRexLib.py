@@ -7,6 +7,7 @@ import subprocess
 import tempfile
 import signal
 from lnst.Common.DependencyError import DependencyError
+from lnst.Common.Utils import listening_ports
 
 
 TREX_CLI_DEFAULT_PARAMS = {
@@ -133,13 +134,19 @@ class TRexSrv:
             ip_addr: Source IP address of the flow
         - cores (list): List of CPU cores to use
     """
+    # port of the TRex interactive mode RPC server
+    RPC_PORT = 4501
+
     def __init__(self, params):
         self.params = params
 
     def get_results(self):
         return None
 
-    def run(self):
+    def run(self, ready_callback=None):
+        """
+        ready_callback is called once the TRex RPC server accepts clients
+        """
         try:
             import yaml
         except ModuleNotFoundError as e:
@@ -175,7 +182,7 @@ class TRexSrv:
                     stdin=open('/dev/null'), stdout=open('/dev/null','w'),
                     stderr=subprocess.PIPE, close_fds=True)
 
-            self._wait_for_interrupt()
+            self._wait_for_interrupt(server, ready_callback)
 
             server.send_signal(signal.SIGINT)
             out, err = server.communicate()
@@ -184,7 +191,7 @@ class TRexSrv:
                 return False
         return True
 
-    def _wait_for_interrupt(self):
+    def _wait_for_interrupt(self, server, ready_callback):
         class InterruptException(Exception):
             pass
 
@@ -193,12 +200,26 @@ class TRexSrv:
 
         try:
             old_handler = signal.signal(signal.SIGINT, handler)
+            self._wait_for_rpc_server(server, ready_callback)
             signal.pause()
         except InterruptException:
             pass
         finally:
             signal.signal(signal.SIGINT, old_handler)
 
+    def _wait_for_rpc_server(self, server, ready_callback, timeout=120):
+        if ready_callback is None:
+            return
+
+        end_time = time.time() + timeout
+        while time.time() < end_time and server.poll() is None:
+            if self.RPC_PORT in listening_ports():
+                break
+            time.sleep(0.5)
+        else:
+            logging.warning("TRex RPC server not listening")
+        ready_callback()
+
 class TRexError(Exception):
     pass
 
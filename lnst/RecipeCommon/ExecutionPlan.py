@@ -0,0 +1,178 @@
+"""
+This module implements the execution plan of a recipe, a tree of the stages
+of a recipe run (e.g. sub configurations, ping and perf tests) with their
+estimated durations, and the history of the actual durations used to refine
+the estimates of future runs.
+
+Copyright 2025 Red Hat, Inc.
+Licensed under the GNU General Public License, version 2 as
+published by the Free Software Foundation; see COPYING for details.
+"""
+
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return "{}:{:02d}:{:02d}".format(hours, minutes, seconds)
+
+
+class PlanStage(object):
+    """A single stage of an execution plan
+
+    :param key: key of the stage, unique among its siblings, the first item
+        is the kind of the stage (e.g. ("perf", 2))
+    :param description: human readable description of the stage
+    :param estimate: estimated duration in seconds of the stage itself,
+        without the durations of its child stages, None if the duration
+        can't be estimated before the run
+    """
+    def __init__(self, key, description="", estimate=0.0):
+        self.key = key
+        self.description = description
+        self.estimate = estimate
+        # the estimate before it was refined by the RuntimeHistory
+        self.base_estimate = estimate
+        self.actual = None
+        self.children = []
+
+    @property
+    def kind(self):
+        return self.key[0]
+
+    @property
+    def known(self):
+        """False if the duration of the stage or any child stage is unknown"""
+        return self.estimate is not None and all(
+            child.known for child in self.children
+        )
+
+    @property
+    def total_estimate(self):
+        """Estimated duration of the stage including its child stages
+
+        Stages with an unknown duration are not counted.
+        """
+        return (self.estimate or 0.0) + sum(
+            child.total_estimate for child in self.children
+        )
+
+    def format_estimate(self):
+        if self.estimate is None and not self.children:
+            return "unknown"
+        if not self.known:
+            return "at least {}".format(format_duration(self.total_estimate))
+        return format_duration(self.total_estimate)
+
+    @property
+    def own_actual(self):
+        """Actual duration of the stage without its child stages
+
+        None if the stage or any of its child stages didn't run.
+        """
+        if self.actual is None:
+            return None
+        children_actual = 0.0
+        for child in self.children:
+            if child.actual is None:
+                return None
+            children_actual += child.actual
+        return max(self.actual - children_actual, 0.0)
+
+    def add(self, stage):
+        self.children.append(stage)
+        return stage
+
+    def child(self, key):
+        for stage in self.children:
+            if stage.key == key:
+                return stage
+        return None
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    @contextmanager
+    def timed(self):
+        """Records the actual duration of the stage"""
+        start = time.time()
+        try:
+            yield self
+        finally:
+            self.actual = time.time() - start
+
+    def format(self, indent=0):
+        line = "{}{} estimated {}".format(
+            "  " * indent,
+            self.description or " ".join(str(i) for i in self.key),
+            self.format_estimate(),
+        )
+        if self.actual is not None:
+            line += ", actual {}".format(format_duration(self.actual))
+        lines = [line]
+        for child in self.children:
+            lines.extend(child.format(indent + 1))
+        return lines
+
+
+class RuntimeHistory(object):
+    """Actual vs. estimated durations of the stages of previous runs
+
+    The history is stored as a JSON file with the sums of the estimated and
+    actual durations per stage kind. The estimates of new plans are scaled
+    by the ratio of these sums, kinds without an estimate of their own (e.g.
+    the configuration overhead of a sub configuration) are estimated with
+    the average of their actual durations.
+
+    :param path: path of the history file, it doesn't need to exist
+    """
+    def __init__(self, path):
+        self._path = path
+        self._kinds = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._kinds = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(
+                    "Ignoring unreadable runtime history {}: {}".format(path, e)
+                )
+
+    def refine(self, kind, estimate):
+        history = self._kinds.get(kind)
+        if not history or not history["count"]:
+            return estimate
+        if history["estimated"] > 0:
+            return estimate * history["actual"] / history["estimated"]
+        return history["actual"] / history["count"]
+
+    def refine_plan(self, plan):
+        for stage in plan.walk():
+            if stage.base_estimate is not None:
+                stage.estimate = self.refine(stage.kind, stage.base_estimate)
+
+    def update(self, plan):
+        """Adds the actual durations of the stages that ran and saves it"""
+        for stage in plan.walk():
+            own_actual = stage.own_actual
+            if own_actual is None or stage.base_estimate is None:
+                continue
+            history = self._kinds.setdefault(
+                stage.kind, {"count": 0, "estimated": 0.0, "actual": 0.0}
+            )
+            history["count"] += 1
+            history["estimated"] += stage.base_estimate
+            history["actual"] += own_actual
+
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._kinds, f, indent=4)
+        os.replace(tmp_path, self._path)
@@ -14,6 +14,7 @@ class PacketAssertConf(object):
         self._p_min = kwargs.get("p_min", 10)
         self._p_max = kwargs.get("p_max", 0)
         self._promiscuous = kwargs.get("promiscuous", False)
+        self._bpf_count = kwargs.get("bpf_count", False)
 
     @property
     def host(self):
@@ -43,6 +44,10 @@ class PacketAssertConf(object):
     def promiscuous(self):
         return self._promiscuous
 
+    @property
+    def bpf_count(self):
+        return self._bpf_count
+
 class PacketAssertTestAndEvaluate(BaseRecipe):
     packet_assert_jobs = []
 
@@ -108,4 +113,7 @@ class PacketAssertTestAndEvaluate(BaseRecipe):
         if packet_assert_config.promiscuous:
             kwargs["promiscuous"] = packet_assert_config.promiscuous
 
+        if packet_assert_config.bpf_count:
+            kwargs["bpf_count"] = packet_assert_config.bpf_count
+
         return kwargs
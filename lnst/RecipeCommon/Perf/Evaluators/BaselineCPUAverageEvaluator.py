@@ -9,6 +9,7 @@ from lnst.RecipeCommon.Perf.Measurements.Results import (
     BaseMeasurementResults as PerfMeasurementResults,
 )
 from lnst.RecipeCommon.Perf.Evaluators.BaselineEvaluator import BaselineEvaluator
+from lnst.RecipeCommon.Perf.Evaluators.BaselineStore import LocalBaselineStore
 
 
 class BaselineCPUAverageEvaluator(BaselineEvaluator):
@@ -16,8 +17,10 @@ class BaselineCPUAverageEvaluator(BaselineEvaluator):
         self,
         metrics_to_evaluate: Optional[List[str]] = None,
         evaluation_filter: Optional[Dict[str, str]] = None,
+        baseline_store: Optional[LocalBaselineStore] = None,
+        record_candidates: bool = False,
     ):
-        super().__init__(metrics_to_evaluate)
+        super().__init__(metrics_to_evaluate, baseline_store, record_candidates)
         self._evaluation_filter = evaluation_filter
 
     def filter_results(
@@ -10,6 +10,12 @@ from lnst.RecipeCommon.Perf.Results import result_averages_difference
 from lnst.RecipeCommon.Perf.Measurements.Results import (
     BaseMeasurementResults as PerfMeasurementResults,
 )
+from lnst.RecipeCommon.Perf.Evaluators.BaselineStore import (
+    LocalBaselineStore,
+    StoredBaseline,
+    baseline_context,
+    baseline_key,
+)
 
 
 @dataclass
@@ -23,6 +29,8 @@ class MetricComparison:
     difference: Optional[float]
     comparison_result: ResultType
     text: str
+    effect_size: Optional[float] = None
+    p_value: Optional[float] = None
 
 
 class BaselineEvaluationResult(Result):
@@ -56,8 +64,25 @@ class BaselineEvaluationResult(Result):
 
 
 class BaselineEvaluator(BaseResultEvaluator):
-    def __init__(self, metrics_to_evaluate: Optional[List[str]] = None):
+    """Compares measurement results with their baselines
+
+    Baselines and thresholds are provided by the :any:`get_baseline` and
+    :any:`get_threshold` methods, which derived classes override to look them
+    up. Alternatively a :any:`LocalBaselineStore` can be passed as
+    *baseline_store*, baselines of all evaluated results are then prefetched
+    from the store and with *record_candidates* the evaluated results are
+    recorded to the store as new baseline candidates.
+    """
+    def __init__(
+        self,
+        metrics_to_evaluate: Optional[List[str]] = None,
+        baseline_store: Optional[LocalBaselineStore] = None,
+        record_candidates: bool = False,
+    ):
         self._metrics_to_evaluate = metrics_to_evaluate
+        self._baseline_store = baseline_store
+        self._record_candidates = record_candidates
+        self._baseline_keys = {}
 
     def evaluate_results(
         self,
@@ -67,8 +92,28 @@ class BaselineEvaluator(BaseResultEvaluator):
     ):
         filtered_results = self.filter_results(recipe, recipe_conf, results)
 
-        for group in self.group_results(recipe, recipe_conf, filtered_results):
-            self.evaluate_group_results(recipe, recipe_conf, group)
+        if self._baseline_store is not None:
+            context = baseline_context(recipe, recipe_conf)
+            self._baseline_keys = {
+                result: baseline_key(context, result)
+                for result in filtered_results
+            }
+            self._baseline_store.prefetch(self._baseline_keys.values())
+
+        try:
+            for group in self.group_results(recipe, recipe_conf, filtered_results):
+                self.evaluate_group_results(recipe, recipe_conf, group)
+
+            if self._baseline_store is not None and self._record_candidates:
+                for result, key in self._baseline_keys.items():
+                    self.record_candidate(key, result)
+        finally:
+            self._baseline_keys = {}
+
+    def record_candidate(self, key: str, result: PerfMeasurementResults):
+        self._baseline_store.add_candidate(
+            key, result, self._metrics_to_evaluate
+        )
 
     def filter_results(
         self,
@@ -127,13 +172,17 @@ class BaselineEvaluator(BaseResultEvaluator):
         recipe_conf: PerfRecipeConf,
         result: PerfMeasurementResults,
     ) -> Optional[PerfMeasurementResults]:
-        return None
+        if self._baseline_store is None or result not in self._baseline_keys:
+            return None
+        return self._baseline_store.get_baseline(self._baseline_keys[result])
 
     def get_threshold(
         self,
         baseline: PerfMeasurementResults,
         metric_name: str,
     ) -> Optional[float]:
+        if isinstance(baseline, StoredBaseline):
+            return baseline.get_threshold(metric_name)
         return None
 
     def compare_result_with_baseline(
@@ -169,6 +218,9 @@ class BaselineEvaluator(BaseResultEvaluator):
         if not baseline:
             comparison_result = ResultType.FAIL
             text = "No baseline found"
+        elif getattr(baseline, metric_name, None) is None:
+            comparison_result = ResultType.FAIL
+            text = f"No baseline of {metric_name} found"
         elif (threshold := self.get_threshold(baseline, metric_name)) is None:
             comparison_result = ResultType.FAIL
             text = "No threshold found"
@@ -0,0 +1,339 @@
+import json
+import time
+import uuid
+import hashlib
+import logging
+import sqlite3
+from collections import OrderedDict
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Dict, Iterable, List, Optional
+
+from lnst.Controller.Namespace import Namespace
+from lnst.Controller.Recipe import BaseRecipe
+from lnst.Devices.RemoteDevice import RemoteDevice
+from lnst.RecipeCommon.Perf.Recipe import RecipeConf as PerfRecipeConf
+from lnst.RecipeCommon.Perf.Measurements.Results import (
+    BaseMeasurementResults as PerfMeasurementResults,
+)
+
+
+@dataclass
+class StoredMetric:
+    average: float
+    std_deviation: Optional[float]
+    unit: Optional[str]
+    samples: Optional[List[float]] = None
+
+
+class StoredBaseline:
+    """Baseline loaded from a :any:`LocalBaselineStore`
+
+    Stored metrics are accessible as attributes with the same name as on the
+    measurement results they were recorded from, each of them providing the
+    `average`, `std_deviation` and `unit` values so that they can be compared
+    with the current results by the :any:`BaselineEvaluator`. Metrics recorded
+    with samples also provide the `samples` list. Metrics without a stored
+    threshold use the *default_threshold*.
+    """
+    def __init__(
+        self,
+        key: str,
+        metrics: Dict[str, StoredMetric],
+        thresholds: Dict[str, Optional[float]],
+        default_threshold: Optional[float] = None,
+    ):
+        self._key = key
+        self._metrics = metrics
+        self._thresholds = thresholds
+        self._default_threshold = default_threshold
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def metrics(self) -> List[str]:
+        return list(self._metrics.keys())
+
+    def get_threshold(self, metric_name: str) -> Optional[float]:
+        threshold = self._thresholds.get(metric_name, None)
+        return threshold if threshold is not None else self._default_threshold
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self._metrics:
+            raise AttributeError(name)
+        return self._metrics[name]
+
+    def describe(self):
+        return "stored baseline {}".format(self._key)
+
+
+def baseline_context(recipe: BaseRecipe, recipe_conf: PerfRecipeConf) -> dict:
+    """Identity of the recipe run part of a baseline key
+
+    Consists of the recipe class, recipe parameters and the sub configuration
+    description (if the recipe provides one) that the perf test was run
+    with.
+    """
+    recipe_cls = recipe.__class__
+    context = {
+        "recipe": "{}.{}".format(recipe_cls.__module__, recipe_cls.__qualname__),
+        "params": recipe.params._to_dict(),
+        "sub_configuration": None,
+    }
+
+    describe = getattr(recipe, "generate_sub_configuration_description", None)
+    if describe is not None and recipe_conf.parent_recipe_config is not None:
+        context["sub_configuration"] = describe(recipe_conf.parent_recipe_config)
+    return context
+
+
+def flow_identity(flow) -> dict:
+    """Description of a measured flow that doesn't change between runs
+
+    Devices are identified by their names, the ids and ifindexes of software
+    devices change every time they're created. The generator and receiver
+    namespaces are left out, the flow endpoints are identified by the bind
+    addresses.
+    """
+    if not is_dataclass(flow):
+        return {"flow": repr(flow)}
+
+    identity = {}
+    for field in fields(flow):
+        value = getattr(flow, field.name)
+        if isinstance(value, Namespace):
+            continue
+        if isinstance(value, RemoteDevice):
+            value = value.name
+        identity[field.name] = value
+    return identity
+
+
+def baseline_key(context: dict, result: PerfMeasurementResults) -> str:
+    """Stable hash identifying the baseline of a measurement result
+
+    Combines the recipe *context* created by :any:`baseline_context` with the
+    measurement type and version and the identity of the measured flow
+    created by :any:`flow_identity` (or the result metric metadata for
+    measurements without flows).
+    """
+    measurement = result.measurement
+    try:
+        version = measurement.version
+    except NotImplementedError:
+        version = None
+
+    flow = getattr(result, "flow", None)
+    identity = dict(
+        context,
+        measurement=measurement.name,
+        measurement_version=version,
+        result_type=result.__class__.__name__,
+        result=flow_identity(flow) if flow is not None else result.metric_metadata,
+    )
+    serialized = json.dumps(identity, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+class LocalBaselineStore(object):
+    """Baseline repository backed by a local SQLite database
+
+    Baselines are stored per metric under a key created by
+    :any:`baseline_key`. Every stored metric row is either an accepted
+    baseline or a candidate recorded by a test run, only the most recent
+    accepted rows are used as baselines. Candidates recorded by the current
+    run can be promoted with :any:`accept_candidates`, candidates of older
+    runs by passing their `run_id`.
+
+    Looked up baselines, including missing ones, are kept in an in-process
+    LRU cache. :any:`prefetch` loads the baselines of many keys with a
+    minimal number of queries.
+
+    :param path:
+        path to the SQLite database file, created if it doesn't exist
+    :param default_threshold:
+        threshold in percent used for metrics that were stored without one
+        and for metrics missing in the stored baseline
+    :param cache_size:
+        maximum number of baselines kept in the cache
+    """
+    _PREFETCH_CHUNK = 500
+    _MISSING = object()
+
+    def __init__(
+        self,
+        path: str,
+        default_threshold: Optional[float] = None,
+        cache_size: int = 1024,
+    ):
+        self._path = path
+        self._default_threshold = default_threshold
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._run_id = uuid.uuid4().hex
+        self._db = None
+
+    @property
+    def run_id(self) -> str:
+        return self._run_id
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self._path)
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS baseline_metrics (
+                    key TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    average REAL,
+                    std_deviation REAL,
+                    unit TEXT,
+                    samples TEXT,
+                    threshold REAL,
+                    accepted INTEGER NOT NULL DEFAULT 0,
+                    run_id TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    description TEXT
+                );
+                CREATE INDEX IF NOT EXISTS baseline_metrics_lookup
+                    ON baseline_metrics (key, accepted, timestamp);
+                CREATE INDEX IF NOT EXISTS baseline_metrics_run
+                    ON baseline_metrics (run_id, accepted);
+                """
+            )
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def prefetch(self, keys: Iterable[str]):
+        """Loads the baselines of all *keys* that aren't cached yet"""
+        missing = list(
+            OrderedDict.fromkeys(key for key in keys if key not in self._cache)
+        )
+        for i in range(0, len(missing), self._PREFETCH_CHUNK):
+            chunk = missing[i:i + self._PREFETCH_CHUNK]
+            baselines = self._load(chunk)
+            for key in chunk:
+                self._cache_put(key, baselines.get(key, self._MISSING))
+
+    def get_baseline(self, key: str) -> Optional[StoredBaseline]:
+        try:
+            baseline = self._cache[key]
+            self._cache.move_to_end(key)
+        except KeyError:
+            baseline = self._load([key]).get(key, self._MISSING)
+            self._cache_put(key, baseline)
+        return None if baseline is self._MISSING else baseline
+
+    def add_candidate(
+        self,
+        key: str,
+        result: PerfMeasurementResults,
+        metrics: Optional[List[str]] = None,
+        thresholds: Optional[Dict[str, float]] = None,
+        samples: Optional[Dict[str, List[float]]] = None,
+    ):
+        """Records *result* as a new baseline candidate of the current run
+
+        :param metrics:
+            names of the result metrics to store, all by default
+        :param thresholds:
+            optional per metric thresholds stored with the candidate
+        :param samples:
+            optional per metric lists of sample values stored with the
+            candidate, used by sample level evaluators
+        """
+        samples = samples or {}
+        thresholds = thresholds or {}
+        now = time.time()
+        rows = []
+        for metric in metrics if metrics is not None else result.metrics:
+            value = getattr(result, metric, None)
+            if value is None:
+                continue
+            try:
+                std_deviation = value.std_deviation
+            except (TypeError, ZeroDivisionError):
+                std_deviation = None
+            rows.append(
+                (
+                    key, metric, value.average, std_deviation,
+                    getattr(value, "unit", None),
+                    json.dumps(samples[metric]) if metric in samples else None,
+                    thresholds.get(metric, None),
+                    self._run_id, now, result.describe(),
+                )
+            )
+
+        with self._connection as db:
+            db.executemany(
+                "INSERT INTO baseline_metrics (key, metric, average,"
+                " std_deviation, unit, samples, threshold, accepted, run_id,"
+                " timestamp, description) VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                rows,
+            )
+
+    def accept_candidates(self, run_id: Optional[str] = None) -> int:
+        """Promotes candidates of a run to baselines
+
+        :param run_id:
+            id of the run whose candidates to accept, the current run by
+            default
+        :return: number of accepted metric rows
+        """
+        run_id = run_id if run_id is not None else self._run_id
+        with self._connection as db:
+            cursor = db.execute(
+                "UPDATE baseline_metrics SET accepted = 1"
+                " WHERE run_id = ? AND accepted = 0",
+                (run_id,),
+            )
+        self._cache.clear()
+        logging.debug(
+            "Accepted {} baseline metrics of run {}".format(cursor.rowcount, run_id)
+        )
+        return cursor.rowcount
+
+    def _load(self, keys: List[str]) -> Dict[str, StoredBaseline]:
+        placeholders = ", ".join("?" * len(keys))
+        rows = self._connection.execute(
+            "SELECT key, metric, average, std_deviation, unit, samples, threshold"
+            " FROM baseline_metrics"
+            " WHERE accepted = 1 AND key IN ({})"
+            " ORDER BY timestamp".format(placeholders),
+            keys,
+        )
+
+        metrics = {}
+        thresholds = {}
+        for key, metric, average, std_deviation, unit, samples, threshold in rows:
+            # ordered by timestamp, newer rows replace older ones
+            metrics.setdefault(key, {})[metric] = StoredMetric(
+                average, std_deviation, unit,
+                json.loads(samples) if samples is not None else None,
+            )
+            thresholds.setdefault(key, {})[metric] = threshold
+
+        return {
+            key: StoredBaseline(
+                key, key_metrics, thresholds[key], self._default_threshold
+            )
+            for key, key_metrics in metrics.items()
+        }
+
+    def _cache_put(self, key, baseline):
+        self._cache[key] = baseline
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_db"] = None
+        state["_cache"] = OrderedDict()
+        return state
@@ -0,0 +1,212 @@
+import math
+from typing import List, Optional, Tuple
+
+from lnst.Controller.RecipeResults import ResultType
+from lnst.RecipeCommon.Perf.Results import (
+    PerfList,
+    ParallelPerfResult,
+    result_averages_difference,
+)
+from lnst.RecipeCommon.Perf.Measurements.Results import (
+    BaseMeasurementResults as PerfMeasurementResults,
+)
+from lnst.RecipeCommon.Perf.Evaluators.BaselineEvaluator import (
+    BaselineEvaluator,
+    MetricComparison,
+)
+from lnst.RecipeCommon.Perf.Evaluators.EvaluationError import EvaluationError
+from lnst.RecipeCommon.Perf.Evaluators.BaselineStore import (
+    LocalBaselineStore,
+    StoredMetric,
+)
+
+
+def interval_samples(perf_result) -> List[float]:
+    """Per interval sample values of a perf result
+
+    Sequential results are concatenated, parallel results (e.g. streams of a
+    single flow) are summed interval by interval.
+    """
+    if not isinstance(perf_result, PerfList):
+        return [perf_result.average]
+
+    if isinstance(perf_result, ParallelPerfResult):
+        return [
+            sum(values)
+            for values in zip(*[interval_samples(item) for item in perf_result])
+        ]
+
+    samples = []
+    for item in perf_result:
+        samples.extend(interval_samples(item))
+    return samples
+
+
+def iteration_samples(perf_result) -> List[float]:
+    """Averages of the items of a perf result, for aggregated results these
+    are the averages of individual iterations"""
+    if not isinstance(perf_result, PerfList):
+        return [perf_result.average]
+    return [item.average for item in perf_result]
+
+
+def mann_whitney_u(a: List[float], b: List[float]) -> Tuple[float, float]:
+    """Two sided Mann–Whitney U test of samples *a* and *b*
+
+    Uses the normal approximation with tie and continuity correction.
+
+    :return: tuple of the rank biserial correlation of *a* over *b* (effect
+        size in the range <-1, 1>, positive when values of *a* tend to be
+        larger) and the p-value
+    """
+    n1, n2 = len(a), len(b)
+    n = n1 + n2
+    values = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+
+    rank_sum_a = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and values[j + 1][0] == values[i][0]:
+            j += 1
+        # average of the 1-based ranks i+1 ... j+1
+        rank = (i + j) / 2 + 1
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        rank_sum_a += rank * sum(1 for k in range(i, j + 1) if values[k][1] == 0)
+        i = j + 1
+
+    u_a = rank_sum_a - n1 * (n1 + 1) / 2
+    effect_size = 2 * u_a / (n1 * n2) - 1
+
+    mean_u = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return effect_size, 1.0
+
+    z = (abs(u_a - mean_u) - 0.5) / math.sqrt(variance)
+    p_value = math.erfc(max(z, 0) / math.sqrt(2))
+    return effect_size, min(p_value, 1.0)
+
+
+class StatisticalBaselineEvaluator(BaselineEvaluator):
+    """Compares sample distributions of the current results and baselines
+
+    Instead of comparing only the difference of averages with the threshold,
+    the per interval (or per iteration) samples of each metric are compared
+    with the baseline samples using the Mann–Whitney U rank test. A metric is
+    evaluated as a regression only when the difference is statistically
+    significant **and** the difference of averages exceeds the threshold, so
+    noisy flows with overlapping distributions don't fail on a difference of
+    averages alone. When no threshold is available only the significance and
+    *min_effect_size* are used.
+
+    The effect size (rank biserial correlation) and p-value are reported in
+    the :any:`MetricComparison`. Metrics with fewer than *min_samples* samples
+    on either side are evaluated by the :any:`BaselineEvaluator` comparison.
+
+    :param alpha:
+        significance level of the test
+    :param min_effect_size:
+        minimum absolute effect size to consider a significant difference a
+        regression
+    :param sample_level:
+        "interval" to compare per interval samples or "iteration" to compare
+        the averages of individual iterations
+    :param min_samples:
+        minimum number of samples on each side needed for the rank test
+    """
+    def __init__(
+        self,
+        metrics_to_evaluate: Optional[List[str]] = None,
+        baseline_store: Optional[LocalBaselineStore] = None,
+        record_candidates: bool = False,
+        alpha: float = 0.05,
+        min_effect_size: float = 0.0,
+        sample_level: str = "interval",
+        min_samples: int = 3,
+    ):
+        super().__init__(metrics_to_evaluate, baseline_store, record_candidates)
+        if sample_level not in ("interval", "iteration"):
+            raise EvaluationError("Unknown sample level {}".format(sample_level))
+        self._alpha = alpha
+        self._min_effect_size = min_effect_size
+        self._sample_level = sample_level
+        self._min_samples = min_samples
+
+    def metric_samples(self, metric) -> Optional[List[float]]:
+        if metric is None:
+            return None
+        if isinstance(metric, StoredMetric):
+            return metric.samples
+        if self._sample_level == "interval":
+            return interval_samples(metric)
+        return iteration_samples(metric)
+
+    def record_candidate(self, key: str, result: PerfMeasurementResults):
+        metrics = self._metrics_to_evaluate or result.metrics
+        samples = {}
+        for metric_name in metrics:
+            values = self.metric_samples(getattr(result, metric_name, None))
+            if values is not None:
+                samples[metric_name] = values
+
+        self._baseline_store.add_candidate(
+            key, result, self._metrics_to_evaluate, samples=samples
+        )
+
+    def compare_metrics_with_threshold(self, result, baseline, metric_name):
+        if not baseline:
+            return super().compare_metrics_with_threshold(
+                result, baseline, metric_name
+            )
+
+        current_metric = getattr(result, metric_name)
+        baseline_metric = getattr(baseline, metric_name, None)
+        current_samples = self.metric_samples(current_metric)
+        baseline_samples = self.metric_samples(baseline_metric)
+        if (
+            not current_samples
+            or not baseline_samples
+            or len(current_samples) < self._min_samples
+            or len(baseline_samples) < self._min_samples
+        ):
+            return super().compare_metrics_with_threshold(
+                result, baseline, metric_name
+            )
+
+        effect_size, p_value = mann_whitney_u(current_samples, baseline_samples)
+        threshold = self.get_threshold(baseline, metric_name)
+        diff = result_averages_difference(current_metric, baseline_metric)
+        direction = "higher" if diff >= 0 else "lower"
+
+        significant = (
+            p_value < self._alpha and abs(effect_size) >= self._min_effect_size
+        )
+        over_threshold = threshold is None or abs(diff) > threshold
+        comparison_result = (
+            ResultType.FAIL if significant and over_threshold else ResultType.PASS
+        )
+
+        text = (
+            f"New {metric_name} average is {abs(diff):.2f}% {direction} from the baseline. "
+            f"Allowed difference: {threshold}%. "
+            f"Effect size {effect_size:.2f}, p-value {p_value:.4f} "
+            f"({len(current_samples)} vs {len(baseline_samples)} samples, "
+            f"{'significant' if significant else 'not significant'} at alpha {self._alpha})"
+        )
+
+        return MetricComparison(
+            measurement_type=result.measurement.__class__.__name__,
+            current_result=result,
+            baseline_result=baseline,
+            threshold=threshold,
+            metric_name=metric_name,
+            metric_metadata=result.metric_metadata.get(metric_name, {}),
+            difference=diff,
+            comparison_result=comparison_result,
+            text=text,
+            effect_size=effect_size,
+            p_value=p_value,
+        )
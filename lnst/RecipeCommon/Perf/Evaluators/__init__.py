@@ -2,3 +2,5 @@ from lnst.RecipeCommon.Perf.Evaluators.NonzeroFlowEvaluator import NonzeroFlowEv
 from lnst.RecipeCommon.Perf.Evaluators.BaselineEvaluator import BaselineEvaluator
 from lnst.RecipeCommon.Perf.Evaluators.BaselineCPUAverageEvaluator import BaselineCPUAverageEvaluator
 from lnst.RecipeCommon.Perf.Evaluators.MaxTimeTakenEvaluator import MaxTimeTakenEvaluator
+from lnst.RecipeCommon.Perf.Evaluators.StatisticalBaselineEvaluator import StatisticalBaselineEvaluator
+from lnst.RecipeCommon.Perf.Evaluators.BaselineStore import LocalBaselineStore
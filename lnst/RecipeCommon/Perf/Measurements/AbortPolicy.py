@@ -0,0 +1,94 @@
+from typing import Optional
+
+
+class BaseAbortPolicy(object):
+    """Base class for early measurement abort policies
+
+    An abort policy is registered with a measurement and gets to inspect
+    every incremental sample the measurement jobs send while running. When
+    :any:`check_sample` returns a reason the measurement is aborted instead
+    of waiting for its full duration.
+    """
+    def reset(self):
+        """Called by the measurement every time it starts"""
+        pass
+
+    def check_sample(self, measurement, job, sample) -> Optional[str]:
+        """Returns a string describing why the measurement should be aborted
+        or None if it should continue"""
+        raise NotImplementedError()
+
+
+class ZeroThroughputAbortPolicy(BaseAbortPolicy):
+    """Aborts the measurement when a job reports zero throughput for too long
+
+    Iperf samples contain the amount of data transferred in the sample
+    interval and its duration. InterfaceStatsMonitor samples contain the
+    device counters, these are compared with the previous sample of the same
+    device. Samples without any of the *metrics* (e.g. CPU samples) are
+    ignored.
+
+    :param duration:
+        how many seconds of consecutive zero throughput samples from a single
+        job (and device) are tolerated
+    :param metrics:
+        names of the sample items with the transferred amount of data, the
+        throughput is zero when none of them increased
+    """
+    def __init__(
+        self,
+        duration: float = 3,
+        metrics: tuple = ("bytes", "rx_packets", "tx_packets"),
+    ):
+        self._duration = duration
+        self._metrics = metrics
+        self._zero_durations = {}
+        self._last_counters = {}
+
+    def reset(self):
+        self._zero_durations = {}
+        self._last_counters = {}
+
+    def check_sample(self, measurement, job, sample) -> Optional[str]:
+        try:
+            values = {
+                metric: sample[metric]
+                for metric in self._metrics
+                if metric in sample
+            }
+            timestamp = sample["timestamp"]
+        except (TypeError, KeyError):
+            return None
+        if not values:
+            return None
+
+        key = (job, sample.get("device"))
+        if "duration" in sample:
+            duration = sample["duration"]
+            increased = any(value > 0 for value in values.values())
+        else:
+            # cumulative device counters
+            last = self._last_counters.get(key)
+            self._last_counters[key] = (timestamp, values)
+            if last is None:
+                return None
+            last_timestamp, last_values = last
+            duration = timestamp - last_timestamp
+            increased = any(
+                value > last_values.get(metric, value)
+                for metric, value in values.items()
+            )
+
+        if increased:
+            self._zero_durations[key] = 0
+            return None
+
+        self._zero_durations[key] = self._zero_durations.get(key, 0) + duration
+        if self._zero_durations[key] >= self._duration:
+            return "Job {} on host {} reported zero {} for {:.2f} seconds".format(
+                job.id,
+                job.host.hostid,
+                "/".join(values),
+                self._zero_durations[key],
+            )
+        return None
@@ -70,6 +70,17 @@ class BaseFlowMeasurement(BaseMeasurement):
     def flows(self):
         raise NotImplementedError()
 
+    def runtime_estimate(self):
+        # same overhead as the runtime_estimate of the traffic test modules
+        _duration_overhead = 5
+        return max(
+            (
+                flow.duration + flow.warmup_duration * 2 + _duration_overhead
+                for flow in self.flows
+            ),
+            default=0,
+        )
+
     @classmethod
     def report_results(cls, recipe, results):
         for flow_results in results:
@@ -103,6 +114,15 @@ class BaseFlowMeasurement(BaseMeasurement):
             if cls._invalid_flow_duration(result):
                 desc.append("{} has invalid duration!".format(name))
 
+        start_skews = flow_results.measurement.start_skews
+        if start_skews:
+            desc.append(
+                "Generator start skew: max {:.3f} ms, average {:.3f} ms".format(
+                    max(start_skews) * 1000,
+                    sum(start_skews) / len(start_skews) * 1000,
+                )
+            )
+
         # TODO add flow description
         recipe_result = MeasurementResult(
             "flow",
@@ -1,6 +1,23 @@
+import math
+import time
+import logging
+
+from lnst.Controller.Job import start_jobs, wait_for_start
+from lnst.RecipeCommon.Perf.Measurements.MeasurementError import MeasurementError
+
+
 class BaseMeasurement(object):
+    # seconds between sending a synchronized start of jobs and the start,
+    # covers the delivery of the start messages to the agents
+    sync_start_delay = 1.0
+
     def __init__(self, recipe_conf=None):
         self._recipe_conf = recipe_conf
+        self._sample_callbacks = []
+        self._abort_policy = None
+        self._abort_reason = None
+        self._readiness_time_saved = 0.0
+        self._start_skews = []
 
     @property
     def name(self):
@@ -14,6 +31,116 @@ class BaseMeasurement(object):
     def recipe_conf(self):
         return self._recipe_conf
 
+    def runtime_estimate(self):
+        """Estimated duration of a single run of the measurement in seconds
+
+        Measurements running in the background of other measurements (e.g.
+        CPU utilization) don't add to the duration of a perf test iteration.
+        """
+        return 0
+
+    def subscribe_samples(self, callback):
+        """Registers a callback for live samples of the measurement jobs
+
+        The callback is called with the measurement, the job and the sample
+        as arguments for every sample received while the measurement runs.
+        Registering a callback makes the measurement request live samples
+        from the test modules that support it.
+        """
+        self._sample_callbacks.append(callback)
+
+    @property
+    def abort_policy(self):
+        return self._abort_policy
+
+    @abort_policy.setter
+    def abort_policy(self, policy):
+        self._abort_policy = policy
+
+    @property
+    def live_samples(self):
+        return len(self._sample_callbacks) > 0 or self._abort_policy is not None
+
+    @property
+    def aborted(self):
+        return self._abort_reason is not None
+
+    @property
+    def abort_reason(self):
+        return self._abort_reason
+
+    def _reset_abort(self):
+        self._abort_reason = None
+        if self._abort_policy is not None:
+            self._abort_policy.reset()
+
+    def _watch_job(self, job):
+        if self.live_samples:
+            job.subscribe_samples(self._process_job_sample)
+
+    def _process_job_sample(self, job, sample):
+        for callback in self._sample_callbacks:
+            callback(self, job, sample)
+
+        if self._abort_policy is None or self.aborted:
+            return
+
+        reason = self._abort_policy.check_sample(self, job, sample)
+        if reason is not None:
+            logging.warning("Aborting measurement {}: {}".format(self, reason))
+            self._abort_reason = reason
+
+    @property
+    def readiness_time_saved(self):
+        """Total time saved by waiting for server readiness instead of fixed
+        delays, negative when the servers took longer to start"""
+        return self._readiness_time_saved
+
+    @property
+    def start_skews(self):
+        """Start skews in seconds of the jobs started synchronized by
+        every run of the measurement"""
+        return list(self._start_skews)
+
+    def _start_jobs_synchronized(self, jobs):
+        """Starts *jobs* with a single batch at a shared start time
+
+        The jobs of all hosts are sent at once and start at the same
+        scheduled wall clock time, the difference between their actual
+        start times is recorded in :any:`start_skews`.
+        """
+        start_jobs(jobs, start_delay=self.sync_start_delay)
+        skew = wait_for_start(
+            jobs, timeout=math.ceil(self.sync_start_delay) + 30
+        )
+        if skew is None:
+            logging.warning("Jobs of {} didn't report their start".format(self))
+            return
+
+        self._start_skews.append(skew)
+        logging.debug("Jobs of {} started with a skew of {:.6f} seconds".format(
+            self, skew))
+
+    def _wait_for_jobs_ready(self, jobs, timeout, replaced_delay=0):
+        """Waits until all *jobs* signal readiness
+
+        :param timeout:
+            maximum time in seconds to wait for all the jobs
+        :param replaced_delay:
+            the fixed delay this wait replaces, used to compute the time saved
+        """
+        start = time.time()
+        for job in jobs:
+            remaining = max(1, math.ceil(timeout - (time.time() - start)))
+            if not job.wait_for_ready(timeout=remaining):
+                logging.warning("Job {} on host {} is not ready".format(
+                    job.id, job.host.hostid))
+
+        waited = time.time() - start
+        self._readiness_time_saved += replaced_delay - waited
+        logging.debug("Servers of {} ready after {:.2f} seconds".format(
+            self, waited))
+
     def start(self):
         raise NotImplementedError()
 
@@ -29,9 +156,35 @@ class BaseMeasurement(object):
     def collect_results(self):
         raise NotImplementedError()
 
+    def teardown(self):
+        """Releases resources kept between measurement iterations
+
+        Called by the perf test after the last iteration, also when the
+        test fails, e.g. to stop persistent server jobs. Checking that these
+        resources are still healthy is up to the start method.
+        """
+        pass
+
     def collect_simulated_results(self):
         return self.collect_results()
 
+    @staticmethod
+    def fetch_raw_output(job, local_path):
+        """Copies the raw tool output of a finished job to the controller
+
+        Only available for jobs of test modules that ran with the
+        `reduce_results` parameter, these keep the raw output on the agent
+        and return just the reduced data. The raw output is removed from the
+        agent once it's copied.
+        """
+        try:
+            remote_path = job.result["raw_output"]
+        except (TypeError, KeyError):
+            raise MeasurementError("Job {} has no raw output stored".format(job.id))
+
+        job.netns.copy_file_from_machine(remote_path, local_path)
+        job.netns.remove_raw_output(remote_path)
+
     @classmethod
     def report_results(cls, recipe, results):
         raise NotImplementedError()
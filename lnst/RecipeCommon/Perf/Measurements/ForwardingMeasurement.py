@@ -125,13 +125,22 @@ class ForwardingMeasurement(BaseFlowMeasurement):
         ):
             raise MeasurementError("All flows must have the same warmup duration")
 
+        self._reset_abort()
         self._prepare_jobs()
 
         self._dropper_job.start(bg=True)
-        self._forwarder_rx_monitor_job.start(bg=True)
-        self._forwarder_tx_monitor_job.start(bg=True)
+        for monitor_job in self._forwarder_monitor_jobs:
+            monitor_job.start(bg=True)
         self._generator_job.start(bg=True)
 
+    @property
+    def _forwarder_monitor_jobs(self):
+        # rx and tx can be monitored by the same job
+        jobs = [self._forwarder_rx_monitor_job]
+        if self._forwarder_tx_monitor_job is not self._forwarder_rx_monitor_job:
+            jobs.append(self._forwarder_tx_monitor_job)
+        return jobs
+
     def _prepare_jobs(self):
         self._generator_job = self._prepare_client()
         self._forwarder_rx_monitor_job, self._forwarder_tx_monitor_job = (
@@ -202,6 +211,9 @@ class ForwardingMeasurement(BaseFlowMeasurement):
         """
         Prepares InterfaceStatsMonitor jobs at the forwarder for both RX and TX.
 
+        When both devices are in the same network namespace a single job
+        monitors both of them.
+
         Returns tuple of (rx_job, tx_job).
         """
 
@@ -209,34 +221,51 @@ class ForwardingMeasurement(BaseFlowMeasurement):
         forwarder_rx_nic = self._real_dev(sample_flow.forwarder_rx_nic)
         forwarder_tx_nic = self._real_dev(sample_flow.forwarder_tx_nic)
 
+        if sample_flow.forwarder_rx_nic.netns == sample_flow.forwarder_tx_nic.netns:
+            monitor = InterfaceStatsMonitor(
+                devices=[forwarder_rx_nic, forwarder_tx_nic],
+                stats=["rx_packets", "tx_packets"],
+                stream_samples=self.live_samples,
+            )
+            job = sample_flow.forwarder_rx_nic.netns.prepare_job(monitor)
+            self._watch_job(job)
+            return job, job
+
         rx_monitor = InterfaceStatsMonitor(
             device=forwarder_rx_nic,
             stats=["rx_packets"],
+            stream_samples=self.live_samples,
         )
         rx_job = sample_flow.forwarder_rx_nic.netns.prepare_job(rx_monitor)
+        self._watch_job(rx_job)
 
         tx_monitor = InterfaceStatsMonitor(
             device=forwarder_tx_nic,
             stats=["tx_packets"],
+            stream_samples=self.live_samples,
         )
         tx_job = sample_flow.forwarder_tx_nic.netns.prepare_job(tx_monitor)
+        self._watch_job(tx_job)
 
         return rx_job, tx_job
 
     def finish(self):
         try:
             self._generator_job.wait(
-                timeout=self._generator_job.what.runtime_estimate()
+                timeout=self._generator_job.what.runtime_estimate(),
+                abort_condition=lambda: self.aborted,
             )
-            self._forwarder_rx_monitor_job.kill(signal.SIGINT)
-            self._forwarder_rx_monitor_job.wait()
-            self._forwarder_tx_monitor_job.kill(signal.SIGINT)
-            self._forwarder_tx_monitor_job.wait()
-            self._dropper_job.wait(timeout=self._dropper_job.what.runtime_estimate())
+            for monitor_job in self._forwarder_monitor_jobs:
+                monitor_job.kill(signal.SIGINT)
+                monitor_job.wait()
+            if not self.aborted:
+                self._dropper_job.wait(
+                    timeout=self._dropper_job.what.runtime_estimate()
+                )
         finally:
             self._generator_job.kill()
-            self._forwarder_rx_monitor_job.kill()
-            self._forwarder_tx_monitor_job.kill()
+            for monitor_job in self._forwarder_monitor_jobs:
+                monitor_job.kill()
             self._dropper_job.kill()
 
         self._finished_generator_job = self._generator_job
@@ -251,11 +280,16 @@ class ForwardingMeasurement(BaseFlowMeasurement):
 
     def collect_results(self):
         receiver_results = self._parse_dropper_results()  # per measurement results
+        sample_flow = self.flows[0]
         forwarder_rx_results = self._parse_fwd_monitor_results(
-            self._finished_fwd_rx_monitor_job, "rx_packets"
+            self._finished_fwd_rx_monitor_job,
+            self._real_dev(sample_flow.forwarder_rx_nic).name,
+            "rx_packets",
         )  # per measurement results
         forwarder_tx_results = self._parse_fwd_monitor_results(
-            self._finished_fwd_tx_monitor_job, "tx_packets"
+            self._finished_fwd_tx_monitor_job,
+            self._real_dev(sample_flow.forwarder_tx_nic).name,
+            "tx_packets",
         )  # per measurement results
         generator_results = self._parse_generator_results()  # per stream results
 
@@ -264,7 +298,8 @@ class ForwardingMeasurement(BaseFlowMeasurement):
 
         result = ForwardingMeasurementResults(
             measurement=self,
-            measurement_success=bool(receiver_results)
+            measurement_success=not self.aborted
+            and bool(receiver_results)
             and bool(generator_results)
             and bool(forwarder_rx_results)
             and bool(forwarder_tx_results),
@@ -287,17 +322,21 @@ class ForwardingMeasurement(BaseFlowMeasurement):
         if not self._finished_generator_job.passed:
             return nic_results
 
-        for nic, raw_results in self._finished_generator_job.result.items():
-            instance_results = SequentialPerfResult()  # instance (device) of pktgen
-
-            for raw_result in raw_results:
-                sample = PerfInterval(
-                    raw_result["packets"],
-                    raw_result["duration"],
-                    "packets",
-                    raw_result["timestamp"],
-                )
-                instance_results.append(sample)
+        raw_results = self._finished_generator_job.result
+        timestamps = [
+            self._finished_generator_job.to_controller_time(t)
+            for t in raw_results["timestamps"]
+        ]
+        intervals = list(zip(timestamps, raw_results["durations"]))
+        for nic, counters in raw_results["devices"].items():
+            instance_results = SequentialPerfResult(
+                [
+                    PerfInterval(packets, duration, "packets", timestamp)
+                    for packets, (timestamp, duration) in zip(
+                        counters["packets"], intervals
+                    )
+                ]
+            )  # instance (device) of pktgen
 
             nic_results[nic] = instance_results
 
@@ -314,42 +353,44 @@ class ForwardingMeasurement(BaseFlowMeasurement):
         for sample in self._finished_dropper_job.result:
             results.append(
                 PerfInterval(
-                    sample["rx"], sample["duration"], "packets", sample["timestamp"]
+                    sample["rx"],
+                    sample["duration"],
+                    "packets",
+                    self._finished_dropper_job.to_controller_time(
+                        sample["timestamp"]
+                    ),
                 )
             )
 
         return results
 
-    def _parse_fwd_monitor_results(self, finished_job, metric):
+    def _parse_fwd_monitor_results(self, finished_job, device_name, metric):
         """
         Parse forwarder results from the interface stats monitor.
 
         :param finished_job: The finished monitor job to parse results from
+        :param device_name: Name of the monitored device
         :param metric: The metric name to parse (e.g., "rx_packets", "tx_packets")
         """
-        result = SequentialPerfResult()
         if not finished_job.passed:
-            return result
+            return SequentialPerfResult()
 
-        raw_samples = finished_job.result
+        timestamps = [
+            finished_job.to_controller_time(t)
+            for t in finished_job.result["timestamps"]
+        ]
+        values = finished_job.result["devices"][device_name]["stats"][metric]
         unit = "packets"
 
-        previous_timestamp = raw_samples[0]["timestamp"]
-        previous_value = raw_samples[0][metric]
-
-        for raw_sample in raw_samples[1:]:
-            sample = PerfInterval(
-                raw_sample[metric] - previous_value,
-                raw_sample["timestamp"] - previous_timestamp,
+        return SequentialPerfResult([
+            PerfInterval(
+                values[i] - values[i - 1],
+                timestamps[i] - timestamps[i - 1],
                 unit,
-                raw_sample["timestamp"],
+                timestamps[i],
             )
-            result.append(sample)
-
-            previous_timestamp = raw_sample["timestamp"]
-            previous_value = raw_sample[metric]
-
-        return result
+            for i in range(1, len(timestamps))
+        ])
 
     def _real_dev(self, device):
         if isinstance(device, VlanDevice):
@@ -1,10 +1,12 @@
 import re
 import time
+import signal
 import logging
 from typing import List
 
 from lnst.Common.IpAddress import ipaddress
 
+from lnst.Controller.Job import start_jobs
 from lnst.Controller.Recipe import RecipeError
 from lnst.Controller.RecipeResults import ResultLevel
 
@@ -21,11 +23,20 @@ from lnst.RecipeCommon.Perf.Measurements.MeasurementError import MeasurementErro
 from lnst.Tests.Iperf import IperfClient, IperfServer
 
 class IperfFlowMeasurement(BaseFlowMeasurement):
+    """
+    With *persistent_servers* the iperf servers are started once, reused by
+    the clients of all iterations and stopped by :any:`teardown`. The
+    receiver results are then retrieved through the clients.
+    """
     _MEASUREMENT_VERSION = 1
 
-    def __init__(self, flows: List[Flow], recipe_conf=None):
+    def __init__(self, flows: List[Flow], recipe_conf=None, reduce_results=False,
+                 persistent_servers=False):
         super(IperfFlowMeasurement, self).__init__(recipe_conf)
         self._flows = flows
+        self._reduce_results = reduce_results
+        self._persistent_servers = persistent_servers
+        self._server_jobs = {}
         self._running_measurements = []
         self._finished_measurements = []
 
@@ -59,15 +70,24 @@ class IperfFlowMeasurement(BaseFlowMeasurement):
         if len(self._running_measurements) > 0:
             raise MeasurementError("Measurement already running!")
 
+        self._reset_abort()
         test_flows = self._prepare_test_flows(self.flows)
 
         result = None
+        new_servers = []
         for flow in test_flows:
-            flow.server_job.start(bg=True)
-
-        time.sleep(2)
-        for flow in test_flows:
-            flow.client_job.start(bg=True)
+            self._watch_job(flow.client_job)
+            if flow.server_job.id is not None:
+                # persistent server from a previous iteration
+                continue
+            self._watch_job(flow.server_job)
+            new_servers.append(flow.server_job)
+
+        start_jobs(new_servers)
+        self._wait_for_jobs_ready(
+            new_servers, timeout=30, replaced_delay=2 if new_servers else 0
+        )
+        self._start_jobs_synchronized([flow.client_job for flow in test_flows])
 
         self._running_measurements = test_flows
 
@@ -88,15 +108,29 @@ class IperfFlowMeasurement(BaseFlowMeasurement):
 
     def finish(self):
         test_flows = self._running_measurements
+        # persistent servers keep running until teardown
+        server_jobs = [] if self._persistent_servers else [
+            flow.server_job for flow in test_flows
+        ]
         try:
             for flow in test_flows:
                 client_iperf = flow.client_job.what
-                flow.client_job.wait(timeout=client_iperf.runtime_estimate())
-                flow.server_job.wait(timeout=5)
+                flow.client_job.wait(timeout=client_iperf.runtime_estimate(),
+                                     abort_condition=lambda: self.aborted)
+                if self.aborted:
+                    break
+                if not self._persistent_servers:
+                    flow.server_job.wait(timeout=5)
+
+            if self.aborted:
+                # iperf still reports the intervals measured until interrupt
+                for job in [flow.client_job for flow in test_flows] + server_jobs:
+                    job.kill(signal.SIGINT)
+                for job in [flow.client_job for flow in test_flows] + server_jobs:
+                    job.wait(timeout=5)
         finally:
-            for flow in test_flows:
-                flow.server_job.kill()
-                flow.client_job.kill()
+            for job in server_jobs + [flow.client_job for flow in test_flows]:
+                job.kill()
 
         self._running_measurements = []
         self._finished_measurements = test_flows
@@ -112,15 +146,36 @@ class IperfFlowMeasurement(BaseFlowMeasurement):
         self._running_measurements = []
         self._finished_measurements = test_flows
 
+    def teardown(self):
+        server_jobs = [job for job in self._server_jobs.values() if job.id is not None]
+        self._server_jobs = {}
+        try:
+            for job in server_jobs:
+                job.kill(signal.SIGINT)
+            for job in server_jobs:
+                job.wait(timeout=5)
+        finally:
+            for job in server_jobs:
+                job.kill()
+
     def collect_results(self):
         test_flows = self._finished_measurements
 
         results = []
         for test_flow in test_flows:
+            if self._persistent_servers:
+                server_passed = not test_flow.server_job.finished
+                receiver_job, server_output = test_flow.client_job, True
+            else:
+                server_passed = test_flow.server_job.passed
+                receiver_job, server_output = test_flow.server_job, False
+
             flow_results = FlowMeasurementResults(
                 measurement=self,
                 measurement_success=(
-                    test_flow.client_job.passed and test_flow.server_job.passed
+                    test_flow.client_job.passed
+                    and server_passed
+                    and not self.aborted
                 ),
                 flow=test_flow.flow,
                 warmup_duration=test_flow.flow.warmup_duration,
@@ -131,9 +186,9 @@ class IperfFlowMeasurement(BaseFlowMeasurement):
                     test_flow.client_job)
 
             flow_results.receiver_results = self._parse_job_streams(
-                    test_flow.server_job)
+                    receiver_job, server_output)
             flow_results.receiver_cpu_stats = self._parse_job_cpu(
-                    test_flow.server_job)
+                    receiver_job, server_output)
 
             results.append(flow_results)
 
@@ -141,17 +196,38 @@ class IperfFlowMeasurement(BaseFlowMeasurement):
 
     def _prepare_test_flows(self, flows):
         test_flows = []
-        for flow in flows:
-            server_job = self._prepare_server(flow)
+        for i, flow in enumerate(flows):
+            server_job = self._get_server(i, flow)
             client_job = self._prepare_client(flow)
             test_flow = NetworkFlowTest(flow, server_job, client_job)
             test_flows.append(test_flow)
         return test_flows
 
+    def _get_server(self, flow_index, flow):
+        if not self._persistent_servers:
+            return self._prepare_server(flow)
+
+        server_job = self._server_jobs.get(flow_index, None)
+        if server_job is not None and server_job.finished:
+            logging.warning("Persistent iperf server on {} is not running, "
+                            "starting a new one".format(flow.receiver.hostid))
+            server_job = None
+
+        if server_job is None:
+            server_job = self._prepare_server(flow)
+            self._server_jobs[flow_index] = server_job
+        return server_job
+
     def _prepare_server(self, flow):
         host = flow.receiver
-        server_params = dict(bind = ipaddress(flow.receiver_bind),
-                             oneoff = True)
+        if self._persistent_servers:
+            server_params = dict(bind = ipaddress(flow.receiver_bind),
+                                 persistent = True)
+        else:
+            server_params = dict(bind = ipaddress(flow.receiver_bind),
+                                 oneoff = True,
+                                 reduce_results = self._reduce_results,
+                                 stream_samples = self.live_samples)
 
         self._set_cpupin_params(server_params, flow.receiver_cpupin)
 
@@ -169,7 +245,10 @@ class IperfFlowMeasurement(BaseFlowMeasurement):
         client_params = {
             "server": ipaddress(flow.receiver_bind),
             "duration": flow.duration,
-            "warmup_duration": flow.warmup_duration
+            "warmup_duration": flow.warmup_duration,
+            "reduce_results": self._reduce_results,
+            "stream_samples": self.live_samples,
+            "get_server_output": self._persistent_servers,
         }
 
         if flow.type == "tcp_stream":
@@ -209,16 +288,30 @@ class IperfFlowMeasurement(BaseFlowMeasurement):
 
             params["cpu_bind"] = cpupin
 
-    def _parse_job_streams(self, job):
+    def _parse_job_streams(self, job, server_output=False):
         result = ParallelPerfResult()
         if not job.passed:
             result.append(SequentialPerfResult([PerfInterval(0, 1, "bits", time.time())]))
+        elif "reduced" in job.result:
+            reduced = self._job_reduced(job, server_output)
+            job_start = job.to_controller_time(reduced["start_timestamp"])
+            for stream_bytes, stream_seconds in zip(reduced["stream_bytes"],
+                                                    reduced["stream_seconds"]):
+                result.append(SequentialPerfResult([
+                    PerfInterval(nbytes * 8, seconds, "bits", job_start + start)
+                    for nbytes, seconds, start in zip(stream_bytes,
+                                                      stream_seconds,
+                                                      reduced["interval_starts"])
+                ]))
         else:
-            for i in job.result["data"]["end"]["streams"]:
+            data = self._job_data(job, server_output)
+            for i in data["end"]["streams"]:
                 result.append(SequentialPerfResult())
 
-            job_start = job.result["data"]["start"]["timestamp"]["timesecs"]
-            for interval in job.result["data"]["intervals"]:
+            job_start = job.to_controller_time(
+                data["start"]["timestamp"]["timesecs"]
+            )
+            for interval in data["intervals"]:
                 interval_start = interval["sum"]["start"]
                 for i, stream in enumerate(interval["streams"]):
                     result[i].append(PerfInterval(stream["bytes"] * 8,
@@ -226,11 +319,30 @@ class IperfFlowMeasurement(BaseFlowMeasurement):
                                                   "bits", job_start + interval_start))
         return result
 
-    def _parse_job_cpu(self, job):
+    def _parse_job_cpu(self, job, server_output=False):
         if not job.passed:
             return PerfInterval(0, 1, "cpu_percent", time.time())
+        elif "reduced" in job.result:
+            reduced = self._job_reduced(job, server_output)
+            cpu_percent = reduced["cpu_utilization_percent"]
+            duration = reduced["duration"]
+            return PerfInterval(cpu_percent*duration, duration, "cpu_percent",
+                                job.to_controller_time(reduced["start_timestamp"]))
         else:
-            cpu_percent = job.result["data"]["end"]["cpu_utilization_percent"]["host_total"]
-            job_start = job.result["data"]["start"]["timestamp"]["timesecs"]
-            duration = job.result["data"]["start"]["test_start"]["duration"]
+            data = self._job_data(job, server_output)
+            cpu_percent = data["end"]["cpu_utilization_percent"]["host_total"]
+            job_start = job.to_controller_time(
+                data["start"]["timestamp"]["timesecs"]
+            )
+            duration = data["start"]["test_start"]["duration"]
             return PerfInterval(cpu_percent*duration, duration, "cpu_percent", job_start)
+
+    @staticmethod
+    def _job_data(job, server_output):
+        data = job.result["data"]
+        return data["server_output_json"] if server_output else data
+
+    @staticmethod
+    def _job_reduced(job, server_output):
+        reduced = job.result["reduced"]
+        return reduced["server_output"] if server_output else reduced
@@ -2,7 +2,7 @@ import time
 import logging
 from typing import List, Dict, Tuple
 from lnst.Common.IpAddress import ipaddress
-from lnst.Controller.Job import Job
+from lnst.Controller.Job import Job, start_jobs
 from lnst.Common.Utils import pairwise
 from lnst.Controller.Recipe import RecipeError
 from lnst.Controller.RecipeResults import ResultLevel
@@ -16,9 +16,10 @@ from lnst.Tests.Neper import NeperServer, NeperClient
 class NeperFlowMeasurement(BaseFlowMeasurement):
     _MEASUREMENT_VERSION = 1
 
-    def __init__(self, flows: List[Flow], recipe_conf=None):
+    def __init__(self, flows: List[Flow], recipe_conf=None, reduce_results=False):
         super(NeperFlowMeasurement, self).__init__(recipe_conf)
         self._flows = flows
+        self._reduce_results = reduce_results
         self._running_measurements = []
         self._finished_measurements = []
         self._host_versions = {}
@@ -38,11 +39,12 @@ class NeperFlowMeasurement(BaseFlowMeasurement):
 
         test_flows = self._prepare_test_flows(self.flows)
 
-        for flow in test_flows:
-            flow.server_job.start(bg=True)
+        start_jobs([flow.server_job for flow in test_flows])
 
-        for flow in test_flows:
-            flow.client_job.start(bg=True)
+        self._wait_for_jobs_ready(
+            [flow.server_job for flow in test_flows], timeout=30
+        )
+        self._start_jobs_synchronized([flow.client_job for flow in test_flows])
 
         self._running_measurements = test_flows
 
@@ -101,7 +103,8 @@ class NeperFlowMeasurement(BaseFlowMeasurement):
         server_params = dict(workload = flow.type,
                              bind = ipaddress(flow.receiver_bind),
                              test_length = flow.duration,
-                             warmup_duration = flow.warmup_duration)
+                             warmup_duration = flow.warmup_duration,
+                             reduce_results = self._reduce_results)
 
         self._set_cpupin_params(server_params, flow.receiver_cpupin)
 
@@ -117,7 +120,8 @@ class NeperFlowMeasurement(BaseFlowMeasurement):
         client_params = dict(workload = flow.type,
                              server = ipaddress(flow.receiver_bind),
                              test_length = flow.duration,
-                             warmup_duration = flow.warmup_duration)
+                             warmup_duration = flow.warmup_duration,
+                             reduce_results = self._reduce_results)
 
         self._set_cpupin_params(client_params, flow.generator_cpupin)
 
@@ -223,8 +227,11 @@ class NeperFlowMeasurement(BaseFlowMeasurement):
             results.append(PerfInterval(0, d, "transactions", time.time()))
             cpu_results.append(PerfInterval(0, d, "cpu_percent", time.time()))
         else:
-            job_start = job.result['start_time']
-            samples = job.result['samples']
+            job_start = job.to_controller_time(job.result['start_time'])
+            if 'reduced' in job.result:
+                samples = reduced_to_samples(job.result['reduced'])
+            else:
+                samples = job.result['samples']
             if samples is not None:
                 neper_start_time = float(samples[0]['time'])
                 for s_start, s_end in pairwise(samples):
@@ -243,6 +250,13 @@ class NeperFlowMeasurement(BaseFlowMeasurement):
         return p_results, p_cpu_results
 
 
+def reduced_to_samples(reduced: Dict) -> List[Dict]:
+    """Converts the per-column arrays returned by agent side reduction
+    back to per-sample dictionaries as expected by :any:`get_interval`"""
+    return [dict(zip(reduced.keys(), values))
+            for values in zip(*reduced.values())]
+
+
 def get_interval(s_start: Dict, s_end: Dict, job_start: float,
                  neper_start: float) -> Tuple[PerfInterval, PerfInterval]:
 
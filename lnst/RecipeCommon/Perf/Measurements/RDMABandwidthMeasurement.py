@@ -36,7 +36,11 @@ class RDMABandwidthMeasurement(BaseFlowMeasurement):
         for endpoint_test in self._endpoint_tests:
             endpoint_test.server_job.start(bg=True)
 
-        time.sleep(2)
+        self._wait_for_jobs_ready(
+            [endpoint_test.server_job for endpoint_test in self._endpoint_tests],
+            timeout=30,
+            replaced_delay=2,
+        )
 
         self._start_timestamp = time.time()
         for endpoint_test in self._endpoint_tests:
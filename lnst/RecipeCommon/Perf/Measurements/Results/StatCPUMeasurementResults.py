@@ -8,6 +8,9 @@ class StatCPUMeasurementResults(CPUMeasurementResults):
         super(StatCPUMeasurementResults, self).__init__(*args, **kwargs)
         self._data = {}
 
+    def set_intervals(self, key, intervals: SequentialPerfResult):
+        self._data[key] = intervals
+
     def update_intervals(self, intervals):
         for key, interval in list(intervals.items()):
             if key not in self._data:
@@ -1,7 +1,7 @@
 import signal
 
 from lnst.Controller.RecipeResults import ResultLevel
-from lnst.RecipeCommon.Perf.Results import PerfInterval
+from lnst.RecipeCommon.Perf.Results import PerfInterval, SequentialPerfResult
 from lnst.RecipeCommon.Perf.Measurements.BaseCPUMeasurement import BaseCPUMeasurement
 from lnst.RecipeCommon.Perf.Measurements.Results import StatCPUMeasurementResults
 
@@ -9,9 +9,14 @@ from lnst.Tests.CPUStatMonitor import CPUStatMonitor
 
 
 class StatCPUMeasurement(BaseCPUMeasurement):
-    def __init__(self, hosts, recipe_conf=None):
+    """
+    :param interval:
+        sampling interval of the CPU counters in milliseconds
+    """
+    def __init__(self, hosts, recipe_conf=None, interval=1000):
         super(StatCPUMeasurement, self).__init__(recipe_conf)
         self._hosts = hosts
+        self._interval = interval
         self._running_measurements = []
         self._finished_measurements = []
 
@@ -24,15 +29,18 @@ class StatCPUMeasurement(BaseCPUMeasurement):
         return self._hosts
 
     def start(self):
+        self._reset_abort()
         jobs = []
         for host in sorted(self.hosts, key=lambda x: x.hostid):
-            jobs.append(
-                host.run(
-                    CPUStatMonitor(interval=1000),
-                    bg=True,
-                    job_level=ResultLevel.NORMAL,
-                )
+            job = host.prepare_job(
+                CPUStatMonitor(
+                    interval=self._interval,
+                    stream_samples=self.live_samples,
+                ),
+                job_level=ResultLevel.NORMAL,
             )
+            self._watch_job(job)
+            jobs.append(job.start(bg=True))
         self._running_measurements = jobs
 
     def finish(self):
@@ -57,35 +65,31 @@ class StatCPUMeasurement(BaseCPUMeasurement):
         return results
 
     def _process_job(self, job):
-        host = job.host
-        job_results = {}
-        for sample in job.result["data"]:
-            parsed_sample = self._parse_sample(sample)
-
-            for cpu, cpu_intervals in list(parsed_sample.items()):
-                if cpu not in job_results:
-                    job_results[cpu] = StatCPUMeasurementResults(
-                        measurement=self,
-                        measurement_success=job.passed,
-                        host=host,
-                        cpu=cpu
+        data = job.result["data"]
+        cpus = data["cpus"] or []
+        counters = data["counters"] or []
+        deltas = data["deltas"]
+        row_size = len(cpus) * len(counters)
+        timestamps = [job.to_controller_time(t) for t in data["timestamps"]]
+        intervals = list(zip(timestamps, data["durations"]))
+
+        job_results = []
+        for cpu_index, cpu in enumerate(cpus):
+            cpu_results = StatCPUMeasurementResults(
+                measurement=self,
+                measurement_success=job.passed,
+                host=job.host,
+                cpu=cpu
+            )
+            for counter_index, counter in enumerate(counters):
+                # column of the (intervals x cpus x counters) matrix
+                offset = cpu_index * len(counters) + counter_index
+                cpu_results.set_intervals(counter, SequentialPerfResult([
+                    PerfInterval(value, duration, "time units", timestamp)
+                    for value, (timestamp, duration) in zip(
+                        deltas[offset::row_size], intervals
                     )
-                cpu_results = job_results[cpu]
-                cpu_results.update_intervals(cpu_intervals)
-
-        return list(job_results.values())
-
-    def _parse_sample(self, sample):
-        result = {}
-        duration = sample["duration"]
-        timestamp = sample["timestamp"]
-        for key, value in list(sample.items()):
-            if key.startswith("cpu"):
-                result[key] = self._create_cpu_intervals(duration, value, timestamp)
-        return result
+                ]))
+            job_results.append(cpu_results)
 
-    def _create_cpu_intervals(self, duration, cpu_intervals, timestamp):
-        result = {}
-        for key, value in list(cpu_intervals.items()):
-            result[key] = PerfInterval(value, duration, "time units", timestamp)
-        return result
+        return job_results
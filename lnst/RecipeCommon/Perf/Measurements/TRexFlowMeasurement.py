@@ -60,8 +60,9 @@ class TRexFlowMeasurement(BaseFlowMeasurement):
         for test in tests:
             test.server_job.start(bg=True)
 
-        #wait for Trex server to start
-        time.sleep(15)
+        self._wait_for_jobs_ready(
+            [test.server_job for test in tests], timeout=150, replaced_delay=15
+        )
 
         for test in tests:
             test.client_job.start(bg=True)
@@ -183,23 +184,24 @@ class TRexFlowMeasurement(BaseFlowMeasurement):
             results.receiver_results.append(PerfInterval(0, 1, "packets", timestamp))
             results.receiver_cpu_stats.append(PerfInterval(0, 1, "cpu_percent", timestamp))
         else:
-            prev_time = job.result["start_time"]
+            prev_time = job.to_controller_time(job.result["start_time"])
             prev_tx_val = 0
             prev_rx_val = 0
             for i in job.result["data"]:
-                time_delta = i["timestamp"] - prev_time
+                timestamp = job.to_controller_time(i["timestamp"])
+                time_delta = timestamp - prev_time
                 tx_delta = i["measurement"][port]["opackets"] - prev_tx_val
                 rx_delta = i["measurement"][port]["ipackets"] - prev_rx_val
                 results.generator_results.append(PerfInterval(
                             tx_delta,
                             time_delta,
-                            "pkts", i["timestamp"]))
+                            "pkts", timestamp))
                 results.receiver_results.append(PerfInterval(
                             rx_delta,
                             time_delta,
-                            "pkts", i["timestamp"]))
+                            "pkts", timestamp))
 
-                prev_time = i["timestamp"]
+                prev_time = timestamp
                 prev_tx_val = i["measurement"][port]["opackets"]
                 prev_rx_val = i["measurement"][port]["ipackets"]
 
@@ -207,9 +209,9 @@ class TRexFlowMeasurement(BaseFlowMeasurement):
                 results.generator_cpu_stats.append(PerfInterval(
                     cpu_delta,
                     time_delta,
-                    "cpu_percent", i["timestamp"]))
+                    "cpu_percent", timestamp))
                 results.receiver_cpu_stats.append(PerfInterval(
                     cpu_delta,
                     time_delta,
-                    "cpu_percent", i["timestamp"]))
+                    "cpu_percent", timestamp))
         return results
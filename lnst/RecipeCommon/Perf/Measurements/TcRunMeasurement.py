@@ -216,7 +216,7 @@ class TcRunMeasurement(BaseMeasurement):
             device=self.device,
         )
         run_result.rule_install_rate = ParallelPerfResult(
-            [self._get_instance_interval(d) for d in instance_data]
+            [self._get_instance_interval(job, d) for d in instance_data]
         )
 
         return [run_result]
@@ -233,12 +233,12 @@ class TcRunMeasurement(BaseMeasurement):
         run_result.run_success = True
         return [run_result]
 
-    def _get_instance_interval(self, instance_data: dict):
+    def _get_instance_interval(self, job: Job, instance_data: dict):
         return PerfInterval(
             value=self._rules_per_instance,
             duration=instance_data['time_taken'],
             unit='rules',
-            timestamp=instance_data['start_timestamp'],
+            timestamp=job.to_controller_time(instance_data['start_timestamp']),
         )
 
     @classmethod
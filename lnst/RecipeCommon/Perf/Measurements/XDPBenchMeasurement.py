@@ -205,16 +205,17 @@ class XDPBenchMeasurement(BaseFlowMeasurement):
             results.append(PerfInterval(0, 1, "packets", time.time()))
             return results
 
-        for _, raw_results in job.result.items():
-            instance_results = SequentialPerfResult()  # instance (device) of pktgen
-            for raw_result in raw_results:
-                sample = PerfInterval(
-                    raw_result["packets"],
-                    raw_result["duration"],
-                    "packets",
-                    raw_result["timestamp"],
-                )
-                instance_results.append(sample)
+        timestamps = [job.to_controller_time(t) for t in job.result["timestamps"]]
+        intervals = list(zip(timestamps, job.result["durations"]))
+        for counters in job.result["devices"].values():
+            instance_results = SequentialPerfResult(
+                [
+                    PerfInterval(packets, duration, "packets", timestamp)
+                    for packets, (timestamp, duration) in zip(
+                        counters["packets"], intervals
+                    )
+                ]
+            )  # instance (device) of pktgen
             results.append(instance_results)
 
         return results
@@ -239,7 +240,10 @@ class XDPBenchMeasurement(BaseFlowMeasurement):
         for sample in job.result:
             results.append(
                 PerfInterval(
-                    sample["rx"], sample["duration"], "packets", sample["timestamp"]
+                    sample["rx"],
+                    sample["duration"],
+                    "packets",
+                    job.to_controller_time(sample["timestamp"]),
                 )
             )
 
@@ -190,18 +190,22 @@ class XDPRedirectCPUMeasurement(BaseFlowMeasurement):
         if not self._finished_generator_job.passed:
             return ParallelPerfResult()
 
+        raw_results = self._finished_generator_job.result
+        timestamps = [
+            self._finished_generator_job.to_controller_time(t)
+            for t in raw_results["timestamps"]
+        ]
+        intervals = list(zip(timestamps, raw_results["durations"]))
         results = ParallelPerfResult()
-        for _, raw_results in self._finished_generator_job.result.items():
-            instance_results = SequentialPerfResult()
-            for raw_result in raw_results:
-                instance_results.append(
-                    PerfInterval(
-                        raw_result["packets"],
-                        raw_result["duration"],
-                        "packets",
-                        raw_result["timestamp"],
+        for counters in raw_results["devices"].values():
+            instance_results = SequentialPerfResult(
+                [
+                    PerfInterval(packets, duration, "packets", timestamp)
+                    for packets, (timestamp, duration) in zip(
+                        counters["packets"], intervals
                     )
-                )
+                ]
+            )
             results.append(instance_results)
         return results
 
@@ -226,12 +230,15 @@ class XDPRedirectCPUMeasurement(BaseFlowMeasurement):
         irq_total = SequentialPerfResult()
 
         for sample in self._finished_receiver_job.result:
+            timestamp = self._finished_receiver_job.to_controller_time(
+                sample["timestamp"]
+            )
             irq_total.append(
                 PerfInterval(
                     sample["received"],
                     sample["duration"],
                     "packets",
-                    sample["timestamp"],
+                    timestamp,
                 )
             )
             for cpu, pkts in sample["forwarded_per_cpu"].items():
@@ -245,7 +252,7 @@ class XDPRedirectCPUMeasurement(BaseFlowMeasurement):
                         pkts,
                         sample["duration"],
                         "packets",
-                        sample["timestamp"],
+                        timestamp,
                     )
                 )
 
@@ -1,6 +1,8 @@
 import logging
+import math
+import statistics
 from collections import OrderedDict
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Optional, Tuple, Union
 
 from lnst.Common.LnstError import LnstError
 from lnst.Common.Logs import log_exc_traceback
@@ -25,12 +27,35 @@ class RecipeConf(object):
         iterations: int,
         parent_recipe_config: Any = None,
         simulate_measurements: bool = False,
+        min_iterations: Optional[int] = None,
+        target_rse: Union[None, float, Dict[str, float]] = None,
     ):
+        """
+        :param iterations:
+            number of times the measurements are repeated, when *target_rse*
+            is set this is the maximum number of iterations
+        :param min_iterations:
+            minimum number of iterations to run before the results are
+            checked against *target_rse*, defaults to 3 (but at least 2 are
+            always needed to estimate the error)
+        :param target_rse:
+            enables adaptive iteration count. The relative standard error of
+            the per iteration averages of each metric is evaluated after
+            every iteration and the test stops as soon as all metrics are
+            within the target. Either a single value (e.g. 0.01 for 1%) used
+            for all metrics or a dictionary with a value per metric name,
+            metrics not present in the dictionary are not checked.
+        """
         self._measurements = measurements
         self._evaluators = dict()
         self._iterations = iterations
         self._parent_recipe_config = parent_recipe_config
         self._simulate_measurements = simulate_measurements
+        self._target_rse = target_rse
+
+        if min_iterations is None:
+            min_iterations = 3
+        self._min_iterations = min(max(min_iterations, 2), iterations)
 
     @property
     def measurements(self):
@@ -60,6 +85,72 @@ class RecipeConf(object):
     def iterations(self):
         return self._iterations
 
+    @property
+    def min_iterations(self):
+        return self._min_iterations
+
+    @property
+    def adaptive_iterations(self) -> bool:
+        return self._target_rse is not None
+
+    def metric_target_rse(self, metric: str) -> Optional[float]:
+        if isinstance(self._target_rse, dict):
+            return self._target_rse.get(metric, None)
+        return self._target_rse
+
+    def checked_metrics(
+        self, results: "RecipeResults"
+    ) -> Dict[Tuple[BaseMeasurement, int, str], float]:
+        """Returns the relative standard errors of the metrics with a target"""
+        return {
+            key: rse
+            for key, rse in results.relative_standard_errors().items()
+            if self.metric_target_rse(key[2]) is not None
+        }
+
+    def unstable_metrics(
+        self, results: "RecipeResults"
+    ) -> List[Tuple[BaseMeasurement, str, float]]:
+        """Returns the metrics whose relative standard error is above target
+
+        :return: list of (measurement, metric name, relative standard error)
+        """
+        unstable = []
+        for (measurement, _, metric), rse in self.checked_metrics(results).items():
+            if rse > self.metric_target_rse(metric):
+                unstable.append((measurement, metric, rse))
+        return unstable
+
+    def runtime_estimate(self) -> float:
+        """Estimated duration of the perf test in seconds
+
+        All iterations are counted, an adaptive perf test may finish
+        earlier.
+        """
+        if self.simulate_measurements:
+            return 0
+        return self.iterations * max(
+            (m.runtime_estimate() for m in self.measurements), default=0
+        )
+
+    def iterations_sufficient(self, results: "RecipeResults") -> bool:
+        """Checks if the adaptive iteration count stopping condition is met
+
+        When none of the measured metrics has a target, all the iterations
+        are run.
+        """
+        if results.iteration_count >= self.iterations:
+            return True
+
+        if (
+            not self.adaptive_iterations
+            or results.iteration_count < self.min_iterations
+            or not self.checked_metrics(results)
+        ):
+            return False
+
+        return len(self.unstable_metrics(results)) == 0
+
     @property
     def parent_recipe_config(self):
         return self._parent_recipe_config
@@ -99,6 +190,45 @@ class RecipeResults(object):
         )
         self._aggregated_results[measurement] = aggregated_results
 
+    @property
+    def iteration_count(self) -> int:
+        return max(
+            (len(results) for results in self.results.values()), default=0
+        )
+
+    def relative_standard_errors(
+        self,
+    ) -> Dict[Tuple[BaseMeasurement, int, str], float]:
+        """Relative standard error of the per iteration metric averages
+
+        The results are keyed by the measurement, index of the result within
+        an iteration (e.g. the flow for flow measurements) and the metric
+        name. Metrics without a value or with fewer than two iterations are
+        skipped.
+        """
+        errors = {}
+        for measurement, measurement_results in self.results.items():
+            if len(measurement_results) < 2:
+                continue
+
+            for index, result_iterations in enumerate(zip(*measurement_results)):
+                for metric in result_iterations[0].metrics:
+                    values = [getattr(result, metric, None) for result in result_iterations]
+                    if not all(hasattr(value, "average") for value in values):
+                        continue
+
+                    averages = [value.average for value in values]
+                    mean = statistics.mean(averages)
+                    stdev = statistics.stdev(averages)
+                    if stdev == 0:
+                        rse = 0.0
+                    elif mean == 0:
+                        rse = math.inf
+                    else:
+                        rse = stdev / math.sqrt(len(averages)) / abs(mean)
+                    errors[(measurement, index, metric)] = rse
+        return errors
+
     """
         Function returns end timestamp of warmup period and start of warm down period.
         That results to slice measurement result just for "interesting" part not including 
@@ -117,7 +247,7 @@ class RecipeResults(object):
     @property
     def time_aligned_results(self) -> "RecipeResults":
         timestamps = []
-        for i in range(self.recipe_conf.iterations):
+        for i in range(self.iteration_count):
             iteration_results_group = [
                 measurement_iteration_result
                 for measurement_results in self.results.values()
@@ -151,8 +281,13 @@ class RecipeResults(object):
 class Recipe(
     BasePerfTestTweakMixin, BasePerfTestIterationTweakMixin, BaseRecipe
 ):
+    # time saved by measurements waiting for server readiness instead of
+    # fixed delays, summed over the whole recipe run
+    _readiness_time_saved = 0.0
+
     def perf_test(self, recipe_conf: RecipeConf):
         results = RecipeResults(recipe_conf)
+        saved_before = self._measurements_readiness_time_saved(recipe_conf)
 
         self.apply_perf_test_tweak(recipe_conf)
         self.describe_perf_test_tweak(recipe_conf)
@@ -160,11 +295,68 @@ class Recipe(
         try:
             for i in range(recipe_conf.iterations):
                 self.perf_test_iteration(recipe_conf, results)
+                if recipe_conf.iterations_sufficient(results):
+                    break
         finally:
-            self.remove_perf_test_tweak(recipe_conf)
+            try:
+                self.remove_perf_test_tweak(recipe_conf)
+            finally:
+                for measurement in recipe_conf.measurements:
+                    measurement.teardown()
+            self._report_readiness_time_saved(recipe_conf, saved_before)
+
+        if recipe_conf.adaptive_iterations:
+            self.describe_adaptive_iterations(recipe_conf, results)
 
         return results
 
+    @staticmethod
+    def _measurements_readiness_time_saved(recipe_conf: RecipeConf) -> float:
+        return sum(
+            measurement.readiness_time_saved
+            for measurement in recipe_conf.measurements
+        )
+
+    def _report_readiness_time_saved(
+        self, recipe_conf: RecipeConf, saved_before: float
+    ):
+        saved = self._measurements_readiness_time_saved(recipe_conf) - saved_before
+        self._readiness_time_saved += saved
+        logging.info(
+            "Server readiness probing saved {:.2f} seconds in this perf test, "
+            "{:.2f} seconds in this recipe run".format(
+                saved, self._readiness_time_saved
+            )
+        )
+
+    def describe_adaptive_iterations(
+        self, recipe_conf: RecipeConf, results: RecipeResults
+    ):
+        unstable = recipe_conf.unstable_metrics(results)
+        description = [
+            "Adaptive perf test finished after {} of maximum {} iterations".format(
+                results.iteration_count, recipe_conf.iterations
+            )
+        ]
+        result = ResultType.PASS
+        if results.iteration_count > 1 and not recipe_conf.checked_metrics(results):
+            description.append(
+                "None of the measured metrics has a target relative standard "
+                "error, all iterations were run"
+            )
+            result = ResultType.WARNING
+        for measurement, metric, rse in unstable:
+            description.append(
+                "{} metric {} relative standard error {:.2%} above target {:.2%}".format(
+                    measurement, metric, rse,
+                    recipe_conf.metric_target_rse(metric),
+                )
+            )
+            result = ResultType.WARNING
+        if result == ResultType.WARNING:
+            logging.warning("\n".join(description))
+        self.add_result(result, "\n".join(description))
+
     def perf_test_iteration(
         self, recipe_conf: RecipeConf, results: RecipeResults
     ):
@@ -85,6 +85,13 @@ class PingTestAndEvaluate(BaseRecipe):
 
         return results
 
+    def ping_runtime_estimate(self, ping_configs) -> int:
+        """Estimated duration of a ping test of configs run in parallel"""
+        return max(
+            (self._estimate_ping_duration(pconf) for pconf in ping_configs),
+            default=0,
+        )
+
     def _estimate_ping_duration(self, ping_config: PingConf) -> int:
         if ping_config.count and ping_config.interval:
             estimate = int((ping_config.count*ping_config.interval) + 10)
@@ -1,5 +1,6 @@
 import pprint
 import copy
+import logging
 from contextlib import contextmanager
 from typing import Literal, Optional
 
@@ -9,6 +10,7 @@ from lnst.Common.Parameters import (
     IntParam,
     BoolParam,
     FloatParam,
+    StrParam,
 )
 from lnst.Common.IpAddress import AF_INET, AF_INET6, BaseIpAddress
 from lnst.Controller.RecipeResults import ResultType
@@ -25,6 +27,10 @@ from lnst.RecipeCommon.Perf.Measurements.BaseCPUMeasurement import BaseCPUMeasur
 from lnst.RecipeCommon.Perf.Measurements.BaseFlowMeasurement import BaseFlowMeasurement
 from lnst.RecipeCommon.Perf.Evaluators import NonzeroFlowEvaluator
 from lnst.RecipeCommon.Ping.Evaluators import RatePingEvaluator
+from lnst.RecipeCommon.ExecutionPlan import (
+    PlanStage,
+    RuntimeHistory,
+)
 
 
 class EnrtConfiguration:
@@ -179,11 +185,52 @@ class BaseEnrtRecipe(
         to generate cumulative results which can be statistically analyzed.
     :type perf_iterations: :any:`IntParam` (default 5)
 
+    :param perf_target_rse:
+        Parameter used by the :any:`generate_perf_configurations` generator.
+        Enables adaptive iteration count, performance measurements are
+        repeated only until the relative standard error of the flow
+        throughput metrics (generator and receiver results) drops below this
+        value (e.g. 0.01 for 1%), at most **perf_iterations** times. CPU
+        utilization metrics are not checked since near idle CPUs never
+        converge to a low relative error, perf configurations without the
+        flow throughput metrics (e.g. CPU only) run all **perf_iterations**.
+    :type perf_target_rse: :any:`FloatParam` (default None)
+
+    :param perf_min_iterations:
+        Parameter used by the :any:`generate_perf_configurations` generator.
+        Minimum number of iterations to run before the adaptive iteration
+        count stopping condition is evaluated. Only used together with
+        **perf_target_rse**.
+    :type perf_min_iterations: :any:`IntParam` (default 3)
+
     :param perf_test_simulation:
         Parameter that will switch the performance testing into a simulation
         mode only - no measurements will actually be started and they'll simply
         generate 0 value measurement results as if they ran
     :type perf_test_simulation: :any:`BoolParam` (default False)
+
+    :param shard_sub_configs:
+        Parameter that allows the sub configurations to be distributed between
+        several matches when the recipe is run sharded, see the `shards`
+        parameter of :any:`Controller.run`. Should be disabled for hardware
+        sensitive measurements where all of the results need to come from the
+        same machines to be comparable.
+    :type shard_sub_configs: :any:`BoolParam` (default True)
+
+    :param dry_run:
+        Parameter that stops the recipe after the execution plan generated by
+        :any:`generate_execution_plan` is reported. Only the test wide
+        configuration is applied (the tested endpoints and flows depend on
+        it), no sub configuration is applied and no tests are run.
+    :type dry_run: :any:`BoolParam` (default False)
+
+    :param runtime_history:
+        Parameter that specifies the path of a file with the actual and
+        estimated durations of the execution plan stages of previous runs,
+        see :any:`RuntimeHistory`. The estimates of the execution plan are
+        refined with the history and the durations of this run are added to
+        it.
+    :type runtime_history: :any:`StrParam` (default None)
     """
     #common test parameters
     ip_versions = Param(default=("ipv4", "ipv6"))
@@ -197,8 +244,17 @@ class BaseEnrtRecipe(
 
     # generic perf test params
     perf_iterations = IntParam(default=5)
+    perf_target_rse = FloatParam()
+    perf_min_iterations = IntParam(default=3)
     perf_test_simulation = BoolParam(default=False)
 
+    shard_sub_configs = BoolParam(default=True)
+
+    dry_run = BoolParam(default=False)
+    runtime_history = StrParam()
+
+    _current_plan_stage = None
+
     def test(self):
         """Main test loop shared by all the Enrt recipes
 
@@ -208,16 +264,160 @@ class BaseEnrtRecipe(
 
         * creating the combined sub configuration of all available SubConfig
           Mixin classes via :any:`generate_sub_configurations`
-        * applying the generated sub configuration via the :any:`_sub_context`
-          context manager method
+        * switching from the previous to the generated sub configuration via
+          the :any:`_sub_remove` and :any:`_sub_apply` methods
         * running tests
-        * removing the current sub configuration via the :any:`_sub_context`
-          context manager method
+
+        The last sub configuration is removed when the loop ends, also if any
+        exceptions are raised. When switching fails while removing the
+        previous sub configuration, it's removed completely, including the
+        settings that would be kept for the next one.
+
+        When the recipe is run sharded, only the sub configurations claimed
+        by the current shard are processed. When the run is checkpointed, the
+        sub configurations (and the ping and perf tests within them)
+        completed by the resumed run are skipped.
+
+        Before the loop the execution plan of the run is reported, the actual
+        durations of its stages are reported when the loop ends.
         """
         with self._test_wide_context() as main_config:
-            for sub_config in self.generate_sub_configurations(main_config):
-                with self._sub_context(sub_config) as recipe_config:
-                    self.do_tests(recipe_config)
+            plan = self.generate_execution_plan(main_config)
+            history = None
+            if self.params.get("runtime_history", None):
+                history = RuntimeHistory(self.params.runtime_history)
+                history.refine_plan(plan)
+            self.describe_execution_plan(plan)
+            if self.params.dry_run:
+                return
+
+            sub_configs = self.ctl.shard_items(
+                enumerate(self.generate_sub_configurations(main_config))
+            )
+            applied = None
+            self._current_plan_stage = plan
+            try:
+                with plan.timed():
+                    for index, sub_config in sub_configs:
+                        with self.ctl.checkpoint_unit(("sub_config", index)) as unit:
+                            if unit.completed:
+                                continue
+
+                            with self._plan_stage(("sub_config", index)):
+                                previous, applied = applied, None
+                                if previous is not None:
+                                    try:
+                                        self._sub_remove(previous, sub_config)
+                                    except:
+                                        # settings kept for sub_config
+                                        # would never be restored
+                                        self.remove_sub_configuration(previous)
+                                        raise
+
+                                applied = sub_config
+                                self._sub_apply(sub_config, previous)
+                                self.describe_sub_configuration(sub_config)
+                                self.do_tests(sub_config)
+            finally:
+                self._current_plan_stage = None
+                if applied is not None:
+                    self.remove_sub_configuration(applied)
+
+                self.describe_execution_plan(plan)
+                if history is not None:
+                    history.update(plan)
+
+    @property
+    def shardable(self):
+        return self.params.shard_sub_configs
+
+    def generate_execution_plan(self, config):
+        """Generates the execution plan of the test loop
+
+        Walks the sub configurations, ping configurations and perf
+        configurations the :any:`test` loop would run, without applying any of
+        them, and estimates the duration of every ping and perf test. Tests
+        that can't be generated before their sub configuration is applied
+        are added to the plan with an unknown duration, they're recognized
+        by raising one of the :any:`_plan_state_errors` when they look up the
+        missing state. Other exceptions are raised.
+
+        :return: the root stage of the plan
+        :rtype: :any:`PlanStage`
+        """
+        plan = PlanStage(("recipe",), self.__class__.__name__)
+        sub_configs = self.generate_sub_configurations(config)
+        for index, sub_config in enumerate(sub_configs):
+            sub_stage = plan.add(PlanStage(
+                ("sub_config", index), "sub configuration {}".format(index)
+            ))
+
+            try:
+                ping_estimate = sum(
+                    self.ping_runtime_estimate(ping_configs)
+                    for ping_configs in self.generate_ping_configurations(sub_config)
+                )
+            except self._plan_state_errors as exc:
+                self._unknown_plan_stage("ping", index, exc)
+                ping_estimate = None
+            sub_stage.add(PlanStage(("ping",), "ping tests", ping_estimate))
+
+            try:
+                perf_stages = [
+                    PlanStage(
+                        ("perf", perf_index),
+                        "perf test {}: {}".format(
+                            perf_index,
+                            ", ".join(m.name for m in perf_config.measurements),
+                        ),
+                        perf_config.runtime_estimate(),
+                    )
+                    for perf_index, perf_config in enumerate(
+                        self.generate_perf_configurations(sub_config)
+                    )
+                ]
+            except self._plan_state_errors as exc:
+                self._unknown_plan_stage("perf", index, exc)
+                perf_stages = [PlanStage(("perf",), "perf tests", None)]
+            for perf_stage in perf_stages:
+                sub_stage.add(perf_stage)
+        return plan
+
+    # some recipes generate their tests from state created only when the sub
+    # configuration is applied (e.g. the MACsec devices), looking it up fails
+    # with one of these
+    _plan_state_errors = (AttributeError, KeyError)
+
+    def _unknown_plan_stage(self, kind, sub_config_index, exc):
+        logging.info(
+            "Can't estimate the {} tests of sub configuration {} before it's "
+            "applied: {}: {}".format(
+                kind, sub_config_index, exc.__class__.__name__, exc
+            )
+        )
+
+    def describe_execution_plan(self, plan):
+        description = ["Execution plan, estimated total duration {}".format(
+            plan.format_estimate()
+        )]
+        description.extend(plan.format())
+        self.add_result(ResultType.PASS, "\n".join(description))
+
+    @contextmanager
+    def _plan_stage(self, key):
+        """Records the actual duration of a stage of the execution plan"""
+        parent = self._current_plan_stage
+        stage = parent.child(key) if parent is not None else None
+        if stage is None:
+            yield None
+            return
+
+        self._current_plan_stage = stage
+        try:
+            with stage.timed():
+                yield stage
+        finally:
+            self._current_plan_stage = parent
 
     @contextmanager
     def _test_wide_context(self):
@@ -322,14 +522,31 @@ class BaseEnrtRecipe(
             )
         ]
 
-    @contextmanager
-    def _sub_context(self, config):
+    def _sub_remove(self, config, next_config):
+        """Removes the sub configuration before applying *next_config*
+
+        The mixins are told about the following sub configuration through the
+        `next_sub_config` attribute, see :any:`BaseSubConfigMixin`, so they
+        can keep the settings that don't change.
+        """
+        config.next_sub_config = next_config
+        try:
+            self.remove_sub_configuration(config)
+        finally:
+            del config.next_sub_config
+
+    def _sub_apply(self, config, previous_config):
+        """Applies the sub configuration after *previous_config* was removed
+
+        The mixins are told about the previous sub configuration through the
+        `previous_sub_config` attribute, see :any:`BaseSubConfigMixin`, so
+        they can apply only the settings that changed.
+        """
+        config.previous_sub_config = previous_config
         try:
             self.apply_sub_configuration(config)
-            self.describe_sub_configuration(config)
-            yield config
         finally:
-            self.remove_sub_configuration(config)
+            del config.previous_sub_config
 
     def describe_sub_configuration(self, config):
         description = self.generate_sub_configuration_description(config)
@@ -351,9 +568,14 @@ class BaseEnrtRecipe(
         :any:`generate_ping_configurations` method, then uses the PingRecipe
         methods to execute, report and evaluate the results.
         """
-        for ping_configs in self.generate_ping_configurations(recipe_config):
-            result = self.ping_test(ping_configs)
-            self.ping_report_and_evaluate(result)
+        with self.ctl.checkpoint_unit(("ping",)) as unit:
+            if unit.completed:
+                return
+
+            with self._plan_stage(("ping",)):
+                for ping_configs in self.generate_ping_configurations(recipe_config):
+                    result = self.ping_test(ping_configs)
+                    self.ping_report_and_evaluate(result)
 
     def describe_perf_test_tweak(self, perf_config):
         description = self.generate_perf_test_tweak_description(perf_config)
@@ -366,9 +588,15 @@ class BaseEnrtRecipe(
         :any:`generate_perf_configurations` method, then uses the PerfRecipe
         methods to execute, report and evaluate the results.
         """
-        for perf_config in self.generate_perf_configurations(recipe_config):
-            result = self.perf_test(perf_config)
-            self.perf_report_and_evaluate(result)
+        perf_configs = self.generate_perf_configurations(recipe_config)
+        for index, perf_config in enumerate(perf_configs):
+            with self.ctl.checkpoint_unit(("perf", index)) as unit:
+                if unit.completed:
+                    continue
+
+                with self._plan_stage(("perf", index)):
+                    result = self.perf_test(perf_config)
+                    self.perf_report_and_evaluate(result)
 
     def generate_ping_configurations(self, config):
         """Base ping test configuration generator
@@ -463,11 +691,22 @@ class BaseEnrtRecipe(
                 iterations=self.params.perf_iterations,
                 parent_recipe_config=copy.deepcopy(config),
                 simulate_measurements=self.params.perf_test_simulation,
+                min_iterations=self.params.perf_min_iterations,
+                target_rse=self._perf_target_rse(),
             )
             self.register_perf_evaluators(perf_conf)
 
             yield perf_conf
 
+    def _perf_target_rse(self):
+        target_rse = self.params.get("perf_target_rse", None)
+        if target_rse is None:
+            return None
+        return {
+            "generator_results": target_rse,
+            "receiver_results": target_rse,
+        }
+
     def register_perf_evaluators(self, perf_conf):
         """Registrator for perf evaluators
 
@@ -3,10 +3,19 @@ from lnst.Recipes.ENRT.ConfigMixins.BaseSubConfigMixin import BaseSubConfigMixin
 class BaseHWConfigMixin(BaseSubConfigMixin):
     def apply_sub_configuration(self, config):
         super().apply_sub_configuration(config)
-        self.hw_config(config)
+
+        # the hw configuration is the same for all sub configurations, it's
+        # kept configured between them
+        previous = getattr(config, "previous_sub_config", None)
+        if previous is not None and hasattr(previous, "hw_config"):
+            config.hw_config = previous.hw_config
+            del previous.hw_config
+        else:
+            self.hw_config(config)
 
     def remove_sub_configuration(self, config):
-        self.hw_deconfig(config)
+        if getattr(config, "next_sub_config", None) is None:
+            self.hw_deconfig(config)
         return super().remove_sub_configuration(config)
 
     def generate_sub_configuration_description(self, config):
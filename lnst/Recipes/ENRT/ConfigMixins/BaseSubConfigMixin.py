@@ -2,6 +2,15 @@ class BaseSubConfigMixin(object):
     """
     This is a base class that defines common API for specific *sub*
     configuration mixin classes.
+
+    When switching between two consecutive sub configurations the recipe
+    calls :meth:`remove_sub_configuration` with the `next_sub_config`
+    attribute of the removed config set to the following config and then
+    :meth:`apply_sub_configuration` with the `previous_sub_config` attribute
+    set to the removed config. Both attributes are None for the first and the
+    last sub configuration. A mixin can use them to keep settings that don't
+    change between the two configurations instead of restoring and applying
+    them again, only the last sub configuration has to be removed completely.
     """
 
     def generate_sub_configurations(self, config):
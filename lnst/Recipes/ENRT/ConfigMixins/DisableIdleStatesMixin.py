@@ -31,7 +31,10 @@ class DisableIdleStatesMixin(BaseSubConfigMixin):
         super().apply_sub_configuration(config)
 
         latency = getattr(self.params, "minimal_idlestates_latency", None)
-        if latency is not None:
+        if (
+            latency is not None
+            and getattr(config, "previous_sub_config", None) is None
+        ):
             for host in self.disable_idlestates_host_list:
                 # TODO: save previous state
                 host.run("cpupower idle-set -D {}".format(latency))
@@ -51,6 +54,10 @@ class DisableIdleStatesMixin(BaseSubConfigMixin):
         return description
 
     def remove_sub_configuration(self, config):
+        if getattr(config, "next_sub_config", None) is not None:
+            # kept disabled for the next sub configuration
+            return super().remove_sub_configuration(config)
+
         for host in self.disable_idlestates_host_list:
             if getattr(self.params, "minimal_idlestates_latency", None) is not None:
                 host.run("cpupower idle-set -E")
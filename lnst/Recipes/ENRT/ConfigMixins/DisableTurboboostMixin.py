@@ -39,6 +39,10 @@ class DisableTurboboostMixin(BaseSubConfigMixin):
     def apply_sub_configuration(self, config):
         super().apply_sub_configuration(config)
 
+        if getattr(config, "previous_sub_config", None) is not None:
+            # kept disabled since the previous sub configuration
+            return
+
         if self.params.disable_turboboost:
             for host in self.disable_turboboost_host_list:
                 if self._is_turboboost_supported(host):
@@ -62,7 +66,10 @@ class DisableTurboboostMixin(BaseSubConfigMixin):
         return description
 
     def remove_sub_configuration(self, config):
-        if self.params.disable_turboboost:
+        if (
+            self.params.disable_turboboost
+            and getattr(config, "next_sub_config", None) is None
+        ):
             for host in self.disable_turboboost_host_list:
                 if self._is_turboboost_supported(host):
                     # TODO: restore previous state
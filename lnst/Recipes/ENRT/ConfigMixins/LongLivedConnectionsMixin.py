@@ -1,4 +1,3 @@
-import time
 import signal
 import logging
 from math import ceil
@@ -37,6 +36,11 @@ class LongLivedConnectionsMixin(BasePerfTestTweakMixin):
     The first client (and others) will get long_lived_conns_per_ip
     connections, while the last one will get the remaining connections.
 
+    Clients establish the connections concurrently, at most
+    long_lived_conns_window connections are being established at a time
+    by each client and, if long_lived_conns_rate is set, each client
+    starts at most that many connections per second.
+
     Don't forget to set appropriate system-wide NO_FILES ulimit (if needed).
     See LongLivedServer/LongLivedClient for more details.
     """
@@ -44,6 +48,8 @@ class LongLivedConnectionsMixin(BasePerfTestTweakMixin):
     long_lived_conns = IntParam(mandatory=True)
     long_lived_conns_port = IntParam(default=20000)
     long_lived_conns_per_ip = IntParam(default=20000)
+    long_lived_conns_window = IntParam(default=1024)
+    long_lived_conns_rate = IntParam(default=0)
     long_lived_conns_net4 = IPv4NetworkParam(default="192.168.102.0/24", mandatory=True)
     long_lived_conns_net6 = IPv6NetworkParam(default="fc01::/64", mandatory=True)
 
@@ -155,6 +161,8 @@ class LongLivedConnectionsMixin(BasePerfTestTweakMixin):
             server_port=self.params.long_lived_conns_port,
             client_ip=generator_ip,
             connections_count=conns_count,
+            connect_window=self.params.long_lived_conns_window,
+            connect_rate=self.params.long_lived_conns_rate,
         )
 
         job = generator_nic.netns.prepare_job(client)
@@ -177,7 +185,8 @@ class LongLivedConnectionsMixin(BasePerfTestTweakMixin):
         for _, server_job in config.long_lived_connections:
             server_job.start(bg=True)
 
-        time.sleep(2)  # just to be sure servers are up
+        for _, server_job in config.long_lived_connections:
+            server_job.wait_for_ready(timeout=10)
 
         for client_job, _ in config.long_lived_connections:
             client_job.start(bg=True)
@@ -215,6 +224,14 @@ class LongLivedConnectionsMixin(BasePerfTestTweakMixin):
                 client_job.kill()
                 server_job.kill()
 
+            if client_job.result:
+                logging.info(
+                    "{} established {established} connections in"
+                    " {establish_duration:.2f} seconds, {failed} failed".format(
+                        client_job.what, **client_job.result
+                    )
+                )
+
         del config.long_lived_connections
 
         return super().remove_perf_test_tweak(config)
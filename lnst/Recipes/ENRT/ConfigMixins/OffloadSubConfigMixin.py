@@ -1,23 +1,61 @@
 import copy
 
-from lnst.Common.Parameters import Param
+from lnst.Common.Parameters import Param, BoolParam
 from lnst.Controller.RecipeResults import ResultLevel
 from lnst.Recipes.ENRT.ConfigMixins.BaseSubConfigMixin import BaseSubConfigMixin
 
 
+def order_by_changes(combinations):
+    """Orders offload combinations to minimize the changed features
+
+    Starting with the first combination, the next one is always the
+    remaining combination differing in the least number of features from the
+    current one, similar to a Gray code ordering. The ties keep the original
+    order.
+    """
+    remaining = list(combinations)
+    if not remaining:
+        return remaining
+
+    def changes(first, second):
+        names = set(first) | set(second)
+        return sum(
+            first.get(name, "on") != second.get(name, "on") for name in names
+        )
+
+    ordered = [remaining.pop(0)]
+    while remaining:
+        closest = min(
+            range(len(remaining)),
+            key=lambda i: changes(ordered[-1], remaining[i]),
+        )
+        ordered.append(remaining.pop(closest))
+    return ordered
+
+
 class OffloadSubConfigMixin(BaseSubConfigMixin):
     """
     This class is an extension to the :any:`BaseEnrtRecipe` class that enables
     offload configuration on the devices defined by :attr:`offload_nics`.
 
+    Only the offload features that differ from the previous sub configuration
+    are changed when switching between sub configurations, the features are
+    restored to 'on' after the last one.
+
     :param offload_combinations:
         (optional test parameter) defines the offload features to be enabled
         or disabled on the devices
+
+    :param offload_combinations_reorder:
+        (optional test parameter) if enabled, the combinations are tested in
+        an order minimizing the number of features changed between
+        consecutive combinations, starting with the first one
     """
 
     offload_combinations = Param(
         default=()
     )
+    offload_combinations_reorder = BoolParam(default=True)
 
     @property
     def offload_nics(self):
@@ -32,7 +70,11 @@ class OffloadSubConfigMixin(BaseSubConfigMixin):
             if not self.params.offload_combinations:
                 yield parent_config
 
-            for offload_settings in self.params.offload_combinations:
+            combinations = self.params.offload_combinations
+            if self.params.offload_combinations_reorder:
+                combinations = order_by_changes(combinations)
+
+            for offload_settings in combinations:
                 new_config = copy.copy(parent_config)
                 new_config.offload_settings = offload_settings
 
@@ -43,15 +85,22 @@ class OffloadSubConfigMixin(BaseSubConfigMixin):
 
         offload_settings = getattr(config, "offload_settings", None)
         if offload_settings:
+            # features with the same value weren't restored by the removal
+            # of the previous sub configuration
+            previous = getattr(config, "previous_sub_config", None)
+            previous_settings = getattr(previous, "offload_settings", None) or {}
+
             ethtool_offload_string = ""
             for name, value in list(offload_settings.items()):
-                ethtool_offload_string += " %s %s" % (name, value)
-
-            for nic in self.offload_nics:
-                nic.netns.run(
-                    "ethtool -K {} {}".format(nic.name, ethtool_offload_string),
-                    job_level=ResultLevel.NORMAL,
-                )
+                if previous_settings.get(name) != value:
+                    ethtool_offload_string += " %s %s" % (name, value)
+
+            if ethtool_offload_string:
+                for nic in self.offload_nics:
+                    nic.netns.run(
+                        "ethtool -K {} {}".format(nic.name, ethtool_offload_string),
+                        job_level=ResultLevel.NORMAL,
+                    )
 
     def generate_sub_configuration_description(self, config):
         description = super().generate_sub_configuration_description(config)
@@ -74,16 +123,22 @@ class OffloadSubConfigMixin(BaseSubConfigMixin):
     def remove_sub_configuration(self, config):
         offload_settings = getattr(config, "offload_settings", None)
         if offload_settings:
+            # features set by the next sub configuration are left to it
+            following = getattr(config, "next_sub_config", None)
+            next_settings = getattr(following, "offload_settings", None) or {}
+
             ethtool_offload_string = ""
             for name, value in list(offload_settings.items()):
-                ethtool_offload_string += " %s %s" % (name, "on")
-
-            for nic in self.offload_nics:
-                # set all the offloads back to 'on' state
-                nic.netns.run(
-                    "ethtool -K {} {}".format(nic.name, ethtool_offload_string),
-                    job_level=ResultLevel.NORMAL,
-                )
+                if name not in next_settings:
+                    ethtool_offload_string += " %s %s" % (name, "on")
+
+            if ethtool_offload_string:
+                for nic in self.offload_nics:
+                    # set the offloads back to 'on' state
+                    nic.netns.run(
+                        "ethtool -K {} {}".format(nic.name, ethtool_offload_string),
+                        job_level=ResultLevel.NORMAL,
+                    )
 
         return super().remove_sub_configuration(config)
 
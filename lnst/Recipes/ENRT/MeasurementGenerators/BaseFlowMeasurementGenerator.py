@@ -1,5 +1,6 @@
 from collections.abc import Iterator, Collection
 import itertools
+import logging
 
 from lnst.Common.Parameters import (
     Param,
@@ -7,6 +8,7 @@ from lnst.Common.Parameters import (
     ListParam,
     StrParam,
     ChoiceParam,
+    BoolParam,
 )
 
 from lnst.Common.IpAddress import ip_version_string
@@ -66,6 +68,23 @@ class BaseFlowMeasurementGenerator(BaseMeasurementGenerator):
         network flow should be tested - each message size resulting in a
         separate performance measurement.
     :type perf_msg_sizes: list[int] (default [123])
+
+    :param perf_reduce_results:
+        Parameter used by the :any:`generate_perf_measurements_combinations`
+        generator. When enabled the net_perf_tool test modules reduce their
+        output on the agent and return only the numeric arrays needed to
+        create the measurement results, the raw tool output is kept on the
+        agent. Supported only by the 'iperf' and 'neper' tools.
+    :type perf_reduce_results: :any:`BoolParam` (default False)
+
+    :param perf_persistent_servers:
+        Parameter used by the :any:`generate_perf_measurements_combinations`
+        generator. When enabled the traffic servers are started once per perf
+        configuration and reused by the clients of all the iterations instead
+        of starting a new server for every iteration. The servers are stopped
+        when the perf test tweaks are removed. Supported only by the 'iperf'
+        tool, ignored with a warning for other tools.
+    :type perf_persistent_servers: :any:`BoolParam` (default False)
     """
 
     # common perf test params
@@ -75,6 +94,8 @@ class BaseFlowMeasurementGenerator(BaseMeasurementGenerator):
     perf_parallel_processes = IntParam(default=1)
     perf_msg_sizes = ListParam(default=[123])
     perf_warmup_duration = IntParam(default=0, mandatory=False)
+    perf_reduce_results = BoolParam(default=False)
+    perf_persistent_servers = BoolParam(default=False)
 
     net_perf_tool = ChoiceParam(type=StrParam, choices=MEASUREMENT_LOOKUP.keys(), default='iperf')
 
@@ -88,8 +109,24 @@ class BaseFlowMeasurementGenerator(BaseMeasurementGenerator):
 
     def generate_perf_measurements_combinations(self, config):
         combinations = super().generate_perf_measurements_combinations(config)
+        measurement_kwargs = {"recipe_conf": config}
+        if self.params.perf_reduce_results:
+            # only iperf and neper measurements support agent side reduction
+            measurement_kwargs["reduce_results"] = True
+        if self.params.perf_persistent_servers:
+            # neper and ib_send_bw servers exit after serving a single test
+            if self.net_perf_tool_class is IperfFlowMeasurement:
+                measurement_kwargs["persistent_servers"] = True
+            else:
+                logging.warning(
+                    "perf_persistent_servers is supported only by the "
+                    "'iperf' net_perf_tool, ignoring it for '{}'".format(
+                        self.params.net_perf_tool
+                    )
+                )
+
         for flow_combination in self.generate_flow_combinations(config):
-            combinations.append([self.net_perf_tool_class(flow_combination, recipe_conf=config)])
+            combinations.append([self.net_perf_tool_class(flow_combination, **measurement_kwargs)])
         return combinations
 
     def generate_flow_combinations(self, config) -> Iterator[list[PerfFlow]]:
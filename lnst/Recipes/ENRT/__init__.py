@@ -51,99 +51,100 @@ in a specific way:
 
 """
 
-from lnst.Recipes.ENRT.SimpleNetworkRecipe import SimpleNetworkRecipe
-from lnst.Recipes.ENRT.SimpleNetworkTunableRecipe import SimpleNetworkTunableRecipe
-from lnst.Recipes.ENRT.BondRecipe import BondRecipe
-from lnst.Recipes.ENRT.DoubleBondRecipe import DoubleBondRecipe
-from lnst.Recipes.ENRT.DoubleTeamRecipe import DoubleTeamRecipe
-from lnst.Recipes.ENRT.IpsecEspAeadRecipe import IpsecEspAeadRecipe
-from lnst.Recipes.ENRT.IpsecEspAhCompRecipe import IpsecEspAhCompRecipe
-from lnst.Recipes.ENRT.NoVirtOvsVxlanRecipe import NoVirtOvsVxlanRecipe
-from lnst.Recipes.ENRT.OvS_DPDK_PvP import OvSDPDKPvPRecipe
-from lnst.Recipes.ENRT.OvSDPDKBondRecipe import OvSDPDKBondRecipe
-from lnst.Recipes.ENRT.PingFloodRecipe import PingFloodRecipe
-from lnst.Recipes.ENRT.SimpleMacsecRecipe import SimpleMacsecRecipe
-from lnst.Recipes.ENRT.ShortLivedConnectionsRecipe import ShortLivedConnectionsRecipe
-from lnst.Recipes.ENRT.TeamRecipe import TeamRecipe
-from lnst.Recipes.ENRT.TeamVsBondRecipe import TeamVsBondRecipe
-from lnst.Recipes.ENRT.VirtOvsVxlanRecipe import VirtOvsVxlanRecipe
-from lnst.Recipes.ENRT.VirtualBridgeVlanInGuestMirroredRecipe import (
-    VirtualBridgeVlanInGuestMirroredRecipe,
-)
-from lnst.Recipes.ENRT.VirtualBridgeVlanInGuestRecipe import (
-    VirtualBridgeVlanInGuestRecipe,
-)
-from lnst.Recipes.ENRT.VirtualBridgeVlanInHostMirroredRecipe import (
-    VirtualBridgeVlanInHostMirroredRecipe,
-)
-from lnst.Recipes.ENRT.VirtualBridgeVlanInHostRecipe import (
-    VirtualBridgeVlanInHostRecipe,
-)
-from lnst.Recipes.ENRT.VirtualBridgeVlansOverBondRecipe import (
-    VirtualBridgeVlansOverBondRecipe,
-)
-from lnst.Recipes.ENRT.VirtualOvsBridgeVlanInGuestMirroredRecipe import (
-    VirtualOvsBridgeVlanInGuestMirroredRecipe,
-)
-from lnst.Recipes.ENRT.VirtualOvsBridgeVlanInGuestRecipe import (
-    VirtualOvsBridgeVlanInGuestRecipe,
-)
-from lnst.Recipes.ENRT.VirtualOvsBridgeVlanInHostMirroredRecipe import (
-    VirtualOvsBridgeVlanInHostMirroredRecipe,
-)
-from lnst.Recipes.ENRT.VirtualOvsBridgeVlanInHostRecipe import (
-    VirtualOvsBridgeVlanInHostRecipe,
-)
-from lnst.Recipes.ENRT.VirtualOvsBridgeVlansOverBondRecipe import (
-    VirtualOvsBridgeVlansOverBondRecipe,
-)
-from lnst.Recipes.ENRT.VlansOverBondRecipe import VlansOverBondRecipe
-from lnst.Recipes.ENRT.VlansOverTeamRecipe import VlansOverTeamRecipe
-from lnst.Recipes.ENRT.VlansRecipe import VlansRecipe
-from lnst.Recipes.ENRT.VxlanMulticastRecipe import VxlanMulticastRecipe
-from lnst.Recipes.ENRT.VxlanRemoteRecipe import VxlanRemoteRecipe
-from lnst.Recipes.ENRT.GreTunnelRecipe import GreTunnelRecipe
-from lnst.Recipes.ENRT.GreTunnelOverBondRecipe import GreTunnelOverBondRecipe
-from lnst.Recipes.ENRT.GreTunnelOverVlanRecipe import GreTunnelOverVlanRecipe
-from lnst.Recipes.ENRT.GreTunnelOverMacvlanRecipe import GreTunnelOverMacvlanRecipe
-from lnst.Recipes.ENRT.GreLwtTunnelRecipe import GreLwtTunnelRecipe
-from lnst.Recipes.ENRT.GreOvsTunnelRecipe import GreOvsTunnelRecipe
-from lnst.Recipes.ENRT.Ip6GreTunnelRecipe import Ip6GreTunnelRecipe
-from lnst.Recipes.ENRT.Ip6GreNetnsTunnelRecipe import Ip6GreNetnsTunnelRecipe
-from lnst.Recipes.ENRT.SitTunnelRecipe import SitTunnelRecipe
-from lnst.Recipes.ENRT.IpIpTunnelRecipe import IpIpTunnelRecipe
-from lnst.Recipes.ENRT.Ip6TnlTunnelRecipe import Ip6TnlTunnelRecipe
-from lnst.Recipes.ENRT.GeneveTunnelRecipe import GeneveTunnelRecipe
-from lnst.Recipes.ENRT.GeneveLwtTunnelRecipe import GeneveLwtTunnelRecipe
-from lnst.Recipes.ENRT.GeneveOvsTunnelRecipe import GeneveOvsTunnelRecipe
-from lnst.Recipes.ENRT.GeneveOvsNetnsTunnelRecipe import GeneveOvsNetnsTunnelRecipe
-from lnst.Recipes.ENRT.GeneveIpsecOvsTunnelRecipe import GeneveIpsecOvsTunnelRecipe
-from lnst.Recipes.ENRT.VxlanLwtTunnelRecipe import VxlanLwtTunnelRecipe
-from lnst.Recipes.ENRT.VxlanOvsTunnelRecipe import VxlanOvsTunnelRecipe
-from lnst.Recipes.ENRT.VxlanNetnsTunnelRecipe import VxlanNetnsTunnelRecipe
-from lnst.Recipes.ENRT.VxlanGpeTunnelRecipe import VxlanGpeTunnelRecipe
-from lnst.Recipes.ENRT.L2TPTunnelRecipe import L2TPTunnelRecipe
-from lnst.Recipes.ENRT.MPTCPRecipe import MPTCPRecipe
-from lnst.Recipes.ENRT.SRIOVNetnsOvSRecipe import SRIOVNetnsOvSRecipe
-from lnst.Recipes.ENRT.SRIOVNetnsTcRecipe import SRIOVNetnsTcRecipe
-from lnst.Recipes.ENRT.SRIOVNetnsVxlanTcRecipe import SRIOVNetnsVxlanTcRecipe
-from lnst.Recipes.ENRT.SRIOVNetnsGeneveTcRecipe import SRIOVNetnsGeneveTcRecipe
-from lnst.Recipes.ENRT.LinuxBridgeRecipe import LinuxBridgeRecipe
-from lnst.Recipes.ENRT.LinuxBridgeOverBondRecipe import LinuxBridgeOverBondRecipe
-from lnst.Recipes.ENRT.TrafficControlRecipe import TrafficControlRecipe
-from lnst.Recipes.ENRT.BaseLACPRecipe import BaseLACPRecipe
-from lnst.Recipes.ENRT.DellLACPRecipe import DellLACPRecipe
-from lnst.Recipes.ENRT.SoftwareRDMARecipe import SoftwareRDMARecipe
-from lnst.Recipes.ENRT.XDPDropRecipe import XDPDropRecipe
-from lnst.Recipes.ENRT.XDPTxRecipe import XDPTxRecipe
-from lnst.Recipes.ENRT.CTInsertionRateNftablesRecipe import (
-    CTInsertionRateNftablesRecipe,
-)
-from .CTFulltableInsertionRateRecipe import CTFulltableInsertionRateRecipe
-from lnst.Recipes.ENRT.BaseEnrtRecipe import BaseEnrtRecipe
-from lnst.Recipes.ENRT.BaseTunnelRecipe import BaseTunnelRecipe
-from lnst.Recipes.ENRT.SimpleNetnsRouterRecipe import SimpleNetnsRouterRecipe
-from lnst.Recipes.ENRT.NftablesRuleScaleRecipe import NftablesRuleScaleRecipe
-from .ForwardingRecipe import ForwardingRecipe
-from .XDPForwardingRecipe import XDPForwardingRecipe
-from .XDPRedirectCPURecipe import XDPRedirectCPURecipe
+from lnst.Common.LazyImport import lazy_package
+
+# the recipes are imported on first access, importing a single recipe doesn't
+# import all the others
+lazy_package(__name__, {
+    "SimpleNetworkRecipe": "lnst.Recipes.ENRT.SimpleNetworkRecipe",
+    "SimpleNetworkTunableRecipe":
+        "lnst.Recipes.ENRT.SimpleNetworkTunableRecipe",
+    "BondRecipe": "lnst.Recipes.ENRT.BondRecipe",
+    "DoubleBondRecipe": "lnst.Recipes.ENRT.DoubleBondRecipe",
+    "DoubleTeamRecipe": "lnst.Recipes.ENRT.DoubleTeamRecipe",
+    "IpsecEspAeadRecipe": "lnst.Recipes.ENRT.IpsecEspAeadRecipe",
+    "IpsecEspAhCompRecipe": "lnst.Recipes.ENRT.IpsecEspAhCompRecipe",
+    "NoVirtOvsVxlanRecipe": "lnst.Recipes.ENRT.NoVirtOvsVxlanRecipe",
+    "OvSDPDKPvPRecipe": "lnst.Recipes.ENRT.OvS_DPDK_PvP",
+    "OvSDPDKBondRecipe": "lnst.Recipes.ENRT.OvSDPDKBondRecipe",
+    "PingFloodRecipe": "lnst.Recipes.ENRT.PingFloodRecipe",
+    "SimpleMacsecRecipe": "lnst.Recipes.ENRT.SimpleMacsecRecipe",
+    "ShortLivedConnectionsRecipe":
+        "lnst.Recipes.ENRT.ShortLivedConnectionsRecipe",
+    "TeamRecipe": "lnst.Recipes.ENRT.TeamRecipe",
+    "TeamVsBondRecipe": "lnst.Recipes.ENRT.TeamVsBondRecipe",
+    "VirtOvsVxlanRecipe": "lnst.Recipes.ENRT.VirtOvsVxlanRecipe",
+    "VirtualBridgeVlanInGuestMirroredRecipe":
+        "lnst.Recipes.ENRT.VirtualBridgeVlanInGuestMirroredRecipe",
+    "VirtualBridgeVlanInGuestRecipe":
+        "lnst.Recipes.ENRT.VirtualBridgeVlanInGuestRecipe",
+    "VirtualBridgeVlanInHostMirroredRecipe":
+        "lnst.Recipes.ENRT.VirtualBridgeVlanInHostMirroredRecipe",
+    "VirtualBridgeVlanInHostRecipe":
+        "lnst.Recipes.ENRT.VirtualBridgeVlanInHostRecipe",
+    "VirtualBridgeVlansOverBondRecipe":
+        "lnst.Recipes.ENRT.VirtualBridgeVlansOverBondRecipe",
+    "VirtualOvsBridgeVlanInGuestMirroredRecipe":
+        "lnst.Recipes.ENRT.VirtualOvsBridgeVlanInGuestMirroredRecipe",
+    "VirtualOvsBridgeVlanInGuestRecipe":
+        "lnst.Recipes.ENRT.VirtualOvsBridgeVlanInGuestRecipe",
+    "VirtualOvsBridgeVlanInHostMirroredRecipe":
+        "lnst.Recipes.ENRT.VirtualOvsBridgeVlanInHostMirroredRecipe",
+    "VirtualOvsBridgeVlanInHostRecipe":
+        "lnst.Recipes.ENRT.VirtualOvsBridgeVlanInHostRecipe",
+    "VirtualOvsBridgeVlansOverBondRecipe":
+        "lnst.Recipes.ENRT.VirtualOvsBridgeVlansOverBondRecipe",
+    "VlansOverBondRecipe": "lnst.Recipes.ENRT.VlansOverBondRecipe",
+    "VlansOverTeamRecipe": "lnst.Recipes.ENRT.VlansOverTeamRecipe",
+    "VlansRecipe": "lnst.Recipes.ENRT.VlansRecipe",
+    "VxlanMulticastRecipe": "lnst.Recipes.ENRT.VxlanMulticastRecipe",
+    "VxlanRemoteRecipe": "lnst.Recipes.ENRT.VxlanRemoteRecipe",
+    "GreTunnelRecipe": "lnst.Recipes.ENRT.GreTunnelRecipe",
+    "GreTunnelOverBondRecipe": "lnst.Recipes.ENRT.GreTunnelOverBondRecipe",
+    "GreTunnelOverVlanRecipe": "lnst.Recipes.ENRT.GreTunnelOverVlanRecipe",
+    "GreTunnelOverMacvlanRecipe":
+        "lnst.Recipes.ENRT.GreTunnelOverMacvlanRecipe",
+    "GreLwtTunnelRecipe": "lnst.Recipes.ENRT.GreLwtTunnelRecipe",
+    "GreOvsTunnelRecipe": "lnst.Recipes.ENRT.GreOvsTunnelRecipe",
+    "Ip6GreTunnelRecipe": "lnst.Recipes.ENRT.Ip6GreTunnelRecipe",
+    "Ip6GreNetnsTunnelRecipe": "lnst.Recipes.ENRT.Ip6GreNetnsTunnelRecipe",
+    "SitTunnelRecipe": "lnst.Recipes.ENRT.SitTunnelRecipe",
+    "IpIpTunnelRecipe": "lnst.Recipes.ENRT.IpIpTunnelRecipe",
+    "Ip6TnlTunnelRecipe": "lnst.Recipes.ENRT.Ip6TnlTunnelRecipe",
+    "GeneveTunnelRecipe": "lnst.Recipes.ENRT.GeneveTunnelRecipe",
+    "GeneveLwtTunnelRecipe": "lnst.Recipes.ENRT.GeneveLwtTunnelRecipe",
+    "GeneveOvsTunnelRecipe": "lnst.Recipes.ENRT.GeneveOvsTunnelRecipe",
+    "GeneveOvsNetnsTunnelRecipe":
+        "lnst.Recipes.ENRT.GeneveOvsNetnsTunnelRecipe",
+    "GeneveIpsecOvsTunnelRecipe":
+        "lnst.Recipes.ENRT.GeneveIpsecOvsTunnelRecipe",
+    "VxlanLwtTunnelRecipe": "lnst.Recipes.ENRT.VxlanLwtTunnelRecipe",
+    "VxlanOvsTunnelRecipe": "lnst.Recipes.ENRT.VxlanOvsTunnelRecipe",
+    "VxlanNetnsTunnelRecipe": "lnst.Recipes.ENRT.VxlanNetnsTunnelRecipe",
+    "VxlanGpeTunnelRecipe": "lnst.Recipes.ENRT.VxlanGpeTunnelRecipe",
+    "L2TPTunnelRecipe": "lnst.Recipes.ENRT.L2TPTunnelRecipe",
+    "MPTCPRecipe": "lnst.Recipes.ENRT.MPTCPRecipe",
+    "SRIOVNetnsOvSRecipe": "lnst.Recipes.ENRT.SRIOVNetnsOvSRecipe",
+    "SRIOVNetnsTcRecipe": "lnst.Recipes.ENRT.SRIOVNetnsTcRecipe",
+    "SRIOVNetnsVxlanTcRecipe": "lnst.Recipes.ENRT.SRIOVNetnsVxlanTcRecipe",
+    "SRIOVNetnsGeneveTcRecipe": "lnst.Recipes.ENRT.SRIOVNetnsGeneveTcRecipe",
+    "LinuxBridgeRecipe": "lnst.Recipes.ENRT.LinuxBridgeRecipe",
+    "LinuxBridgeOverBondRecipe": "lnst.Recipes.ENRT.LinuxBridgeOverBondRecipe",
+    "TrafficControlRecipe": "lnst.Recipes.ENRT.TrafficControlRecipe",
+    "BaseLACPRecipe": "lnst.Recipes.ENRT.BaseLACPRecipe",
+    "DellLACPRecipe": "lnst.Recipes.ENRT.DellLACPRecipe",
+    "SoftwareRDMARecipe": "lnst.Recipes.ENRT.SoftwareRDMARecipe",
+    "XDPDropRecipe": "lnst.Recipes.ENRT.XDPDropRecipe",
+    "XDPTxRecipe": "lnst.Recipes.ENRT.XDPTxRecipe",
+    "CTInsertionRateNftablesRecipe":
+        "lnst.Recipes.ENRT.CTInsertionRateNftablesRecipe",
+    "CTFulltableInsertionRateRecipe":
+        "lnst.Recipes.ENRT.CTFulltableInsertionRateRecipe",
+    "BaseEnrtRecipe": "lnst.Recipes.ENRT.BaseEnrtRecipe",
+    "BaseTunnelRecipe": "lnst.Recipes.ENRT.BaseTunnelRecipe",
+    "SimpleNetnsRouterRecipe": "lnst.Recipes.ENRT.SimpleNetnsRouterRecipe",
+    "NftablesRuleScaleRecipe": "lnst.Recipes.ENRT.NftablesRuleScaleRecipe",
+    "ForwardingRecipe": "lnst.Recipes.ENRT.ForwardingRecipe",
+    "XDPForwardingRecipe": "lnst.Recipes.ENRT.XDPForwardingRecipe",
+    "XDPRedirectCPURecipe": "lnst.Recipes.ENRT.XDPRedirectCPURecipe",
+})
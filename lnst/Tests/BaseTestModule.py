@@ -11,7 +11,10 @@ olichtne@redhat.com (Ondrej Lichtner)
 """
 
 import copy
+import time
 import signal
+import logging
+import tempfile
 from lnst.Common.Parameters import Parameters, Param
 from lnst.Common.BaseModule import BaseModule
 from lnst.Common.LnstError import LnstError
@@ -51,6 +54,10 @@ class BaseTestModule(BaseModule):
 
     MyTest(int_param=2, optional_param=3)
     """
+    # set by the Agent when the module runs as a Job, used to send job events
+    # to the controller while the module is still running
+    _event_sender = None
+
     def __init__(self, **kwargs):
         """
         Args:
@@ -94,3 +101,64 @@ class BaseTestModule(BaseModule):
         finally:
             signal.signal(signal.SIGINT, old_handler)
 
+    def _set_event_sender(self, sender):
+        self._event_sender = sender
+
+    def _send_job_event(self, event_type, data=None):
+        if self._event_sender is not None:
+            self._event_sender(event_type, data)
+
+    def send_sample(self, sample):
+        """Sends an incremental result sample to the controller
+
+        The sample is delivered to the controller side Job object while the
+        module is still running, where it can be processed by subscribed
+        callbacks. Does nothing when the module doesn't run as a Job.
+        """
+        self._send_job_event("sample", sample)
+
+    def signal_ready(self):
+        """Notifies the controller that the module is ready
+
+        Used by server side modules to report that they're listening for
+        clients, the controller can wait for this with `Job.wait_for_ready`.
+        """
+        self._send_job_event("ready")
+
+    def _wait_until_ready(self, process, check, timeout=30, interval=0.05):
+        """Polls the *check* callable until it returns True and signals
+        readiness to the controller
+
+        Returns False without signalling if the *process* exits first. When
+        the *timeout* expires the readiness is signalled anyway so that the
+        controller continues as it would without probing.
+        """
+        end_time = time.time() + timeout
+        while time.time() < end_time:
+            if process.poll() is not None:
+                return False
+            if check():
+                self.signal_ready()
+                return True
+            time.sleep(interval)
+
+        logging.warning("{} not ready after {} seconds".format(
+            self.__class__.__name__, timeout))
+        self.signal_ready()
+        return False
+
+    def _store_raw_output(self, data, suffix=""):
+        """Keeps raw tool output on the agent
+
+        Used by test modules that reduce their results before returning them
+        to the controller. The raw output is written into a temporary file
+        whose path is returned, the controller can retrieve it on demand by
+        copying the file from the machine. The agent removes the file once
+        it's fetched or when the machine is cleaned up.
+        """
+        mode = "wb" if isinstance(data, bytes) else "w"
+        with tempfile.NamedTemporaryFile(mode, prefix="lnst-raw-",
+                                         suffix=suffix, delete=False) as f:
+            f.write(data)
+        self._send_job_event("raw_output", f.name)
+        return f.name
@@ -1,118 +1,223 @@
-import re
+import os
 import time
 import signal
-from time import sleep
-from lnst.Common.Parameters import IntParam
+from array import array
+from operator import sub
+from lnst.Common.Parameters import IntParam, BoolParam
 from lnst.Tests.BaseTestModule import BaseTestModule, InterruptException
 
-def sigint_handler(signum, frame):
-    raise InterruptException()
+STAT_COUNTERS = ("user", "nice", "system", "idle", "iowait", "irq", "softirq",
+                 "steal", "guest", "guest_nice")
+
+
+class ProcFileReader(object):
+    """Rereads a /proc file through a file descriptor held open
+
+    The buffer size grows until the whole file fits into a single pread.
+    """
+    def __init__(self, path, bufsize=65536):
+        self._fd = os.open(path, os.O_RDONLY)
+        self._bufsize = bufsize
+
+    def read(self):
+        while True:
+            data = os.pread(self._fd, self._bufsize, 0)
+            if len(data) < self._bufsize:
+                return data
+            self._bufsize *= 2
+
+    def close(self):
+        os.close(self._fd)
+
+
+class CounterSampler(object):
+    """Samples a /proc file into flat integer arrays and keeps the deltas
+
+    The deltas of all samples are stored in a single array forming
+    a (intervals x rows x columns) matrix, rows are e.g. the CPUs and columns
+    the counters.
+    """
+    def __init__(self, path):
+        self._reader = ProcFileReader(path)
+        self.rows = None
+        self.columns = None
+        self.deltas = array("q")
+        self._prev = None
+
+    def close(self):
+        self._reader.close()
+
+    def sample(self):
+        rows, values = self._parse(self._reader.read())
+        if self.rows is None:
+            self.rows = rows
+        elif rows != self.rows:
+            values = self._reorder(rows, values)
+
+        if self._prev is not None:
+            self.deltas.extend(map(sub, values, self._prev))
+        self._prev = values
+
+    def last_delta(self):
+        """Returns the rows of the last interval as a dict of lists"""
+        width = len(self.columns)
+        size = len(self.rows) * width
+        last = self.deltas[-size:]
+        return {
+            row: last[i * width:(i + 1) * width].tolist()
+            for i, row in enumerate(self.rows)
+        }
+
+    def _reorder(self, rows, values):
+        # rows changed since the first sample (e.g. newly allocated irqs),
+        # missing rows keep their previous values
+        width = len(self.columns)
+        index = {row: i for i, row in enumerate(rows)}
+        result = array("q")
+        for i, row in enumerate(self.rows):
+            if row in index:
+                j = index[row]
+                result.extend(values[j * width:(j + 1) * width])
+            else:
+                result.extend(self._prev[i * width:(i + 1) * width])
+        return result
+
+    def _parse(self, data):
+        raise NotImplementedError()
+
+
+class StatSampler(CounterSampler):
+    """Per CPU time counters from the cpu lines of /proc/stat"""
+    def __init__(self):
+        super().__init__("/proc/stat")
+
+    def _parse(self, data):
+        rows = []
+        values = array("q")
+        for line in data.split(b"\n"):
+            if not line.startswith(b"cpu"):
+                if rows:
+                    break
+                continue
+            fields = line.split()
+            if self.columns is None:
+                self.columns = list(STAT_COUNTERS[:len(fields) - 1])
+            rows.append(fields[0].decode())
+            values.extend(map(int, fields[1:len(self.columns) + 1]))
+        return rows, values
+
+
+class CPUTableSampler(CounterSampler):
+    """Per CPU counters of /proc/softirqs or /proc/interrupts
+
+    Rows are the individual (soft)irqs and columns the CPUs.
+    """
+    def _parse(self, data):
+        lines = data.split(b"\n")
+        if self.columns is None:
+            self.columns = [cpu.decode().lower() for cpu in lines[0].split()]
+        cpu_count = len(self.columns)
+
+        rows = []
+        values = array("q")
+        for line in lines[1:]:
+            name, _, counters = line.partition(b":")
+            fields = counters.split(None, cpu_count)
+            if len(fields) < cpu_count or not fields[cpu_count - 1].isdigit():
+                # e.g. the ERR and MIS summary lines of /proc/interrupts
+                continue
+            rows.append(name.strip().decode())
+            values.extend(map(int, fields[:cpu_count]))
+        return rows, values
+
 
 class CPUStatMonitor(BaseTestModule):
+    """Samples the CPU time counters of /proc/stat
+
+    The result data is a compact matrix of counter deltas:
+
+    * `cpus` - names of the CPU rows, `cpu` being the total of all CPUs
+    * `counters` - names of the counter columns
+    * `timestamps`, `durations` - start and duration of each interval
+    * `deltas` - flat array of (intervals x cpus x counters) values
+
+    With `softirqs` or `interrupts` enabled the result also contains the
+    per CPU counters of /proc/softirqs or /proc/interrupts in the same format
+    with `names` of the (soft)irqs instead of `cpus` and the CPUs as
+    `counters`.
+    """
     #number of miliseconds to sleep between each sample
     interval = IntParam(default=1000)
+    softirqs = BoolParam(default=False)
+    interrupts = BoolParam(default=False)
+    stream_samples = BoolParam(default=False)
 
     def run(self):
         self._res_data = {}
 
-        raw_samples = []
+        samplers = {"stat": StatSampler()}
+        if self.params.softirqs:
+            samplers["softirqs"] = CPUTableSampler("/proc/softirqs")
+        if self.params.interrupts:
+            samplers["interrupts"] = CPUTableSampler("/proc/interrupts")
+
+        timestamps = array("d")
+        interval = self.params.interval / 1000.0
+
+        # the arrays of all samplers must stay aligned, an interrupt while
+        # sampling stops the loop only after the sample is complete
+        state = {"sampling": False, "interrupted": False}
+        def sigint_handler(signum, frame):
+            state["interrupted"] = True
+            if not state["sampling"]:
+                raise InterruptException()
+
         old_handler = None
         try:
             old_handler = signal.signal(signal.SIGINT, sigint_handler)
-            with open("/proc/stat") as stat:
-                while True:
-                    stat.seek(0)
-                    timestamp = time.time()
-                    stat_lines = "".join(
-                        [l for l in stat.readlines() if l.startswith('cpu')]
-                    )
-                    raw_samples.append({
-                        "timestamp": timestamp,
-                        "stat": stat_lines
-                        })
-                    sleep(self.params.interval / float(1000))
+            next_sample = time.time()
+            while not state["interrupted"]:
+                state["sampling"] = True
+                timestamp = time.time()
+                for sampler in samplers.values():
+                    sampler.sample()
+                timestamps.append(timestamp)
+                state["sampling"] = False
+
+                if self.params.stream_samples and len(timestamps) > 1:
+                    self._send_stat_sample(samplers["stat"], timestamps)
+
+                next_sample += interval
+                time.sleep(max(0, next_sample - time.time()))
         except InterruptException:
             pass
         finally:
             if old_handler is not None:
                 signal.signal(signal.SIGINT, old_handler)
-
-        self._res_data["raw_data"] = raw_samples
-        self._res_data["data"] = self._process_samples(raw_samples)
+            for sampler in samplers.values():
+                sampler.close()
+
+        intervals = {
+            "timestamps": timestamps[:-1],
+            "durations": array("d", map(sub, timestamps[1:], timestamps[:-1])),
+        }
+        stat = samplers.pop("stat")
+        self._res_data["data"] = dict(
+            intervals, cpus=stat.rows, counters=stat.columns, deltas=stat.deltas
+        )
+        for name, sampler in samplers.items():
+            self._res_data[name] = dict(
+                intervals, names=sampler.rows, counters=sampler.columns,
+                deltas=sampler.deltas,
+            )
 
         return True
 
-    def _process_samples(self, samples):
-        result = []
-        prev_sample = samples[0]
-        for sample in samples[1:]:
-            parsed_prev = self._parse_stat_lines(prev_sample["stat"])
-            parsed_cur = self._parse_stat_lines(sample["stat"])
-
-            interval = self._subtract_nested_dicts(parsed_cur, parsed_prev)
-            interval["duration"] = (sample["timestamp"] -
-                                    prev_sample["timestamp"])
-            interval["timestamp"] = prev_sample["timestamp"]
-
-            result.append(interval)
-
-            prev_sample = sample
-        return result
-
-    def _subtract_nested_dicts(self, first, second):
-        result = {}
-        for key, val in list(first.items()):
-            if isinstance(val, dict):
-                result[key] = self._subtract_nested_dicts(val, second[key])
-            else:
-                result[key] = val - second[key]
-        return result
-
-    def _parse_stat_lines(self, stat):
-        result = {}
-        for line in stat.split("\n"):
-            cpu_data = self._parse_cpu_stats(line)
-            if cpu_data:
-                result[cpu_data[0]] = cpu_data[1]
-                continue
-
-            intr_data = self._parse_intr_stats(line)
-            if intr_data:
-                result[intr_data[0]] = intr_data[1]
-                continue
-
-            m = re.match(r"^(.*?) (\d+)$", line)
-            if m:
-                result[m.group(1)] = int(m.group(2))
-        return result
-
-    def _parse_cpu_stats(self, stat_line):
-        result = {}
-        m = re.match(r"^(cpu\d*)\s+(\d+) (\d+) (\d+) (\d+) (\d+) (\d+) (\d+) (\d+) (\d+) (\d+)$",
-                     stat_line)
-        if m:
-            cpu = m.group(1)
-            result["user"] = int(m.group(2))
-            result["nice"] = int(m.group(3))
-            result["system"] = int(m.group(4))
-            result["idle"] = int(m.group(5))
-            result["iowait"] = int(m.group(6))
-            result["irq"] = int(m.group(7))
-            result["softirq"] = int(m.group(8))
-            result["steal"] = int(m.group(9))
-            result["guest"] = int(m.group(10))
-            result["guest_nice"] = int(m.group(11))
-            return cpu, result
-        else:
-            return None
-
-    def _parse_intr_stats(self, stat_line):
-        result = {}
-        m = re.match(r"^(intr|softirq) (\d+) (.*)$", stat_line)
-        if m:
-            result["total"] = int(m.group(2))
-            for i, irq in enumerate(m.group(3).split(" ")):
-                result[i] = int(irq)
-            return m.group(1), result
-        else:
-            return None
+    def _send_stat_sample(self, stat, timestamps):
+        sample = {
+            cpu: dict(zip(stat.columns, values))
+            for cpu, values in stat.last_delta().items()
+        }
+        sample["timestamp"] = timestamps[-2]
+        sample["duration"] = timestamps[-1] - timestamps[-2]
+        self.send_sample(sample)
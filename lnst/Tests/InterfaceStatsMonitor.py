@@ -13,66 +13,233 @@ sdobron@redhat.com (Samuel Dobron)
 
 
 import time
+import ctypes
+import fcntl
 import signal
+import socket
+import struct
 import logging
+from array import array
+from fnmatch import fnmatch
+
+from pyroute2 import IPRoute
 
 from lnst.Tests.BaseTestModule import BaseTestModule, InterruptException
-from lnst.Common.Parameters import DeviceParam, FloatParam, ListParam
+from lnst.Common.Parameters import (
+    DeviceParam,
+    FloatParam,
+    ListParam,
+    BoolParam,
+    StrParam,
+)
+
+SIOCETHTOOL = 0x8946
+ETHTOOL_GSTRINGS = 0x1b
+ETHTOOL_GSTATS = 0x1d
+ETHTOOL_GSSET_INFO = 0x37
+ETH_SS_STATS = 1
+ETH_GSTRING_LEN = 32
 
 
 def sigint_handler(signum, frame):
     raise InterruptException()
 
 
+class EthtoolStatsReader(object):
+    """Reads selected ethtool statistics of a device with the SIOCETHTOOL ioctl
+
+    The stat names are resolved once, every :any:`read` is then a single
+    ETHTOOL_GSTATS ioctl into a preallocated buffer.
+
+    :param ifname: name of the device
+    :param patterns: shell style patterns of the stat names to read,
+        e.g. "rx_queue_*_packets"
+    """
+    def __init__(self, ifname, patterns):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._ifname = ifname.encode()
+
+        count_buf = bytearray(struct.pack("IIQI", ETHTOOL_GSSET_INFO, 0, 1 << ETH_SS_STATS, 0))
+        self._ioctl(count_buf)
+        count = struct.unpack_from("I", count_buf, 16)[0]
+
+        strings_buf = bytearray(struct.pack("III", ETHTOOL_GSTRINGS, ETH_SS_STATS, count))
+        strings_buf.extend(bytes(count * ETH_GSTRING_LEN))
+        self._ioctl(strings_buf)
+        all_names = [
+            strings_buf[12 + i * ETH_GSTRING_LEN:12 + (i + 1) * ETH_GSTRING_LEN]
+            .rstrip(b"\0").decode()
+            for i in range(count)
+        ]
+
+        self.names = []
+        self._indexes = []
+        for i, name in enumerate(all_names):
+            if any(fnmatch(name, pattern) for pattern in patterns):
+                self.names.append(name)
+                self._indexes.append(i)
+
+        self._stats_buf = bytearray(struct.pack("II", ETHTOOL_GSTATS, count))
+        self._stats_buf.extend(bytes(count * 8))
+        self._values = memoryview(self._stats_buf)[8:].cast("Q")
+
+    def read(self):
+        self._ioctl(self._stats_buf)
+        values = self._values
+        return [values[i] for i in self._indexes]
+
+    def close(self):
+        self._values.release()
+        self._sock.close()
+
+    def _ioctl(self, buf):
+        # struct ifreq with ifr_data pointing to the ethtool command buffer
+        data = (ctypes.c_char * len(buf)).from_buffer(buf)
+        ifreq = struct.pack("16sP", self._ifname, ctypes.addressof(data))
+        fcntl.ioctl(self._sock.fileno(), SIOCETHTOOL, ifreq.ljust(40, b"\0"))
+
+
 class InterfaceStatsMonitor(BaseTestModule):
     """
-    Test module for gathering interface statistics on a device.
+    Test module for gathering interface statistics on one or more devices.
     Each :attr:`interval` seconds, the module will gather
     stats based on :attr:`stats` list.
 
     The module runs indefinitely until interrupted by SIGINT signal.
 
-    Only standard netlink stats are supported. Vendor specific
-    stats are not supported as these are not exported via netlink.
-    If you need them, use ethtool instead.
+    Only the monitored devices are queried, by their ifindex, over a netlink
+    socket kept open for the whole run, so the interval can be well below
+    100 ms. Samples are taken on a fixed schedule that compensates for the
+    time spent sampling.
+
+    Only standard netlink stats are gathered by default. Vendor specific
+    stats (e.g. per queue counters) are not exported via netlink, these can be
+    selected by name patterns with :attr:`ethtool_stats` and are read with the
+    ethtool ioctl.
+
+    The result is a dictionary with the sample `timestamps` array and
+    a `devices` dictionary mapping the device names to dictionaries with
+    `stats` and `ethtool_stats`, each mapping the stat names to arrays of the
+    sampled counter values.
+
+    With :attr:`stream_samples` enabled every sample is also sent to the
+    controller as soon as it's gathered, one per device.
     """
 
-    device = DeviceParam(mandatory=True)
+    device = DeviceParam()
+    devices = ListParam(type=DeviceParam())
     interval = FloatParam(default=1.0)
     stats = ListParam(default=["rx_bytes", "tx_bytes", "rx_packets", "tx_packets"])
+    ethtool_stats = ListParam(type=StrParam(), default=[])
+    stream_samples = BoolParam(default=False)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self._res_data = []
+        self._res_data = {}
+
+    def _get_devices(self):
+        devices = list(self.params.get("devices", []))
+        if "device" in self.params:
+            devices.insert(0, self.params.device)
+        return devices
 
     def run(self):
+        devices = [(dev.ifindex, dev.name) for dev in self._get_devices()]
+        if not devices:
+            self._res_data = {"msg": "No device to monitor"}
+            logging.error(self._res_data["msg"])
+            return False
+
         logging.info(
-            f"Gathering stats on device {self.params.device.name} until interrupted"
+            "Gathering stats on devices {} until interrupted".format(
+                ", ".join(name for _, name in devices)
+            )
         )
 
-        raw_samples = []
+        stats = self.params.stats
+        timestamps = array("d")
+        results = {
+            name: {
+                "stats": {stat: array("Q") for stat in stats},
+                "ethtool_stats": {},
+            }
+            for _, name in devices
+        }
+
+        ipr = IPRoute()
+        ethtool_readers = {}
         old_handler = None
         try:
+            if self.params.ethtool_stats:
+                for _, name in devices:
+                    try:
+                        reader = EthtoolStatsReader(name, self.params.ethtool_stats)
+                    except OSError as e:
+                        self._res_data = {
+                            "msg": f"Couldn't read ethtool stats of {name}: {e}"
+                        }
+                        logging.error(self._res_data["msg"])
+                        return False
+                    ethtool_readers[name] = reader
+                    results[name]["ethtool_stats"] = {
+                        stat: array("Q") for stat in reader.names
+                    }
+
             old_handler = signal.signal(signal.SIGINT, sigint_handler)
+            next_sample = time.time()
             while True:
-                self.params.device._if_manager.rescan_devices()
-                # ^ needs to rescan devices to update netlink msg
-                # where stats are fetched from
-
-                res = self.params.device.link_stats64
-
-                sample = {"timestamp": time.time()}
-                for stat in self.params.stats:
-                    sample |= {stat: res[stat]}
-
-                raw_samples.append(sample)
-                time.sleep(self.params.interval)
+                timestamp = time.time()
+                samples = {}
+                for ifindex, name in devices:
+                    msg = ipr.get_links(ifindex)[0]
+                    link_stats = msg.get_attr("IFLA_STATS64")
+                    reader = ethtool_readers.get(name)
+                    samples[name] = (
+                        [link_stats[stat] for stat in stats],
+                        reader.read() if reader is not None else [],
+                    )
+
+                timestamps.append(timestamp)
+                for name, (link_values, ethtool_values) in samples.items():
+                    device_results = results[name]
+                    for values, arrays in (
+                        (link_values, device_results["stats"]),
+                        (ethtool_values, device_results["ethtool_stats"]),
+                    ):
+                        for value, stat_array in zip(values, arrays.values()):
+                            stat_array.append(value)
+                    if self.params.stream_samples:
+                        self._send_device_sample(name, timestamp, results[name])
+
+                next_sample += self.params.interval
+                time.sleep(max(0, next_sample - time.time()))
         except InterruptException:
             pass
         finally:
             if old_handler is not None:
                 signal.signal(signal.SIGINT, old_handler)
-
-        self._res_data = raw_samples
-
+            for reader in ethtool_readers.values():
+                reader.close()
+            ipr.close()
+
+        # an interrupt while storing a sample leaves some arrays longer
+        value_arrays = [
+            stat_array
+            for device_results in results.values()
+            for arrays in device_results.values()
+            for stat_array in arrays.values()
+        ]
+        count = min(len(stat_array) for stat_array in value_arrays + [timestamps])
+        for stat_array in value_arrays + [timestamps]:
+            del stat_array[count:]
+
+        self._res_data = {"timestamps": timestamps, "devices": results}
         return True
+
+    def _send_device_sample(self, name, timestamp, device_results):
+        sample = {"timestamp": timestamp, "device": name}
+        for stat, values in device_results["stats"].items():
+            sample[stat] = values[-1]
+        for stat, values in device_results["ethtool_stats"].items():
+            sample[stat] = values[-1]
+        self.send_sample(sample)
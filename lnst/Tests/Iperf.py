@@ -1,7 +1,6 @@
 import logging
-import signal
-import subprocess
 import json
+from array import array
 from json.decoder import JSONDecodeError
 from lnst.Common.Parameters import (
     IntParam,
@@ -11,12 +10,29 @@ from lnst.Common.Parameters import (
     ListParam
 )
 from lnst.Common.Parameters import HostnameOrIpParam
-from lnst.Common.Utils import is_installed
+from lnst.Common.Utils import is_installed, listening_ports
+from lnst.Common.StreamingProcess import StreamingProcess, OutputParser
 from lnst.Tests.BaseTestModule import BaseTestModule, TestModuleError
 
 
+class IperfOutputParser(OutputParser):
+    """Keeps the complete iperf output, optionally sending the --json-stream
+    interval events as live samples"""
+    def __init__(self, send_stream_sample=None):
+        self.lines = []
+        self._send_stream_sample = send_stream_sample
+        self._job_start = None
+
+    def stdout_line(self, line, timestamp):
+        self.lines.append(line)
+        if self._send_stream_sample is not None:
+            self._job_start = self._send_stream_sample(line, self._job_start)
+
+
 class IperfBase(BaseTestModule):
     mptcp = BoolParam(default=False)
+    reduce_results = BoolParam(default=False)
+    stream_samples = BoolParam(default=False)
 
     def run(self):
         self._res_data = {}
@@ -30,17 +46,22 @@ class IperfBase(BaseTestModule):
         logging.debug("compiled command: %s" % cmd)
         logging.debug("running as {} ...".format(self._role))
 
-        server = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE,
-                                  stderr=subprocess.PIPE, close_fds=True)
-
+        parser = IperfOutputParser(
+            self._send_stream_sample if self.params.stream_samples else None
+        )
+        server = StreamingProcess(cmd, parser).start()
         try:
-            stdout, stderr = server.communicate()
+            self._wait_ready(server.process)
         except KeyboardInterrupt:
-            server.send_signal(signal.SIGINT)
-        finally:
-            stdout, stderr = server.communicate()
-            stdout = stdout.decode().strip()
-            stderr = stderr.decode().strip()
+            server.stop()
+        # both output streams are drained while iperf runs
+        server.run()
+        stdout = b"\n".join(parser.lines).decode().strip()
+        stderr = server.stderr.strip()
+
+        if self.params.get("persistent", False):
+            # results of a persistent server are retrieved by the clients
+            return True
 
         if server.returncode > 0:
             msg = f"iperf {self._role} returncode = {server.returncode}"
@@ -52,7 +73,10 @@ class IperfBase(BaseTestModule):
             return False
 
         try:
-            self._res_data["data"] = json.loads(stdout)
+            if self.params.stream_samples:
+                self._res_data["data"] = self._json_stream_to_document(stdout)
+            else:
+                self._res_data["data"] = json.loads(stdout)
         except JSONDecodeError:
             msg = "Error while parsing the iperf json output"
             logging.error(msg)
@@ -71,8 +95,88 @@ class IperfBase(BaseTestModule):
             self._res_data["stderr"] = stderr
             return False
 
+        if self.params.reduce_results:
+            self._res_data["raw_output"] = self._store_raw_output(stdout, suffix=".json")
+            data = self._res_data.pop("data")
+            self._res_data["reduced"] = self._reduce_json(data)
+            if "server_output_json" in data:
+                self._res_data["reduced"]["server_output"] = self._reduce_json(
+                    data["server_output_json"]
+                )
+
         return True
 
+    @staticmethod
+    def _reduce_json(data: dict) -> dict:
+        """Reduce the complete iperf json document to per-stream arrays
+
+        Only the values needed by the controller to create the measurement
+        results are kept: for each stream the transferred bytes and interval
+        duration, the interval start offsets shared by all streams and the
+        test start, duration and cpu utilization.
+        """
+        stream_count = len(data["end"]["streams"])
+        interval_starts = array("d")
+        stream_bytes = [array("Q") for _ in range(stream_count)]
+        stream_seconds = [array("d") for _ in range(stream_count)]
+
+        for interval in data["intervals"]:
+            interval_starts.append(interval["sum"]["start"])
+            for i, stream in enumerate(interval["streams"]):
+                stream_bytes[i].append(stream["bytes"])
+                stream_seconds[i].append(stream["seconds"])
+
+        return {
+            "start_timestamp": data["start"]["timestamp"]["timesecs"],
+            "duration": data["start"]["test_start"]["duration"],
+            "cpu_utilization_percent": data["end"]["cpu_utilization_percent"]["host_total"],
+            "interval_starts": interval_starts,
+            "stream_bytes": stream_bytes,
+            "stream_seconds": stream_seconds,
+        }
+
+    def _send_stream_sample(self, line: bytes, job_start):
+        """Sends a live sample for each interval event of --json-stream output
+
+        Returns the test start timestamp, taken from the start event, that
+        the interval offsets are relative to.
+        """
+        try:
+            event = json.loads(line)
+        except JSONDecodeError:
+            return job_start
+
+        if event.get("event") == "start":
+            return event["data"]["timestamp"]["timesecs"]
+        elif event.get("event") == "interval" and job_start is not None:
+            interval = event["data"]["sum"]
+            self.send_sample({
+                "timestamp": job_start + interval["start"],
+                "duration": interval["seconds"],
+                "bytes": interval["bytes"],
+            })
+        return job_start
+
+    @staticmethod
+    def _json_stream_to_document(stdout: str) -> dict:
+        """Assembles the --json-stream events into the same document that
+        iperf3 prints with -J only"""
+        data = {"intervals": []}
+        for line in stdout.splitlines():
+            event = json.loads(line)
+            if event["event"] == "interval":
+                data["intervals"].append(event["data"])
+            else:
+                data[event["event"]] = event["data"]
+        return data
+
+    def _wait_ready(self, process):
+        pass
+
+    def _json_stream_opt(self):
+        # line delimited json output is available since iperf 3.17
+        return "--json-stream" if self.params.stream_samples else ""
+
     @staticmethod
     def _is_json_complete(data: dict) -> bool:
         return (
@@ -84,13 +188,24 @@ class IperfBase(BaseTestModule):
 
 
 class IperfServer(IperfBase):
+    """
+    With the `persistent` parameter the server keeps serving clients until
+    it's interrupted, its output is discarded and the clients retrieve the
+    server side results with their `get_server_output` parameter.
+    """
     bind = IpParam()
     port = IntParam()
     cpu_bind = ListParam(type=IntParam())
     opts = StrParam()
     oneoff = BoolParam(default=False)
+    persistent = BoolParam(default=False)
 
     _role = "server"
+
+    def _wait_ready(self, process):
+        port = self.params.port if "port" in self.params else 5201
+        self._wait_until_ready(process, lambda: port in listening_ports())
+
     def _compose_cmd(self):
         bind = ""
         port = ""
@@ -112,11 +227,16 @@ class IperfServer(IperfBase):
 
         mptcp = "--multipath" if self.params.mptcp else ""
 
-        cmd = "{cpu} iperf3 -s {bind} -J {port} {oneoff} {mptcp} {opts}".format(
+        cmd = "{cpu} iperf3 -s {bind} -J {json_stream} {port} {oneoff} {mptcp} {opts}".format(
                 cpu=cpu,
                 bind=bind, port=port, oneoff=oneoff, mptcp=mptcp,
+                json_stream=self._json_stream_opt(),
                 opts=self.params.opts if "opts" in self.params else "")
 
+        if self.params.persistent:
+            # the output of all served tests would fill up the pipe
+            cmd += " > /dev/null"
+
         return cmd
 
 
@@ -132,6 +252,7 @@ class IperfClient(IperfBase):
     mss = IntParam()
     cpu_bind = ListParam(type=IntParam())
     parallel = IntParam()
+    get_server_output = BoolParam(default=False)
     opts = StrParam()
 
     _role = "client"
@@ -187,14 +308,18 @@ class IperfClient(IperfBase):
         else:
             test = ""
 
+        if self.params.get_server_output:
+            test += " --get-server-output"
+
         duration = self.params.duration + self.params.warmup_duration * 2  # *2 to add warm up and warm down durations
         logging.debug(f"Measuring for {duration} seconds (perf_duration + perf_warmup_duration * 2).")
 
-        cmd = ("{cpu} iperf3 -c {server} -b 0/1000 -J -t {duration}"
+        cmd = ("{cpu} iperf3 -c {server} -b 0/1000 -J {json_stream} -t {duration}"
                " {test} {mss} {blksize} {parallel} {port} {client_port}"
                " {opts}".format(
                 cpu=cpu,
                 server=self.params.server, duration=duration,
+                json_stream=self._json_stream_opt(),
                 test=test, mss=mss, blksize=blksize,
                 parallel=parallel,
                 port=port,
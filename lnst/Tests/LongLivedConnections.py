@@ -1,12 +1,16 @@
 import time
-import select
+import errno
 import socket
 import logging
 import resource
+import selectors
 import threading
+from collections import Counter, deque
 
 from .BaseTestModule import BaseTestModule
-from lnst.Common.Parameters import IntParam, IpParam
+from lnst.Common.Parameters import IntParam, IpParam, FloatParam
+
+IP_BIND_ADDRESS_NO_PORT = 0x18
 
 
 class BaseLongLivedTestModule(BaseTestModule):
@@ -17,6 +21,7 @@ class BaseLongLivedTestModule(BaseTestModule):
 
     def run(self):
         self._running = True
+        self._res_data = {}
         soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
 
         self._set_rlimit(hard, hard)
@@ -49,94 +54,240 @@ class BaseLongLivedTestModule(BaseTestModule):
 
 
 class LongLivedServer(BaseLongLivedTestModule):
+    """
+    Accepts the long lived connections and keeps them open until stopped.
+
+    A single thread waits for new connections and for connections closed by
+    the clients using the selectors module (epoll on Linux), so the number of
+    connections isn't limited by FD_SETSIZE. Up to `accept_batch` connections
+    are accepted every time the listening socket is ready.
+
+    The result data contains the number of `accepted` connections, the
+    number of connections `closed` by the clients and `accept_duration`, the
+    time between the first and the last accepted connection.
+    """
+    accept_batch = IntParam(default=1024)
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._running = False
-        self._connections = []
+        self._connections = {}
+        self._closed = 0
+        self._first_accept = None
+        self._last_accept = None
 
+        self._server_socket = None
+        self._selector = None
         self._polling_thread = None
-        self._listening_thread = None
 
     def _start(self):
         self._running = True
-        self._listening_thread = threading.Thread(target=self._listen)
-        self._listening_thread.start()
+
+        self._server_socket = socket.socket(
+            self.params.server_ip.family, socket.SOCK_STREAM
+        )
+        self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server_socket.bind((str(self.params.server_ip), self.params.server_port))
+        self._server_socket.listen(65536)
+        self._server_socket.setblocking(False)
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._server_socket, selectors.EVENT_READ)
+
+        logging.info(
+            f"TCP server started on {self.params.server_ip}:{self.params.server_port}"
+        )
 
         self._polling_thread = threading.Thread(target=self._poll_connections)
         self._polling_thread.start()
+        self.signal_ready()
 
     def _stop(self):
         logging.info("Stopping LongLivedServer server")
         self._running = False
 
-        self._listening_thread.join()
         self._polling_thread.join()
 
         self._result = (
             True if len(self._connections) == self.params.connections_count else False
         )
-
-        for conn in self._connections:
+        self._res_data = {
+            "accepted": len(self._connections) + self._closed,
+            "closed": self._closed,
+            "accept_duration": (
+                self._last_accept - self._first_accept
+                if self._first_accept is not None
+                else 0
+            ),
+        }
+
+        for conn in self._connections.values():
             conn.close()
-
-    def _listen(self):
-        with socket.socket(
-            self.params.server_ip.family, socket.SOCK_STREAM
-        ) as server_socket:
-            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            server_socket.bind((str(self.params.server_ip), self.params.server_port))
-            server_socket.listen(65536)
-
-            logging.info(
-                f"TCP server started on {self.params.server_ip}:{self.params.server_port}"
-            )
-            while self._running:
-                try:
-                    ready, _, _ = select.select([server_socket], [], [], 1)
-                except ValueError:
-                    continue
-
-                if not ready:
-                    time.sleep(1)  # prevent active polling
-                    continue
-
-                for conn in ready:
-                    client_socket, client_address = server_socket.accept()
-                    client_socket.setblocking(False)
-
-                    self._connections.append(client_socket)
+        self._connections = {}
+        self._selector.close()
+        self._server_socket.close()
 
     def _poll_connections(self):
-        while self._running:  # no need to lock due to GIL
-            if not self._connections:
-                time.sleep(1)
-                continue
-
+        while self._running:
+            for key, _ in self._selector.select(timeout=0.5):
+                if key.fileobj is self._server_socket:
+                    self._accept_connections()
+                else:
+                    self._read_connection(key.fileobj)
+
+    def _accept_connections(self):
+        for _ in range(self.params.accept_batch):
             try:
-                ready, _, _ = select.select(self._connections, [], [], 1)
-            except ValueError:
-                continue
+                client_socket, _ = self._server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                # e.g. EMFILE, the pending connections stay in the backlog
+                logging.error(f"Failed to accept connection: {e}")
+                break
+
+            client_socket.setblocking(False)
+            self._selector.register(client_socket, selectors.EVENT_READ)
+            self._connections[client_socket.fileno()] = client_socket
+
+        now = time.time()
+        if self._first_accept is None:
+            self._first_accept = now
+        self._last_accept = now
+
+    def _read_connection(self, conn):
+        try:
+            data = conn.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+
+        if not data:
+            self._selector.unregister(conn)
+            del self._connections[conn.fileno()]
+            conn.close()
+            self._closed += 1
 
 
 class LongLivedClient(BaseLongLivedTestModule):
+    """
+    Opens the long lived connections and keeps them open until stopped.
+
+    Connections are established concurrently with non-blocking connects,
+    at most `connect_window` connections are being established at the same
+    time and, if `connect_rate` is set, at most that many connections are
+    started per second. A connection that isn't established within
+    `connect_timeout` seconds is counted as failed.
+
+    The result data contains the number of `established` and `failed`
+    connections, the failures per error name in `errors`,
+    `establish_duration` - the time it took to establish all connections
+    and the `connect_time_min`, `connect_time_avg` and `connect_time_max`
+    of the individual connections, all in seconds.
+    """
     client_ip = IpParam(mandatory=True)
+    connect_window = IntParam(default=1024)
+    connect_rate = IntParam(default=0)  # connections per second, 0 means unlimited
+    connect_timeout = FloatParam(default=10)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._connections = []
 
     def _start(self):
-        for _ in range(self.params.connections_count):
-            conn = self._start_connection()
-            self._connections.append(conn)
-
-        logging.info(f"All connections established by {self}")
+        count = self.params.connections_count
+        window = self.params.connect_window
+        rate = self.params.connect_rate
+        timeout = self.params.connect_timeout
+
+        selector = selectors.DefaultSelector()
+        in_flight = set()
+        pending = deque()  # (start time, socket) in the order of starting
+        errors = Counter()
+        connect_times = []
+        started = 0
+        start_time = time.time()
+
+        def failed(sck, err):
+            if sck is not None:
+                sck.close()
+            errors[errno.errorcode.get(err, str(err))] += 1
+
+        while started < count or in_flight:
+            now = time.time()
+            allowed = count
+            if rate:
+                allowed = min(count, int((now - start_time) * rate) + 1)
+
+            while started < allowed and len(in_flight) < window:
+                started += 1
+                try:
+                    sck = self._start_connection()
+                except OSError as e:
+                    failed(None, e.errno)
+                    continue
+                selector.register(sck, selectors.EVENT_WRITE, now)
+                in_flight.add(sck)
+                pending.append((now, sck))
+
+            select_timeout = 0.1
+            if rate and started < count:
+                select_timeout = min(select_timeout, 1 / rate)
+            for key, _ in selector.select(timeout=select_timeout):
+                sck = key.fileobj
+                selector.unregister(sck)
+                in_flight.discard(sck)
+                err = sck.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if err:
+                    failed(sck, err)
+                else:
+                    sck.setblocking(True)
+                    self._connections.append(sck)
+                    connect_times.append(time.time() - key.data)
+
+            # connections time out in the order they were started
+            now = time.time()
+            while pending:
+                connect_start, sck = pending[0]
+                if sck in in_flight:
+                    if now - connect_start <= timeout:
+                        break
+                    selector.unregister(sck)
+                    in_flight.discard(sck)
+                    failed(sck, errno.ETIMEDOUT)
+                pending.popleft()
+
+        selector.close()
+
+        self._establish_duration = time.time() - start_time
+        self._failed = sum(errors.values())
+        self._errors = dict(errors)
+        self._connect_times = connect_times
+
+        logging.info(
+            f"{len(self._connections)} connections established, {self._failed} failed,"
+            f" in {self._establish_duration:.2f} seconds by {self}"
+        )
 
     def _stop(self):
         self._result = (
             True if len(self._connections) == self.params.connections_count else False
         )
 
+        connect_times = self._connect_times
+        self._res_data = {
+            "established": len(self._connections),
+            "failed": self._failed,
+            "errors": self._errors,
+            "establish_duration": self._establish_duration,
+            "connect_time_min": min(connect_times, default=0),
+            "connect_time_avg": (
+                sum(connect_times) / len(connect_times) if connect_times else 0
+            ),
+            "connect_time_max": max(connect_times, default=0),
+        }
+
         for conn in self._connections:
             conn.close()
 
@@ -144,10 +295,18 @@ class LongLivedClient(BaseLongLivedTestModule):
 
     def _start_connection(self):
         sck = socket.socket(self.params.server_ip.family, socket.SOCK_STREAM)
-        sck.setsockopt(socket.IPPROTO_IP, 0x18, 1)
-        sck.bind(
-            (str(self.params.client_ip), 0)
-        )  # needs to be binded to specific IP to respect flow IPs
-        sck.connect((str(self.params.server_ip), self.params.server_port))
+        sck.setsockopt(socket.IPPROTO_IP, IP_BIND_ADDRESS_NO_PORT, 1)
+        sck.setblocking(False)
+        try:
+            sck.bind(
+                (str(self.params.client_ip), 0)
+            )  # needs to be binded to specific IP to respect flow IPs
+            err = sck.connect_ex((str(self.params.server_ip), self.params.server_port))
+        except OSError:
+            sck.close()
+            raise
+        if err not in (0, errno.EINPROGRESS):
+            sck.close()
+            raise OSError(err, errno.errorcode.get(err, str(err)))
 
         return sck
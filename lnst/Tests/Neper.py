@@ -5,14 +5,16 @@ import re
 import subprocess
 import time
 import tempfile
+from array import array
 from typing import Dict, TextIO, Union
 
-from lnst.Common.Parameters import HostnameOrIpParam, StrParam, IntParam, IpParam, ChoiceParam
-from lnst.Common.Utils import nullcontext
+from lnst.Common.Parameters import HostnameOrIpParam, StrParam, IntParam, IpParam, ChoiceParam, BoolParam
+from lnst.Common.Utils import nullcontext, listening_ports
 from lnst.Tests.BaseTestModule import BaseTestModule
 
 NEPER_OUT_RE = re.compile(r"^(?P<key>.*)=(?P<value>.*)$", flags=re.M)
 NEPER_PATH = pathlib.Path('/root/neper')
+NEPER_DEFAULT_CONTROL_PORT = 12866
 
 
 class NeperBase(BaseTestModule):
@@ -29,6 +31,7 @@ class NeperBase(BaseTestModule):
     request_size = IntParam()
     response_size = IntParam()
     opts = StrParam()
+    reduce_results = BoolParam(default=False)
 
     def __init__(self,  **kwargs):
         self._samples_file = None
@@ -68,10 +71,14 @@ class NeperBase(BaseTestModule):
             logging.debug(f"running as {self._role}")
 
             self._res_data["start_time"] = time.time()
-            res = subprocess.run(cmd,
-                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                 universal_newlines=True, shell=True,
-                                 close_fds=True, cwd=NEPER_PATH)
+            process = subprocess.Popen(cmd,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       universal_newlines=True, shell=True,
+                                       close_fds=True, cwd=NEPER_PATH)
+            self._wait_ready(process)
+            stdout, stderr = process.communicate()
+            res = subprocess.CompletedProcess(cmd, process.returncode,
+                                              stdout, stderr)
 
             self._res_data["stderr"] = res.stderr
             self._res_data["data"] = self._parse_result(res)
@@ -88,10 +95,38 @@ class NeperBase(BaseTestModule):
                 return False
 
             if not self.is_crr_server():
-                self._res_data["samples"] = [r for r in csv.DictReader(sf)]
+                if self.params.reduce_results:
+                    raw_samples = sf.read()
+                    self._res_data["raw_output"] = self._store_raw_output(
+                        raw_samples, suffix=".csv"
+                    )
+                    self._res_data["reduced"] = self._reduce_samples(
+                        csv.DictReader(raw_samples.splitlines())
+                    )
+                else:
+                    self._res_data["samples"] = [r for r in csv.DictReader(sf)]
 
         return True
 
+    @staticmethod
+    def _reduce_samples(samples) -> Dict[str, array]:
+        """Reduce the neper samples to the columns used by the controller"""
+        reduced = {
+            "time": array("d"),
+            "transactions": array("Q"),
+            "utime": array("d"),
+            "stime": array("d"),
+        }
+        for sample in samples:
+            reduced["time"].append(float(sample["time"]))
+            reduced["transactions"].append(int(sample["transactions"]))
+            reduced["utime"].append(float(sample["utime"]))
+            reduced["stime"].append(float(sample["stime"]))
+        return reduced
+
+    def _wait_ready(self, process: subprocess.Popen):
+        pass
+
     def _compose_cmd(self, sample_file: Union[TextIO, None]) -> str:
         cmd = [f"./{self.params.workload}"]
 
@@ -131,6 +166,10 @@ class NeperServer(NeperBase):
     _role = "server"
     bind = IpParam()
 
+    def _wait_ready(self, process: subprocess.Popen):
+        port = self.params.get("control_port", NEPER_DEFAULT_CONTROL_PORT)
+        self._wait_until_ready(process, lambda: port in listening_ports())
+
 
 class NeperClient(NeperBase):
     _role = "client"
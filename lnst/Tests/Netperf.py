@@ -1,11 +1,11 @@
+import os
 import logging
-import errno
 import re
 import signal
 import time
 import subprocess
-from lnst.Common.Parameters import IntParam, IpParam, StrParam, Param
-from lnst.Common.ShellProcess import ShellProcess
+from lnst.Common.Parameters import IntParam, IpParam, StrParam, Param, ListParam
+from lnst.Common.StreamingProcess import StreamingProcess
 from lnst.Common.Utils import is_installed, std_deviation
 from lnst.Tests.BaseTestModule import BaseTestModule, TestModuleError
 
@@ -53,6 +53,20 @@ class Netserver(BaseTestModule):
         return True
 
 class Netperf(BaseTestModule):
+    """Runs netperf against a netserver
+
+    With `num_parallel` greater than 1 the netperf instances of every run are
+    started concurrently, each of them pinned to a CPU from `cpu_bind` in
+    a round robin fashion if set. The instances are forked first and only
+    then released at once, so the process creation doesn't skew the start
+    of the measured intervals.
+
+    Every item of the `results` of the result data contains the aggregated
+    `rate` of all instances and the individual `instances` results with
+    their `rate`, `start_timestamp`, `duration` and `cpu`, so the results
+    can be handled the same way as those of the parallel iperf and neper
+    streams.
+    """
     _nonomni_tests = ["SCTP_STREAM", "SCTP_STREAM_MANY", "SCTP_RR"]
     _omni_tests = ["TCP_STREAM", "TCP_RR", "UDP_STREAM", "UDP_RR"]
 
@@ -68,6 +82,7 @@ class Netperf(BaseTestModule):
     confidence = StrParam()
     cpu_util = StrParam()
     num_parallel = IntParam(default=1)
+    cpu_bind = ListParam(type=IntParam())
     runs = IntParam(default=1)
     debug = IntParam(default=0)
     opts = StrParam()
@@ -225,14 +240,6 @@ class Netperf(BaseTestModule):
             """
             cmd += " %s" % self.params.netperf_opts
 
-        if self.params.num_parallel > 1:
-            """
-            wait 1 second before starting the data transfer
-            taken from the super_netperf script, can be removed if it
-            doesn't make sense
-            """
-            cmd += " -s 1"
-
         # Print only relevant output
         if self._is_omni():
             cmd += ' -- -k "THROUGHPUT, LOCAL_CPU_UTIL, REMOTE_CPU_UTIL, CONFIDENCE_LEVEL, THROUGHPUT_CONFID"'
@@ -372,6 +379,51 @@ class Netperf(BaseTestModule):
         #ignoring confidence because it doesn't make sense to sum those
         return result
 
+    def _instance_cpus(self):
+        if "cpu_bind" not in self.params or not len(self.params.cpu_bind):
+            return [None] * self.params.num_parallel
+
+        cpus = self.params.cpu_bind
+        return [cpus[i % len(cpus)] for i in range(self.params.num_parallel)]
+
+    def _run_instances(self, cmd):
+        """Runs `num_parallel` netperf instances with a synchronized start
+
+        The instance shells block on reading their stdin, a shared pipe,
+        before executing netperf, closing its write end releases all of them
+        at once.
+
+        :return: list of (cpu, start_timestamp, return code, output) tuples
+        """
+        start_r, start_w = os.pipe()
+
+        instances = []
+        try:
+            for cpu in self._instance_cpus():
+                instance_cmd = cmd
+                if cpu is not None:
+                    instance_cmd = "taskset -c {} {}".format(cpu, cmd)
+                instance_cmd = "read _; exec {}".format(instance_cmd)
+                instances.append(
+                    (cpu, StreamingProcess(instance_cmd, stdin=start_r).start())
+                )
+        finally:
+            os.close(start_r)
+            os.close(start_w)
+        start_timestamp = time.time()
+
+        results = []
+        for cpu, instance in instances:
+            # the outputs are short, the not yet read instances can't block
+            # on a full pipe
+            ret_code = instance.run()
+            output = instance.stdout
+            logging.debug(output)
+            if instance.stderr:
+                logging.debug(instance.stderr)
+            results.append((cpu, start_timestamp, ret_code, output))
+        return results
+
     def _pretty_rate(self, rate, unit=None):
         pretty_rate = {}
         if unit is None:
@@ -433,36 +485,38 @@ class Netperf(BaseTestModule):
         for i in range(1, self.params.runs+1):
             if self.params.runs > 1:
                 logging.info("Netperf starting run %d" % i)
-            clients = []
             client_results = []
-            for i in range(0, self.params.num_parallel):
-                clients.append(ShellProcess(cmd))
-
-            for client in clients:
-                ret_code = None
-                try:
-                    ret_code = client.wait()
-                    rv += ret_code
-                except OSError as e:
-                    if e.errno == errno.EINTR:
-                        client.kill()
-
-                output = client.read_nonblocking()
-                logging.debug(output)
-
-                if ret_code is not None and ret_code == 0:
-                    client_results.append(self._parse_output(output))
+            for cpu, start, ret_code, output in self._run_instances(cmd):
+                rv += abs(ret_code)
+                if ret_code == 0:
+                    client_result = self._parse_output(output)
+                    client_result["start_timestamp"] = start
+                    client_result["duration"] = self.params.duration
+                    client_result["cpu"] = cpu
+                    client_results.append(client_result)
 
             if len(client_results) > 0:
                 #accumulate all the parallel results into one
-                result = client_results[0]
+                result = dict(client_results[0])
                 for res in client_results[1:]:
                     result = self._sum_results(result, res)
 
+                # every instance measures the utilization of the whole
+                # machine, the average smooths out the sampling differences
+                for util in ["LOCAL_CPU_UTIL", "REMOTE_CPU_UTIL"]:
+                    if util in result:
+                        result[util] = sum(
+                            res[util] for res in client_results
+                        ) / len(client_results)
+
+                if self.params.num_parallel > 1:
+                    for key in ["start_timestamp", "duration", "cpu"]:
+                        result.pop(key, None)
+                    result["instances"] = client_results
                 results.append(result)
                 rates.append(results[-1]["rate"])
 
-        if results > 1:
+        if len(results) > 1 or self.params.num_parallel > 1:
             res_data["results"] = results
 
         if len(rates) > 0:
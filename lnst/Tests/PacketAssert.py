@@ -1,51 +1,84 @@
 import re
 import logging
-import subprocess
-import signal
-from select import select
 from lnst.Common.Parameters import (
     StrParam,
     ListParam,
     DeviceParam,
     BoolParam,
+    IntParam,
 )
 from lnst.Common.Utils import is_installed
-from lnst.Tests.BaseTestModule import BaseTestModule, InterruptException
+from lnst.Common.StreamingProcess import StreamingProcess, OutputParser
+from lnst.Tests.BaseTestModule import BaseTestModule, TestModuleError
+
+
+class LineMatcher(OutputParser):
+    """Counts lines matching all of the given regular expressions
+
+    Lines are matched as they arrive, only the counters and the first
+    *max_samples* matching lines are kept.
+    """
+    def __init__(self, exprs, max_samples=10):
+        self._patterns = [re.compile(expr.encode()) for expr in exprs]
+        self._max_samples = max_samples
+        self.lines = 0
+        self.matched = 0
+        self.samples = []
+
+    def stdout_line(self, line, timestamp):
+        if not line:
+            return
+        self.lines += 1
+        for pattern in self._patterns:
+            if not pattern.search(line):
+                return
+        self.matched += 1
+        if len(self.samples) < self._max_samples:
+            self.samples.append(line.decode(errors="replace"))
 
 
-def interrupt_handler(signum, frame):
-    raise InterruptException()
-
 class PacketAssert(BaseTestModule):
+    """Counts packets captured on an interface that match all `grep_for`
+    expressions
+
+    The tcpdump output is matched while it's being read, so the memory
+    usage doesn't grow with the number of captured packets. Only the counts
+    and up to `max_samples` matching lines are returned.
+
+    With `bpf_count` the packets matching `p_filter` are only counted by the
+    capture itself, tcpdump doesn't print them at all and the count is read
+    from its statistics on exit. This can't be combined with `grep_for`.
+    """
     interface = DeviceParam(mandatory=True)
     p_filter = StrParam(default="")
     grep_for = ListParam(default=[])
     promiscuous = BoolParam(default=False)
-    _grep_exprs = []
-    _p_recv = 0
+    max_samples = IntParam(default=10)
+    bpf_count = BoolParam(default=False)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
 
-    def _prepare_grep_exprs(self):
-        for expr in self.params.grep_for:
-            if expr is not None:
-                self._grep_exprs.append(expr)
+        if self.params.bpf_count and self._grep_exprs():
+            raise TestModuleError(
+                "Parameters bpf_count and grep_for are mutually exclusive!"
+            )
+
+    def _grep_exprs(self):
+        return [expr for expr in self.params.grep_for if expr is not None]
 
     def _compose_cmd(self):
         cmd = "tcpdump"
         if not self.params.promiscuous:
             cmd += " -p"
+        if self.params.bpf_count:
+            cmd += " -w /dev/null"
         iface = self.params.interface.name
         filt = self.params.p_filter
         cmd += ' -nn -U -i %s "%s"' % (iface, filt)
 
         return cmd
 
-    def _check_line(self, line):
-        if line != "":
-            for exp in self._grep_exprs:
-                if not re.search(exp, line):
-                    return
-            self._p_recv += 1
-
     def run(self):
         self._res_data = {}
         if not is_installed("tcpdump"):
@@ -53,54 +86,37 @@ class PacketAssert(BaseTestModule):
             logging.error(self._res_data["msg"])
             return False
 
-        self._prepare_grep_exprs()
+        matcher = LineMatcher(self._grep_exprs(), self.params.max_samples)
         cmd = self._compose_cmd()
         logging.debug("compiled command: {}".format(cmd))
 
-        packet_assert_process = subprocess.Popen(
-            cmd,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            close_fds=True,
-        )
-
-        stdout = bytearray()
-        stderr = bytearray()
-        try:
-            old_handler = signal.signal(signal.SIGINT, interrupt_handler)
-            # for longer, or larger streams tcpdump can fill the entire io
-            # buffer for the stdout/stderr files, because of that we need to
-            # read the files continuosly
-            while True:
-                rl, wl, xl = select([packet_assert_process.stdout, packet_assert_process.stderr], [], [])
-                if packet_assert_process.stdout in rl:
-                    stdout += packet_assert_process.stdout.readline()
-                if packet_assert_process.stderr in rl:
-                    stderr += packet_assert_process.stderr.readline()
-        except InterruptException:
-            pass
-        finally:
-            signal.signal(signal.SIGINT, old_handler)
-
-        packet_assert_process.wait()
-        stdout += packet_assert_process.stdout.read()
-        stderr += packet_assert_process.stderr.read()
-        stdout = stdout.decode()
-        stderr = stderr.decode()
+        # runs until the capture is interrupted, the remaining output of
+        # the interrupted tcpdump is still matched
+        packet_assert_process = StreamingProcess(cmd, matcher)
+        returncode = packet_assert_process.run()
+        stderr = packet_assert_process.stderr
 
         self._res_data["stderr"] = stderr
         # tcpdump always reports information to stderr, there may be actual
         # errors but also just generic debug information
         logging.debug(self._res_data["stderr"])
 
-        for line in stdout.split("\n"):
-            self._check_line(line)
+        if self.params.bpf_count:
+            p_recv = self._parse_captured_count(stderr)
+        else:
+            p_recv = matcher.matched
+            self._res_data["lines"] = matcher.lines
+            self._res_data["samples"] = matcher.samples
 
-        logging.debug("Capturing finised. Received %d packets." % self._p_recv)
-        self._res_data["p_recv"] = self._p_recv
+        logging.debug("Capturing finised. Received %d packets." % p_recv)
+        self._res_data["p_recv"] = p_recv
 
-        if packet_assert_process.returncode != 0:
+        if returncode != 0:
             return False
         else:
             return True
+
+    @staticmethod
+    def _parse_captured_count(stderr):
+        match = re.search(r"^(\d+) packets? captured", stderr, re.MULTILINE)
+        return int(match.group(1)) if match else 0
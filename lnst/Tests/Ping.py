@@ -1,11 +1,30 @@
 import re
 import logging
-import subprocess
 from lnst.Common.Parameters import IntParam, FloatParam, HostnameOrIpParam, DeviceOrIpParam
 from lnst.Common.Utils import is_installed
 from lnst.Common.IpAddress import Ip6Address
+from lnst.Common.StreamingProcess import StreamingProcess, OutputParser
 from lnst.Tests.BaseTestModule import BaseTestModule
 
+class PingOutputParser(OutputParser):
+    """Picks the statistics from the ping output, the reply lines are
+    not kept"""
+    stat_pttr1 = re.compile(rb'(\d+) packets transmitted, (\d+) received')
+    stat_pttr2 = re.compile(rb'rtt min/avg/max/mdev = (\d+\.\d+)/(\d+\.\d+)/(\d+\.\d+)/(\d+\.\d+) ms')
+
+    def __init__(self):
+        self.packets = None
+        self.rtt = None
+
+    def stdout_line(self, line, timestamp):
+        match = self.stat_pttr1.search(line)
+        if match:
+            self.packets = tuple(x.decode() for x in match.groups())
+            return
+        match = self.stat_pttr2.search(line)
+        if match:
+            self.rtt = tuple(float(x) for x in match.groups())
+
 class Ping(BaseTestModule):
     """Port of old IcmpPing test modules"""
     dst = HostnameOrIpParam(mandatory=True)
@@ -42,21 +61,17 @@ class Ping(BaseTestModule):
 
         logging.debug("compiled command: {}".format(cmd))
 
-        ping_process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE,
-                                        stderr=subprocess.PIPE, close_fds=True)
-
-        try:
-            stdout, stderr = ping_process.communicate()
-            stdout = stdout.decode()
-            stderr = stderr.decode()
-        except KeyboardInterrupt:
-            pass
+        parser = PingOutputParser()
+        ping_process = StreamingProcess(cmd, parser)
+        returncode = ping_process.run()
+        stdout = ping_process.stdout
+        stderr = ping_process.stderr
 
         self._res_data["stdout"] = stdout
         self._res_data["stderr"] = stderr
 
-        if ping_process.returncode > 1:
-            self._res_data["msg"] = "returncode = {}".format(ping_process.returncode)
+        if returncode > 1:
+            self._res_data["msg"] = "returncode = {}".format(returncode)
             logging.error(self._res_data["msg"])
             if stderr != "":
                 logging.error("errors reported by ping")
@@ -65,16 +80,12 @@ class Ping(BaseTestModule):
 
         logging.debug(f"Ping stdout:\n{stdout}")
 
-        stat_pttr1 = r'(\d+) packets transmitted, (\d+) received'
-        stat_pttr2 = r'rtt min/avg/max/mdev = (\d+\.\d+)/(\d+\.\d+)/(\d+\.\d+)/(\d+\.\d+) ms'
-
-        match = re.search(stat_pttr1, stdout)
-        if not match:
+        if parser.packets is None:
             self._res_data = {"msg": "expected pattern not found"}
             logging.error(self._res_data["msg"])
             return False
         else:
-            trans_pkts, recv_pkts = match.groups()
+            trans_pkts, recv_pkts = parser.packets
             rate = int(round((float(recv_pkts) / float(trans_pkts)) * 100))
             logging.debug("Transmitted '{}', received '{}', "
                           "rate '{}%'".format(trans_pkts, recv_pkts, rate))
@@ -83,14 +94,13 @@ class Ping(BaseTestModule):
                               "recv_pkts": recv_pkts,
                               "rate": rate}
 
-        match = re.search(stat_pttr2, stdout)
-        if not match:
+        if parser.rtt is None:
             if self._res_data['rate'] > 0:
                 self._res_data = {"msg": "expected pattern not found"}
                 logging.error(self._res_data["msg"])
                 return False
         else:
-            tmin, tavg, tmax, tmdev = [float(x) for x in match.groups()]
+            tmin, tavg, tmax, tmdev = parser.rtt
             logging.debug("rtt min \"%.3f\", avg \"%.3f\", max \"%.3f\", "
                           "mdev \"%.3f\"" % (tmin, tavg, tmax, tmdev))
 
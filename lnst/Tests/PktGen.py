@@ -1,16 +1,17 @@
+import os
 import re
 import time
 import logging
+from array import array
 from dataclasses import dataclass, field
 from subprocess import Popen, check_output, CalledProcessError
-from threading import Thread
-from typing import Iterator, Union
 
 from lnst.Common.Utils import kmod_loaded
 from lnst.Common.IpAddress import Ip4Address
 from lnst.Tests.BaseTestModule import BaseTestModule, TestModuleError
 from lnst.Common.Parameters import (
     IntParam,
+    FloatParam,
     IpParam,
     StrParam,
     ListParam,
@@ -20,99 +21,101 @@ from lnst.Devices.Device import Device
 
 
 class PktGenResultsSampler:
-    def __init__(self, devs: list[str], duration: int) -> None:
+    _counters_re = re.compile(rb"pkts-sofar:\s*(\d+)\s+errors:\s*(\d+)")
+
+    def __init__(self, devs: list[str], interval: float = 1.0) -> None:
         """
-        PktGen output is just a table with current stats of devices. Therefore,
-        each device has a separate thread that captures current status of device
-        each second for `duration`.
+        PktGen output is just a table with current stats of devices. All
+        devices are sampled by a single loop every `interval` seconds,
+        rereading their /proc/net/pktgen files through file descriptors held
+        open for the whole run. Only the sent packets and errors counters are
+        kept, the samples of all devices share the same timeline.
         """
         self._devs = devs
-        self._duration = duration
+        self._interval = interval
 
-        self._sampling_threads: list[Thread] = []
-        self._raw_samples = {}
+        self._fds: dict[str, int] = {}
+        self._timestamps = array("d")
+        self._sofar = {device: array("Q") for device in devs}
+        self._errors = {device: array("Q") for device in devs}
 
     def start_sampling(self):
         """
-        This is a separate method just to emphasize that pktgen
-        needs to be started immediately after the start of sampling.
+        Takes the initial sample, pktgen needs to be started immediately
+        after this.
         """
-        self._setup_capturing()
-
-        for thread in self._sampling_threads:
-            thread.start()
-
-    def _setup_capturing(self):
         for device in self._devs:
-            thread = Thread(target=self._read_dev_samples, args=(device,))
-            self._sampling_threads.append(thread)
-
-    def _read_dev_samples(self, device: str):
-        self._raw_samples[device] = []
-
-        for _ in range(0, self._duration + 1):  # +1 because first sample is "empty"
-            with open(f"/proc/net/pktgen/{device}", "r") as file:
-                self._raw_samples[device].append((time.time(), file.read()))
-                # TODO: ^^^ when upgrading to python interpreter without GIL check thread safety
-                # NOTE: samples are saved at it's end => the timestamp represents ending time, not the start
-            time.sleep(1)
-
-    @property
-    def device_samples(self) -> dict[str, list[dict[str, Union[float, int, dict]]]]:
-        for thread in self._sampling_threads:
-            thread.join(timeout=2)
+            self._fds[device] = os.open(f"/proc/net/pktgen/{device}", os.O_RDONLY)
+        self._sample()
 
-        samples = {}
+    def sample_for(self, duration: float):
+        """
+        Samples the devices until `duration` seconds have passed since the
+        start of sampling or until interrupted.
+        """
+        end = self._timestamps[0] + duration
+        next_sample = self._timestamps[0]
+        try:
+            while next_sample < end:
+                next_sample = min(next_sample + self._interval, end)
+                time.sleep(max(0, next_sample - time.time()))
+                self._sample()
+        except KeyboardInterrupt:
+            logging.info("Test interrupted, stopping")
+        finally:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds = {}
+
+    def _sample(self):
+        timestamp = time.time()
+        values = []
         for device in self._devs:
-            samples[device] = []
-            packets_sofar = 0
-            start_timestamp = self._raw_samples[device][0][0]  # first "empty" sample
-            # NOTE: sample's timestamp represent the end of sampling
-            # so each sample actually starts at the timestamp of previous sample
-
-            for timestamp, raw_sample in self._raw_samples[device][
-                1:
-            ]:  # ignore first empty sample
-                params, current = self._split_output(raw_sample)
-                current = self._parse_values(current)
-
-                packets = int(current["sofar"]) - packets_sofar
-
-                samples[device].append(
-                    {
-                        "timestamp": start_timestamp,
-                        "duration": timestamp - start_timestamp,
-                        "packets": packets,
-                        "errors": int(current["errors"]),
-                        "params": params,
-                    }
+            output = os.pread(self._fds[device], 65536, 0)
+            match = self._counters_re.search(output)
+            if not match:
+                raise TestModuleError(
+                    f"Could not parse pktgen device output: {output.decode()}"
                 )
-                packets_sofar += packets
-                start_timestamp = timestamp
+            values.append(match.groups())
 
-        return samples
+        # stored only once all devices are read, keeps the arrays aligned
+        self._timestamps.append(timestamp)
+        for device, (sofar, errors) in zip(self._devs, values):
+            self._sofar[device].append(int(sofar))
+            self._errors[device].append(int(errors))
 
-    def _read_dev_outputs(self) -> Iterator[tuple[str, str]]:
-        for device in self._devs:
-            output = ""
-            with open(f"/proc/net/pktgen/{device}", "r") as f:
-                output = f.readlines()
-            yield device, "\n".join(output)
-
-    def _split_output(self, output: str) -> tuple:
-        match = re.search(r"Params:(.+)Current:(.+)Result:\s(?:\w+)", output, re.DOTALL)
-        if not match:
-            raise TestModuleError(f"Could not parse pktgen devide output: {output}")
-
-        return match.groups()
-
-    def _parse_values(self, params) -> dict[str, str]:
-        values = {}
-
-        for key, value in re.findall(r"(\w+):?\s(\S+)", params, re.MULTILINE):
-            values[key.lower()] = value
-
-        return values
+    @property
+    def device_samples(self) -> dict:
+        """
+        Results as arrays aligned to a shared timeline of the intervals
+        between samples:
+
+        * `timestamps` - start of each interval
+        * `durations` - duration of each interval
+        * `devices` - dictionary mapping device names to dictionaries with
+          `packets` sent during each interval and the `errors` counter at
+          the end of each interval
+        """
+        timestamps = self._timestamps
+        count = len(timestamps) - 1
+        return {
+            "timestamps": timestamps[:-1],
+            "durations": array(
+                "d", (timestamps[i + 1] - timestamps[i] for i in range(count))
+            ),
+            "devices": {
+                device: {
+                    "packets": array(
+                        "Q",
+                        (self._sofar[device][i + 1] - self._sofar[device][i]
+                         for i in range(count)),
+                    ),
+                    "errors": self._errors[device][1:],
+                }
+                for device in self._devs
+            },
+        }
 
 
 @dataclass
@@ -247,9 +250,13 @@ class PktgenController(BaseTestModule):
         config (list): List of dicts, each representing a PktgenDevice
             configuration. Each dict is passed directly to PktgenDevice.
             E.g.: [{"cpu": 0, "src_if": ..., "dst_mac": ..., ...}]
+        interval (float): Sampling interval of the device counters in
+            seconds, see PktGenResultsSampler.device_samples for the
+            format of the results.
     """
 
     config = ListParam()
+    interval = FloatParam(default=1.0)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -269,17 +276,14 @@ class PktgenController(BaseTestModule):
 
         devices = [dev.name for thread in self._threads for dev in thread.devices]
 
-        output_parser = PktGenResultsSampler(devices, self.duration)
+        output_parser = PktGenResultsSampler(devices, self.params.interval)
         output_parser.start_sampling()
 
         logging.debug("Starting generator")
         pktgen = Popen("echo 'start' > /proc/net/pktgen/pgctrl", shell=True)
         # ^^ echoing start to controller is blocking => needs to be separated
 
-        try:
-            time.sleep(self.duration)
-        except KeyboardInterrupt:
-            logging.info("Test interrupted, stopping")
+        output_parser.sample_for(self.duration)
 
         pktgen.kill()  # stops pktgen
 
@@ -1,11 +1,15 @@
 from abc import ABC, abstractmethod
+import time
 import logging
+import subprocess
 
 from lnst.Tests.BaseTestModule import BaseTestModule, TestModuleError
 from lnst.Common.Parameters import BoolParam, IntParam, IpParam, ListParam, StrParam
-from lnst.Common.ExecCmd import exec_cmd
+from lnst.Common.ExecCmd import ExecCmdFail, log_output
 from lnst.Common.Utils import is_installed
 
+RDMA_DEFAULT_PORT = 18515
+
 
 class RDMABandwidthBase(ABC, BaseTestModule):
     """
@@ -26,7 +30,17 @@ class RDMABandwidthBase(ABC, BaseTestModule):
 
         command = self._compose_cmd()
         logging.debug(command)
-        out, _ = exec_cmd(command)
+        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE, close_fds=True,
+                                   universal_newlines=True)
+        self._wait_ready(process)
+        out, err = process.communicate()
+        if out:
+            log_output(logging.debug, "Stdout", out)
+        if err:
+            log_output(logging.debug, "Stderr", err)
+        if process.returncode != 0:
+            raise ExecCmdFail(command, process.returncode, [out, err])
 
         filtered_lines = [line for line in out.split("\n") if line.strip() and line.find("WARNING:") == -1]
         if len(filtered_lines) > 1:
@@ -59,6 +73,9 @@ class RDMABandwidthBase(ABC, BaseTestModule):
 
         return command
 
+    def _wait_ready(self, process: subprocess.Popen) -> None:
+        pass
+
     @abstractmethod
     def _compose_base_cmd(self) -> str:
         ...
@@ -68,6 +85,26 @@ class RDMABandwidthServer(RDMABandwidthBase):
     def _compose_base_cmd(self) -> str:
         return "ib_send_bw"
 
+    def _wait_ready(self, process: subprocess.Popen) -> None:
+        if not is_installed("rdma"):
+            # can't probe the rdma_cm listener, keep the original fixed delay
+            time.sleep(2)
+            self.signal_ready()
+            return
+
+        port = self.params.port if "port" in self.params else RDMA_DEFAULT_PORT
+        self._wait_until_ready(process, lambda: self._is_listening(port), interval=0.1)
+
+    @staticmethod
+    def _is_listening(port: int) -> bool:
+        res = subprocess.run(["rdma", "resource", "show", "cm_id"],
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                             universal_newlines=True)
+        return any(
+            "state LISTEN" in line and f":{port} " in f"{line} "
+            for line in res.stdout.splitlines()
+        )
+
 
 class RDMABandwidthClient(RDMABandwidthBase):
     dst_ip = IpParam(mandatory=True)
@@ -80,7 +80,7 @@ class TRexServer(TRexCommon):
     def run(self):
         self._res_data={}
         try:
-            rc = self.impl.run()
+            rc = self.impl.run(ready_callback=self.signal_ready)
         except TRexError as e:
             #TRex errors aren't picklable so we wrap them like this
             raise TestModuleError(str(e))
@@ -1,10 +1,8 @@
 import re
 import time
-import signal
 import logging
-from subprocess import Popen, PIPE
-from threading import Thread
 from lnst.Devices.Device import Device
+from lnst.Common.StreamingProcess import StreamingProcess, OutputParser
 
 from lnst.Tests.BaseTestModule import BaseTestModule, TestModuleError
 from lnst.Common.Parameters import (
@@ -15,61 +13,43 @@ from lnst.Common.Parameters import (
 )
 
 
-class XDPBenchOutputParser:
-    def __init__(self, process: Popen):
-        self._process = process
-        self._raw_samples = []
-        self._capturing_start = 0
+class XDPBenchOutputParser(OutputParser):
+    _summary_re = re.compile(rb"Summary\s+([\d,]+)\srx/s\s+([\d,]+)\serr(,drop)?/s?")
 
-    def start_sampling(self):
-        thread = Thread(target=self._capture_output)
-        thread.start()
-        self._capturing_start = time.time()
+    def __init__(self):
+        self._results = []
+        self._previous_timestamp = time.time()
 
-    def _capture_output(self):
+    def stdout_line(self, line: bytes, timestamp: float):
         try:
-            for sample in iter(self._process.stdout.readline, ""):
-                self._raw_samples.append((time.time(), sample.decode()))
+            rx, err = self._parse_line(line)
         except ValueError:
-            pass  # .readline raises exception on killing xdp-bench subprocess
+            if line:  # ignore empty lines
+                logging.error(f"Could not parse line: '{line.decode()}'")
+            return
 
-    def parse_output(self) -> list[dict]:
-        _, stderr = self._process.communicate()
+        duration = timestamp - self._previous_timestamp
+        self._results.append(
+            {"rx": rx, "err": err, "duration": duration, "timestamp": timestamp}
+        )
 
-        logging.debug("Stderr of xdp-bench:")
-        logging.debug(str(stderr))
-
-        results = []
-        previous_timestamp = self._capturing_start
-
-        for timestamp, sample in self._raw_samples:
-            try:
-                rx, err = self._parse_line(sample)
-            except ValueError:
-                if sample:  # ignore empty lines
-                    logging.error(f"Could not parse line: '{sample}'")
-                continue
+        self._previous_timestamp = timestamp
 
-            duration = timestamp - previous_timestamp
-            results.append(
-                {"rx": rx, "err": err, "duration": duration, "timestamp": timestamp}
-            )
-
-            previous_timestamp = timestamp
-
-        if not results:
+    @property
+    def results(self) -> list[dict]:
+        if not self._results:
             raise TestModuleError("Could not get xdp-bench output")
 
-        return results
+        return self._results
 
-    def _parse_line(self, line: str) -> tuple:
-        match = re.search(r"Summary\s+([\d,]+)\srx/s\s+([\d,]+)\serr(,drop)?/s?", line)
+    def _parse_line(self, line: bytes) -> tuple:
+        match = self._summary_re.search(line)
 
         if not match:  # skip summary line at the end + corrupted lines
             raise ValueError("Invalid line format")
 
-        rx = match.group(1).replace(",", "")
-        err = match.group(2).replace(",", "")
+        rx = match.group(1).replace(b",", b"")
+        err = match.group(2).replace(b",", b"")
         # ^^ remove thousands separators
 
         return int(rx), int(err)
@@ -131,14 +111,15 @@ class XDPBench(BaseTestModule):
         command = self._prepare_command()
         logging.debug(f"Starting xdp-bench: `{command}`")
 
-        bench = Popen(command, stdout=PIPE)
-        output_parser = XDPBenchOutputParser(bench)
-        output_parser.start_sampling()
-        time.sleep(self.params.duration)
+        output_parser = XDPBenchOutputParser()
+        bench = StreamingProcess(command, output_parser, shell=False)
+        # stopped by SIGINT after the duration, needs to be shutdown gracefully
+        bench.run(duration=self.params.duration)
 
-        bench.send_signal(signal.SIGINT)  # needs to be shutdown gracefully
+        logging.debug("Stderr of xdp-bench:")
+        logging.debug(bench.stderr)
 
-        self._res_data = output_parser.parse_output()
+        self._res_data = output_parser.results
 
         return True
 
@@ -1,90 +1,63 @@
 import re
 import time
-import signal
 import logging
-from subprocess import Popen, PIPE
-from threading import Thread
 
+from lnst.Common.StreamingProcess import StreamingProcess, OutputParser
 from lnst.Tests.BaseTestModule import BaseTestModule, TestModuleError
 from lnst.Common.Parameters import StrParam, IntParam, DeviceParam, ListParam
 
 
-class XDPBenchRedirectCpuOutputParser:
-    def __init__(self, process: Popen):
-        self._process = process
-        self._raw_samples = []
-        self._capturing_start = 0
-
-    def start_sampling(self):
-        thread = Thread(target=self._capture_output)
-        thread.start()
+class XDPBenchRedirectCpuOutputParser(OutputParser):
+    def __init__(self):
+        self._results = []
         self._capturing_start = time.time()
-
-    def _capture_output(self):
-        try:
-            for sample in iter(self._process.stdout.readline, ""):
-                self._raw_samples.append((time.time(), sample.decode()))
-        except ValueError:
-            pass  # .readline raises when the xdp-bench subprocess is killed
-
-    def parse_output(self) -> list[dict]:
-        _, stderr = self._process.communicate()
-
-        if stderr:
-            logging.error(
-                "xdp-bench redirect-cpu stderr:\n%s",
-                stderr.decode(errors="replace"),
-            )
-
-        results = []
-        blocks = self._split_into_blocks()
-
-        for block_timestamp, block_lines in blocks:
-            try:
-                received, forwarded_per_cpu = self._parse_block(block_lines)
-            except ValueError:
-                logging.error(f"Could not parse block: {block_lines}")
-                continue
-
-            if results:
-                duration = block_timestamp - (
-                    results[-1]["timestamp"] + results[-1]["duration"]
-                )
-            else:
-                duration = block_timestamp - self._capturing_start
-
-            results.append(
-                {
-                    "received": received,
-                    "forwarded_per_cpu": forwarded_per_cpu,
-                    "duration": duration,
-                    "timestamp": block_timestamp - duration,
-                }
-            )
-
-        if not results:
+        self._block = []
+        self._block_timestamp = self._capturing_start
+
+    def stdout_line(self, line: bytes, timestamp: float):
+        line = line.decode(errors="replace")
+        if re.match(r"^\S+->", line):
+            self._finish_block()
+            self._block_timestamp = timestamp
+        self._block.append(line)
+
+    def finish(self):
+        self._finish_block()
+
+    @property
+    def results(self) -> list[dict]:
+        if not self._results:
             raise TestModuleError("Could not get xdp-bench redirect-cpu output")
 
-        return results
+        return self._results
 
-    def _split_into_blocks(self) -> list[tuple[float, list[str]]]:
-        blocks = []
-        current_block = []
-        current_timestamp = self._capturing_start
+    def _finish_block(self):
+        block_lines, self._block = self._block, []
+        if not block_lines:
+            return
 
-        for timestamp, line in self._raw_samples:
-            if re.match(r"^\S+->", line):
-                if current_block:
-                    blocks.append((current_timestamp, current_block))
-                current_block = [line]
-                current_timestamp = timestamp
-            else:
-                current_block.append(line)
-
-        if current_block:
-            blocks.append((current_timestamp, current_block))
+        try:
+            received, forwarded_per_cpu = self._parse_block(block_lines)
+        except ValueError:
+            logging.error(f"Could not parse block: {block_lines}")
+            return
 
-        return blocks
+        results = self._results
+        if results:
+            duration = self._block_timestamp - (
+                results[-1]["timestamp"] + results[-1]["duration"]
+            )
+        else:
+            duration = self._block_timestamp - self._capturing_start
+
+        results.append(
+            {
+                "received": received,
+                "forwarded_per_cpu": forwarded_per_cpu,
+                "duration": duration,
+                "timestamp": self._block_timestamp - duration,
+            }
+        )
 
     def _parse_block(self, lines: list[str]) -> tuple[int, dict[int, int]]:
         """
@@ -164,14 +137,16 @@ class XDPBenchRedirectCpu(BaseTestModule):
         command = self._prepare_command()
         logging.debug(f"Starting xdp-bench redirect-cpu: `{command}`")
 
-        bench = Popen(command, stdout=PIPE, stderr=PIPE)
-        output_parser = XDPBenchRedirectCpuOutputParser(bench)
-        output_parser.start_sampling()
-        time.sleep(self.params.duration)
+        output_parser = XDPBenchRedirectCpuOutputParser()
+        bench = StreamingProcess(command, output_parser, shell=False)
+        # stopped by SIGINT after the duration, SIGINT is needed to detach
+        # the XDP program
+        bench.run(duration=self.params.duration)
 
-        bench.send_signal(signal.SIGINT)  # must be SIGINT to detach XDP program
+        if bench.stderr:
+            logging.error("xdp-bench redirect-cpu stderr:\n%s", bench.stderr)
 
-        self._res_data = output_parser.parse_output()
+        self._res_data = output_parser.results
         return True
 
     def _prepare_command(self):
@@ -12,11 +12,20 @@ __author__ = """
 olichtne@redhat.com (Ondrej Lichtner)
 """
 
-from lnst.Tests.Ping import Ping
-from lnst.Tests.PacketAssert import PacketAssert
-from lnst.Tests.Iperf import IperfClient, IperfServer
-from lnst.Tests.RDMABandwidth import RDMABandwidthClient, RDMABandwidthServer
-from lnst.Tests.PktGen import PktgenController
-from lnst.Tests.XDPBench import XDPBench
-from .LongLivedConnections import LongLivedServer, LongLivedClient
+from lnst.Common.LazyImport import lazy_package
+
+# the test modules are imported on first access of the test classes, the
+# agent replaces this package with a stub module and isn't affected
+lazy_package(__name__, {
+    "Ping": "lnst.Tests.Ping",
+    "PacketAssert": "lnst.Tests.PacketAssert",
+    "IperfClient": "lnst.Tests.Iperf",
+    "IperfServer": "lnst.Tests.Iperf",
+    "RDMABandwidthClient": "lnst.Tests.RDMABandwidth",
+    "RDMABandwidthServer": "lnst.Tests.RDMABandwidth",
+    "PktgenController": "lnst.Tests.PktGen",
+    "XDPBench": "lnst.Tests.XDPBench",
+    "LongLivedServer": "lnst.Tests.LongLivedConnections",
+    "LongLivedClient": "lnst.Tests.LongLivedConnections",
+})
 #TODO add support for test classes from lnst-ctl.conf
@@ -0,0 +1,61 @@
+import sys
+import subprocess
+from unittest import TestCase
+
+# cumulative import time budgets in seconds, generous to not fail on slow
+# machines while still catching a package importing all of its modules again
+PACKAGE_BUDGET = 0.05
+RECIPE_BUDGET = 1.0
+
+
+def import_profile(module):
+    """Returns {module name: cumulative import time} of importing module"""
+    process = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c",
+         "import {}".format(module)],
+        capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        # skips the header line
+        if cumulative.strip().isdigit():
+            profile[name.strip()] = int(cumulative) / 1000000
+    return profile
+
+
+class LazyImportTest(TestCase):
+    def assertLazyPackage(self, package):
+        profile = import_profile(package)
+        submodules = [name for name in profile
+                      if name.startswith(package + ".")]
+        self.assertEqual(submodules, [])
+        self.assertLess(profile[package], PACKAGE_BUDGET)
+
+    def test_enrt_package(self):
+        self.assertLazyPackage("lnst.Recipes.ENRT")
+
+    def test_devices_package(self):
+        self.assertLazyPackage("lnst.Devices")
+
+    def test_tests_package(self):
+        self.assertLazyPackage("lnst.Tests")
+
+    def test_single_recipe(self):
+        recipe = "lnst.Recipes.ENRT.SimpleNetworkRecipe"
+        profile = import_profile(recipe)
+        self.assertFalse("lnst.Recipes.ENRT.BondRecipe" in profile)
+        self.assertFalse("lnst.Recipes.ENRT.VlansRecipe" in profile)
+        self.assertLess(profile[recipe], RECIPE_BUDGET)
+
+    def test_lazy_attributes(self):
+        from lnst.Recipes import ENRT
+        from lnst.Recipes.ENRT.BondRecipe import BondRecipe
+
+        # the imported submodule doesn't hide the lazy attribute
+        self.assertIs(ENRT.BondRecipe, BondRecipe)
+        self.assertIn("VlansRecipe", dir(ENRT))
+        with self.assertRaises(AttributeError):
+            ENRT.NoSuchRecipe
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from lnst.Common.ResourceCache import ResourceCache
+
+
+class ResourceCacheTest(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.files_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.files_dir)
+
+    def add_file(self, cache, content, last_used=None):
+        path = os.path.join(self.files_dir, "resource")
+        with open(path, "wb") as f:
+            f.write(content)
+        res_hash = cache.add_file_entry(path, "resource")
+        if last_used is not None:
+            cache._index["entries"][res_hash]["last_used"] = last_used
+        return res_hash
+
+    def test_index_survives_restart(self):
+        cache = ResourceCache(self.cache_dir, 0)
+        res_hash = self.add_file(cache, b"module")
+
+        cache = ResourceCache(self.cache_dir, 0)
+        self.assertEqual(cache.missing([res_hash, "0" * 64]), ["0" * 64])
+        with open(cache.get_path(res_hash), "rb") as f:
+            self.assertEqual(f.read(), b"module")
+
+    def test_corrupted_index_is_rebuilt_from_files(self):
+        cache = ResourceCache(self.cache_dir, 0)
+        res_hash = self.add_file(cache, b"module")
+        with open(cache.index_path, "w") as f:
+            f.write("{")
+
+        cache = ResourceCache(self.cache_dir, 0)
+        self.assertTrue(cache.query(res_hash))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResourceCache(self.cache_dir, 0, max_size=10)
+        old_hash = self.add_file(cache, b"1234", last_used=1)
+        used_hash = self.add_file(cache, b"5678", last_used=2)
+        new_hash = self.add_file(cache, b"9012")
+
+        self.assertEqual(cache.missing([old_hash, used_hash, new_hash]),
+                         [old_hash])
+        self.assertEqual(cache.size, 8)
+
+    def test_removed_file_is_missing(self):
+        cache = ResourceCache(self.cache_dir, 0)
+        res_hash = self.add_file(cache, b"module")
+        os.remove(cache.get_path(res_hash))
+
+        self.assertEqual(cache.missing([res_hash]), [res_hash])
+        self.assertEqual(self.add_file(cache, b"module"), res_hash)
+        self.assertEqual(cache.missing([res_hash]), [])
@@ -0,0 +1,144 @@
+"""
+Compares the MachineMapper with the implementation of an older revision
+
+Times the first match on a large pool and checks that both implementations
+find the same sets of matches on small random pools. The first match found
+by the indexed search may differ from the old one, as it matches the most
+constrained requirements first, the sets of all matches must be identical.
+
+Usage (from the repository root):
+    python -m tests.Controller.MachineMapper_benchmark <old git revision>
+"""
+
+import sys
+import time
+import types
+import random
+import logging
+import argparse
+import subprocess
+
+from lnst.Controller import MachineMapper as new_module
+from tests.Controller.MachineMapper_test import (
+    PoolsManagerMock,
+    machine,
+    requirement,
+    targets,
+)
+
+
+def load_old_module(revision):
+    source = subprocess.run(
+        ["git", "show", "{}:lnst/Controller/MachineMapper.py".format(revision)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    module = types.ModuleType("MachineMapper_{}".format(revision))
+    exec(compile(source, module.__name__, "exec"), module.__dict__)
+    return module
+
+
+def matches(module, pools, reqs, multimatch):
+    mapper = module.MachineMapper()
+    mapper.set_pools_manager(PoolsManagerMock(pools))
+    mapper.set_requirements(reqs)
+    try:
+        return [targets(match)
+                for match in mapper.matches(multimatch=multimatch)]
+    except module.MapperError:
+        return []
+
+
+def large_pool():
+    rng = random.Random(0)
+    pool = {}
+    for i in range(300):
+        pool["m%03d" % i] = machine(
+            "m%03d" % i,
+            {
+                "eth%d" % j: ("net%d" % rng.randrange(60),
+                              {"driver": rng.choice(["ixgbe", "i40e"])})
+                for j in range(8)
+            },
+        )
+    reqs = {
+        "host%d" % h: requirement(
+            {"eth%d" % k: ("net%d" % k, {"driver": "ixgbe"}) for k in range(2)}
+        )
+        for h in range(5)
+    }
+    return {"p": pool}, reqs
+
+
+def small_pool(rng):
+    pool = {}
+    for i in range(rng.randint(2, 6)):
+        pool["m%d" % i] = machine(
+            "m%d" % i,
+            {
+                "eth%d" % j: ("net%d" % rng.randrange(3),
+                              {"driver": rng.choice(["ixgbe", "i40e"])})
+                for j in range(rng.randint(1, 3))
+            },
+        )
+    reqs = {
+        "host%d" % h: requirement(
+            {"eth%d" % k: ("n%d" % rng.randrange(2),
+                           {"driver": rng.choice(["ixgbe", ""])})
+             for k in range(rng.randint(1, 2))}
+        )
+        for h in range(rng.randint(1, 3))
+    }
+    return {"p": pool}, reqs
+
+
+def timed_first_match(module, pools, reqs, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.time()
+        matches(module, pools, reqs, multimatch=False)
+        durations.append(time.time() - start)
+    return min(durations)
+
+
+def canonical(match_targets):
+    return sorted(repr(sorted(match.items())) for match in match_targets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("revision", help="git revision of the old mapper")
+    parser.add_argument("--pools", type=int, default=400,
+                        help="number of random pools to compare")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of timed runs on the large pool")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    old_module = load_old_module(args.revision)
+
+    pools, reqs = large_pool()
+    old_duration = timed_first_match(old_module, pools, reqs, args.repeat)
+    new_duration = timed_first_match(new_module, pools, reqs, args.repeat)
+    print("Large pool first match: old {:.3f}s, new {:.3f}s ({:.1f}x)".format(
+        old_duration, new_duration, old_duration / new_duration))
+
+    rng = random.Random(0)
+    different_first = 0
+    different_sets = 0
+    for _ in range(args.pools):
+        pools, reqs = small_pool(rng)
+        old_all = matches(old_module, pools, reqs, multimatch=True)
+        new_all = matches(new_module, pools, reqs, multimatch=True)
+        if canonical(old_all) != canonical(new_all):
+            different_sets += 1
+        elif old_all and old_all[0] != new_all[0]:
+            different_first += 1
+
+    print("Random pools: {} compared, {} with a different first match, "
+          "{} with different sets of matches".format(
+              args.pools, different_first, different_sets))
+    return 1 if different_sets else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
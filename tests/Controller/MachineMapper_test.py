@@ -0,0 +1,157 @@
+import time
+import random
+import logging
+from unittest import TestCase
+
+from lnst.Controller.MachineMapper import MachineMapper, MapperError
+
+
+class PoolsManagerMock(object):
+    def __init__(self, pools):
+        self._pools = pools
+
+    def get_pools(self):
+        return self._pools
+
+
+def machine(hostname, interfaces, **params):
+    params["hostname"] = hostname
+    return {
+        "params": params,
+        "interfaces": {
+            if_id: {"network": network,
+                    "params": dict(if_params, hwaddr=if_id)}
+            for if_id, (network, if_params) in interfaces.items()
+        },
+    }
+
+
+def requirement(interfaces, **params):
+    return {
+        "params": params,
+        "interfaces": {
+            if_id: {"network": network, "params": if_params}
+            for if_id, (network, if_params) in interfaces.items()
+        },
+    }
+
+
+def mapper(pools, reqs):
+    m = MachineMapper()
+    m.set_pools_manager(PoolsManagerMock(pools))
+    m.set_requirements(reqs)
+    return m
+
+
+def targets(match):
+    return {
+        m_id: (m["target"], {i: v["target"] for i, v in m["interfaces"].items()})
+        for m_id, m in match["machines"].items()
+    }
+
+
+class MachineMapperTest(TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_network_labels_consistent(self):
+        pool = {
+            "a": machine("a", {"a1": ("x", {}), "a2": ("y", {})}),
+            "b": machine("b", {"b1": ("y", {})}),
+        }
+        reqs = {
+            "h1": requirement({"eth0": ("net", {})}),
+            "h2": requirement({"eth0": ("net", {})}),
+        }
+        matches = list(mapper({"p": pool}, reqs).matches(multimatch=True))
+
+        self.assertEqual(
+            [targets(match) for match in matches],
+            [
+                {"h1": ("a", {"eth0": "a2"}), "h2": ("b", {"eth0": "b1"})},
+                {"h1": ("b", {"eth0": "b1"}), "h2": ("a", {"eth0": "a2"})},
+            ],
+        )
+        for match in matches:
+            self.assertEqual(match["networks"], {"net": "y"})
+            self.assertEqual(match["pool_name"], "p")
+            self.assertFalse(match["virtual"])
+
+    def test_distinct_labels_need_distinct_networks(self):
+        pool = {
+            "a": machine("a", {"a1": ("x", {}), "a2": ("x", {})}),
+        }
+        reqs = {
+            "h1": requirement({"eth0": ("n1", {}), "eth1": ("n2", {})}),
+        }
+        with self.assertRaises(MapperError):
+            next(mapper({"p": pool}, reqs).matches())
+
+    def test_params(self):
+        pool = {
+            "a": machine("a", {"a1": ("x", {"driver": "ixgbe"})}, arch="arm"),
+            "b": machine("b", {"b1": ("x", {"driver": "i40e"})}, arch="x86"),
+            "c": machine("c", {"c1": ("x", {"driver": "ixgbe"})}, arch="x86"),
+        }
+        reqs = {
+            "h1": requirement({"eth0": ("net", {"driver": "ixgbe"})},
+                              arch="x86"),
+        }
+        matches = list(mapper({"p": pool}, reqs).matches(multimatch=True))
+
+        self.assertEqual([targets(match) for match in matches],
+                         [{"h1": ("c", {"eth0": "c1"})}])
+
+    def test_virtual_fallback(self):
+        pool = {
+            "a": machine("a", {}, libvirt_domain="a-domain"),
+        }
+        reqs = {
+            "h1": requirement({"eth0": ("net", {})}),
+        }
+        m = mapper({"p": pool}, reqs)
+        with self.assertRaises(MapperError):
+            next(m.matches())
+
+        match = next(m.matches(allow_virt=True))
+        self.assertTrue(match["virtual"])
+        self.assertEqual(targets(match), {"h1": ("a", {})})
+
+    def test_large_pool(self):
+        rng = random.Random(0)
+        pool = {}
+        for i in range(300):
+            pool["m%03d" % i] = machine(
+                "m%03d" % i,
+                {
+                    "eth%d" % j: ("net%d" % rng.randrange(60),
+                                  {"driver": rng.choice(["ixgbe", "i40e"])})
+                    for j in range(8)
+                },
+            )
+        reqs = {
+            "host%d" % h: requirement(
+                {"eth%d" % k: ("net%d" % k, {"driver": "ixgbe"})
+                 for k in range(2)}
+            )
+            for h in range(5)
+        }
+
+        start = time.time()
+        match = next(mapper({"p": pool}, reqs).matches())
+        duration = time.time() - start
+
+        # ~0.3s, the search without indexes and pruning took over 3s, see
+        # MachineMapper_benchmark.py for the comparison with older revisions
+        self.assertLess(duration, 1.5)
+        used = {m["target"] for m in match["machines"].values()}
+        self.assertEqual(len(used), 5)
+        for m_id, m in match["machines"].items():
+            for if_id, i in m["interfaces"].items():
+                req_label = reqs[m_id]["interfaces"][if_id]["network"]
+                pool_if = pool[m["target"]]["interfaces"][i["target"]]
+                self.assertEqual(pool_if["network"], match["networks"][req_label])
+                self.assertEqual(pool_if["params"]["driver"], "ixgbe")
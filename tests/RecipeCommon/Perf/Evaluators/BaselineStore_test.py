@@ -0,0 +1,76 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from lnst.Common.IpAddress import ipaddress
+from lnst.Controller.Namespace import Namespace
+from lnst.Devices.RemoteDevice import RemoteDevice
+from lnst.RecipeCommon.Perf.Evaluators.BaselineStore import (
+    StoredBaseline,
+    StoredMetric,
+    baseline_key,
+)
+from lnst.RecipeCommon.Perf.Measurements.BaseFlowMeasurement import Flow
+
+
+def device(name, ifindex):
+    dev = Mock(spec=RemoteDevice)
+    dev.name = name
+    dev.ifindex = ifindex
+    dev.__repr__ = Mock(return_value=f"VethDevice(id={ifindex}, name={name}, ifindex={ifindex})")
+    return dev
+
+
+def flow_result(generator_nic, receiver_nic):
+    flow = Flow(
+        type="tcp_stream",
+        generator=Mock(spec=Namespace),
+        generator_bind=ipaddress("192.168.101.1"),
+        receiver=Mock(spec=Namespace),
+        receiver_bind=ipaddress("192.168.101.2"),
+        duration=60,
+        parallel_streams=1,
+        generator_nic=generator_nic,
+        receiver_nic=receiver_nic,
+        receiver_port=12000,
+        msg_size=1400,
+    )
+    result = Mock(flow=flow)
+    result.measurement.name = "IperfFlowMeasurement"
+    result.measurement.version = 1
+    return result
+
+
+class BaselineKeyTest(TestCase):
+    context = {"recipe": "VethRecipe", "params": {}, "sub_configuration": None}
+
+    def test_recreated_devices(self):
+        first_run = flow_result(device("veth0", 10), device("veth1", 11))
+        second_run = flow_result(device("veth0", 25), device("veth1", 26))
+
+        self.assertEqual(
+            baseline_key(self.context, first_run),
+            baseline_key(self.context, second_run),
+        )
+
+    def test_different_devices(self):
+        first = flow_result(device("veth0", 10), device("veth1", 11))
+        second = flow_result(device("veth2", 10), device("veth1", 11))
+
+        self.assertNotEqual(
+            baseline_key(self.context, first),
+            baseline_key(self.context, second),
+        )
+
+
+class StoredBaselineTest(TestCase):
+    def test_default_threshold(self):
+        baseline = StoredBaseline(
+            "key",
+            {"generator_results": StoredMetric(100, 1, "bits")},
+            {"generator_results": 2, "receiver_results": None},
+            default_threshold=5,
+        )
+
+        self.assertEqual(baseline.get_threshold("generator_results"), 2)
+        self.assertEqual(baseline.get_threshold("receiver_results"), 5)
+        self.assertEqual(baseline.get_threshold("new_metric"), 5)
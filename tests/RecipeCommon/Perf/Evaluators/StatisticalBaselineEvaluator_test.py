@@ -0,0 +1,78 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from lnst.Controller.RecipeResults import ResultType
+from lnst.RecipeCommon.Perf.Results import (
+    PerfInterval,
+    SequentialPerfResult,
+    ParallelPerfResult,
+)
+from lnst.RecipeCommon.Perf.Evaluators.StatisticalBaselineEvaluator import (
+    StatisticalBaselineEvaluator,
+    interval_samples,
+    mann_whitney_u,
+)
+
+
+def sequential(values):
+    return SequentialPerfResult(
+        [PerfInterval(value, 1, "bits", i) for i, value in enumerate(values)]
+    )
+
+
+class ResultsMock(Mock):
+    metrics = ["generator_results"]
+    metric_metadata = {}
+
+
+class StatisticalBaselineEvaluatorTest(TestCase):
+    def test_mann_whitney_u(self):
+        # U = 0, z = (12.5 - 0.5) / sqrt(25 / 12 * 11)
+        effect_size, p_value = mann_whitney_u([1, 2, 3, 4, 5], [6, 7, 8, 9, 10])
+        self.assertAlmostEqual(effect_size, -1.0)
+        self.assertAlmostEqual(p_value, 0.01219, places=4)
+
+        # ties: U = 3, z = (8 - 3 - 0.5) / sqrt(16 / 12 * (9 - 48 / 56))
+        effect_size, p_value = mann_whitney_u([1, 2, 2, 3], [2, 3, 3, 4])
+        self.assertAlmostEqual(effect_size, -0.625)
+        self.assertAlmostEqual(p_value, 0.1720, places=3)
+
+    def test_interval_samples(self):
+        streams = ParallelPerfResult([sequential([1, 2, 3]), sequential([10, 20, 30])])
+        self.assertEqual(interval_samples(streams), [11, 22, 33])
+        self.assertEqual(
+            interval_samples(SequentialPerfResult([streams, streams])),
+            [11, 22, 33, 11, 22, 33],
+        )
+
+    def _compare(self, current, baseline, threshold):
+        evaluator = StatisticalBaselineEvaluator()
+        evaluator.get_threshold = Mock(return_value=threshold)
+        return evaluator.compare_metrics_with_threshold(
+            ResultsMock(generator_results=sequential(current)),
+            ResultsMock(generator_results=sequential(baseline)),
+            "generator_results",
+        )
+
+    def test_noisy_difference_passes(self):
+        comparison = self._compare(
+            [100, 70, 130, 90, 110, 80], [95, 125, 65, 105, 85, 115], 1
+        )
+        self.assertGreater(abs(comparison.difference), 1)
+        self.assertGreater(comparison.p_value, 0.05)
+        self.assertEqual(comparison.comparison_result, ResultType.PASS)
+
+    def test_significant_regression_fails(self):
+        comparison = self._compare(
+            [80, 81, 79, 80, 82, 78], [100, 101, 99, 100, 102, 98], 5
+        )
+        self.assertLess(comparison.p_value, 0.05)
+        self.assertAlmostEqual(comparison.effect_size, -1.0)
+        self.assertEqual(comparison.comparison_result, ResultType.FAIL)
+
+    def test_significant_within_threshold_passes(self):
+        comparison = self._compare(
+            [99, 99.1, 98.9, 99, 99.2, 98.8], [100, 100.1, 99.9, 100, 100.2, 99.8], 5
+        )
+        self.assertLess(comparison.p_value, 0.05)
+        self.assertEqual(comparison.comparison_result, ResultType.PASS)
@@ -0,0 +1,76 @@
+from array import array
+from unittest import TestCase
+from unittest.mock import Mock
+
+from lnst.RecipeCommon.Perf.Measurements.AbortPolicy import (
+    ZeroThroughputAbortPolicy,
+)
+from lnst.Tests.CPUStatMonitor import CPUStatMonitor
+from lnst.Tests.InterfaceStatsMonitor import InterfaceStatsMonitor
+
+
+def interface_sample(name, timestamp, rx_packets, tx_packets):
+    """Creates a sample the way InterfaceStatsMonitor sends it"""
+    monitor = Mock()
+    device_results = {
+        "stats": {
+            "rx_packets": array("Q", [rx_packets]),
+            "tx_packets": array("Q", [tx_packets]),
+        },
+        "ethtool_stats": {},
+    }
+    InterfaceStatsMonitor._send_device_sample(
+        monitor, name, timestamp, device_results
+    )
+    return monitor.send_sample.call_args.args[0]
+
+
+def cpu_sample(timestamp):
+    monitor = Mock()
+    stat = Mock(columns=["user", "idle"])
+    stat.last_delta.return_value = {"cpu0": [0, 100]}
+    CPUStatMonitor._send_stat_sample(monitor, stat, [timestamp, timestamp + 1])
+    return monitor.send_sample.call_args.args[0]
+
+
+class ZeroThroughputAbortPolicyTest(TestCase):
+    def setUp(self):
+        self.policy = ZeroThroughputAbortPolicy(duration=3)
+        self.job = Mock()
+
+    def check(self, sample):
+        return self.policy.check_sample(Mock(), self.job, sample)
+
+    def test_forwarding_stalls(self):
+        # the traffic is forwarded for two seconds, then stops
+        reasons = []
+        for second, packets in enumerate([0, 100, 200, 200, 200, 200]):
+            reasons.append(self.check(interface_sample("rx", second, packets, 5)))
+            reasons.append(self.check(interface_sample("tx", second, 3, packets)))
+
+        self.assertEqual(reasons[:-2], [None] * 10)
+        self.assertIn("rx_packets/tx_packets for 3.00 seconds", reasons[-2])
+        self.assertIsNotNone(reasons[-1])
+
+    def test_forwarding_continues(self):
+        for second in range(10):
+            packets = second * 100
+            self.assertIsNone(self.check(interface_sample("rx", second, packets, 5)))
+            # only the forwarded direction of a device increases
+            self.assertIsNone(self.check(interface_sample("tx", second, 3, packets)))
+
+    def test_reset(self):
+        for second in range(3):
+            self.check(interface_sample("rx", second, 0, 0))
+        self.policy.reset()
+        self.assertIsNone(self.check(interface_sample("rx", 3, 0, 0)))
+
+    def test_iperf_interval_samples(self):
+        self.assertIsNone(self.check({"timestamp": 0, "duration": 1.5, "bytes": 0}))
+        self.assertIsNone(self.check({"timestamp": 1.5, "duration": 1, "bytes": 10}))
+        self.assertIsNone(self.check({"timestamp": 2.5, "duration": 1.5, "bytes": 0}))
+        self.assertIsNotNone(self.check({"timestamp": 4, "duration": 1.5, "bytes": 0}))
+
+    def test_cpu_samples_ignored(self):
+        for second in range(10):
+            self.assertIsNone(self.check(cpu_sample(second)))
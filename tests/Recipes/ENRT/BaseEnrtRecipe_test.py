@@ -0,0 +1,69 @@
+import copy
+from unittest import TestCase
+
+from lnst.Recipes.ENRT.BaseEnrtRecipe import BaseEnrtRecipe, EnrtConfiguration
+from lnst.Recipes.ENRT.MeasurementGenerators.BaseFlowMeasurementGenerator import (
+    BaseFlowMeasurementGenerator,
+)
+
+
+class StaticDevicesRecipe(BaseFlowMeasurementGenerator, BaseEnrtRecipe):
+    def generate_sub_configurations(self, config):
+        for parent_config in super().generate_sub_configurations(config):
+            for encryption in [False, True]:
+                new_config = copy.copy(parent_config)
+                new_config.encryption = encryption
+                yield new_config
+
+
+class SubConfigDevicesRecipe(StaticDevicesRecipe):
+    """Creates its devices only when the sub configuration is applied"""
+    def apply_sub_configuration(self, config):
+        super().apply_sub_configuration(config)
+        config.encrypted_device = object()
+
+    def generate_ping_endpoints(self, config):
+        return [config.encrypted_device]
+
+    def generate_perf_endpoints(self, config):
+        return [[config.encrypted_device]]
+
+
+class BrokenEndpointsRecipe(StaticDevicesRecipe):
+    def generate_ping_endpoints(self, config):
+        raise ValueError("broken recipe")
+
+
+class ExecutionPlanTest(TestCase):
+    def test_known_plan(self):
+        plan = StaticDevicesRecipe().generate_execution_plan(EnrtConfiguration())
+
+        self.assertEqual(len(plan.children), 2)
+        for sub_stage in plan.children:
+            self.assertEqual(
+                [stage.key for stage in sub_stage.children], [("ping",)]
+            )
+        self.assertTrue(plan.known)
+        self.assertEqual(plan.format_estimate(), "0:00:00")
+
+    def test_devices_created_in_sub_configuration(self):
+        plan = SubConfigDevicesRecipe().generate_execution_plan(
+            EnrtConfiguration()
+        )
+
+        self.assertEqual(len(plan.children), 2)
+        for sub_stage in plan.children:
+            ping_stage, perf_stage = sub_stage.children
+            self.assertEqual(ping_stage.key, ("ping",))
+            self.assertIsNone(ping_stage.estimate)
+            self.assertEqual(perf_stage.key, ("perf",))
+            self.assertIsNone(perf_stage.estimate)
+            self.assertFalse(sub_stage.known)
+
+        self.assertFalse(plan.known)
+        self.assertEqual(plan.format_estimate(), "at least 0:00:00")
+        self.assertIn("ping tests estimated unknown", "\n".join(plan.format()))
+
+    def test_unexpected_errors_raised(self):
+        with self.assertRaises(ValueError):
+            BrokenEndpointsRecipe().generate_execution_plan(EnrtConfiguration())